@@ -0,0 +1,5 @@
+"""
+Benchmark scripts for the B-tree implementations.
+
+Run a benchmark from the repository root, e.g. ``python -m benchmarks.node_search``.
+"""
@@ -0,0 +1,40 @@
+import random
+import time
+
+
+def timed(fn, *args, **kwargs):
+    """
+    Run fn once and measure the wall-clock time.
+    :param fn: A callable to run.
+    :return: A tuple (elapsed seconds, result of fn).
+    """
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def random_keys(n, seed=0):
+    """
+    Generate n distinct keys in random order.
+    :param n: Number of keys.
+    :param seed: Seed of the random generator, so that runs are reproducible.
+    :return: A list of n distinct integers.
+    """
+    keys = list(range(n))
+    random.Random(seed).shuffle(keys)
+    return keys
+
+
+def print_table(headers, rows):
+    """
+    Print rows as a plain text table with right-aligned columns.
+    :param headers: A list of column names.
+    :param rows: A list of rows, each row being a list of printable cells.
+    """
+    cells = [[str(h) for h in headers]] + [[c if isinstance(c, str) else f"{c:.3f}" if isinstance(c, float) else str(c)
+                                            for c in row] for row in rows]
+    widths = [max(len(row[j]) for row in cells) for j in range(len(headers))]
+    for n, row in enumerate(cells):
+        print("  ".join(cell.rjust(w) for cell, w in zip(row, widths)))
+        if n == 0:
+            print("  ".join("-" * w for w in widths))
@@ -0,0 +1,58 @@
+"""
+Batched get_many / insert_many / delete_many against one b_tree_search, b_tree_insert or b_tree_delete per key.
+"""
+import argparse
+
+from benchmarks._util import print_table, random_keys, timed
+from main import BTree
+
+
+def run(n, t, batch_size):
+    keys = random_keys(n)
+    batches = [keys[j:j + batch_size] for j in range(0, n, batch_size)]
+    rows = []
+
+    single = BTree(t)
+    batched = BTree(t)
+
+    def insert_single():
+        for k in keys:
+            single.b_tree_insert(k, k)
+
+    def insert_batched():
+        for batch in batches:
+            batched.insert_many([(k, k) for k in batch])
+
+    def search_single():
+        for k in keys:
+            single.b_tree_search(single.root, k)
+
+    def search_batched():
+        for batch in batches:
+            batched.get_many(batch)
+
+    def delete_single():
+        for k in keys[::2]:
+            single.b_tree_delete(k)
+
+    def delete_batched():
+        for batch in batches:
+            batched.delete_many(batch[::2])
+
+    for name, one_by_one, many in (("insert", insert_single, insert_batched),
+                                   ("search", search_single, search_batched),
+                                   ("delete", delete_single, delete_batched)):
+        single_time, _ = timed(one_by_one)
+        batch_time, _ = timed(many)
+        rows.append([name, single_time, batch_time, single_time / batch_time])
+    print(f"n = {n}, t = {t}, batch size = {batch_size}, times in seconds")
+    print_table(["operation", "per key", "batched", "speedup"], rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-n", type=int, default=1000000, help="number of keys")
+    parser.add_argument("-t", type=int, default=16, help="minimum degree")
+    parser.add_argument("--batch-size", type=int, default=100000)
+    args = parser.parse_args()
+    run(args.n, args.t, args.batch_size)
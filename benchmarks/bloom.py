@@ -0,0 +1,75 @@
+"""
+Lookups through the Bloom filter of BTree.enable_filter against plain lookups, for a sweep of hit ratios (the
+fraction of looked-up keys that are in the tree), and the cost of keeping the filter on inserts and deletes.
+
+The tree holds the even keys below 2n; absent keys are odd, so every miss ends in a leaf without the filter.
+"""
+import argparse
+import random
+import sys
+
+from benchmarks._util import print_table, random_keys, timed
+from main import BTree
+
+HIT_RATIOS = (0.0, 0.1, 0.5, 0.9, 1.0)
+
+
+def build(t, keys, error_rate=None):
+    """
+    :param error_rate: The false-positive rate of the filter of the tree, or None for no filter.
+    """
+    tree = BTree(t)
+    if error_rate is not None:
+        tree.enable_filter(len(keys), error_rate)
+    for k in keys:
+        tree.b_tree_insert(k, k)
+    return tree
+
+
+def run(n, t, error_rate, queries):
+    keys = [2 * k for k in random_keys(n)]
+    elapsed_plain = timed(build, t, keys)[0]
+    elapsed_filtered, tree = timed(build, t, keys, error_rate)
+    print(f"n = {n}, t = {t}; inserts: {elapsed_plain / n * 1e9:.0f} ns plain, "
+          f"{elapsed_filtered / n * 1e9:.0f} ns with the filter")
+    bloom = tree.filter
+    print(f"filter: {bloom.size} counters, {bloom.hashes} hashes, {sys.getsizeof(bloom) / n:.1f} bytes per key; "
+          f"expected false-positive rate {bloom.expected_false_positive_rate():.4f}")
+    print()
+    rnd = random.Random(1)
+    rows = []
+    for ratio in HIT_RATIOS:
+        batch = [rnd.randrange(n) * 2 + (rnd.random() >= ratio) for _ in range(queries)]
+
+        def lookup():
+            root = tree.root
+            for k in batch:
+                tree.b_tree_search(root, k)
+
+        tree.disable_filter()
+        elapsed_plain, _ = timed(lookup)
+        tree.filter = bloom
+        bloom.checks = bloom.negatives = bloom.false_positives = 0
+        elapsed_filtered, _ = timed(lookup)
+        rows.append([ratio, elapsed_plain / queries * 1e9, elapsed_filtered / queries * 1e9,
+                     elapsed_plain / elapsed_filtered, bloom.observed_false_positive_rate() or 0.0])
+    print_table(["hit ratio", "plain ns", "filtered ns", "speedup", "observed FPR"], rows)
+
+    doomed = keys[:n // 2]
+    absent = [k + 1 for k in doomed]
+    for name, rate in [("plain", None), ("filtered", error_rate)]:
+        tree = build(t, keys, rate)
+        elapsed_present, _ = timed(lambda: [tree.b_tree_delete(k) for k in doomed])
+        elapsed_absent, _ = timed(lambda: [tree.b_tree_delete(k) for k in absent])
+        print(f"{name} deletes: {elapsed_present / len(doomed) * 1e9:.0f} ns per present key, "
+              f"{elapsed_absent / len(absent) * 1e9:.0f} ns per absent key")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-n", type=int, default=200000, help="number of keys")
+    parser.add_argument("-t", type=int, default=3, help="minimum degree (3 as in main.py)")
+    parser.add_argument("--error-rate", type=float, default=0.01, help="false-positive rate of the filter")
+    parser.add_argument("--queries", type=int, default=200000, help="lookups per hit ratio")
+    args = parser.parse_args()
+    run(args.n, args.t, args.error_rate, args.queries)
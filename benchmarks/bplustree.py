@@ -0,0 +1,54 @@
+"""
+BPlusTree against the classic BTree: random inserts, point lookups, full and partial scans in both directions,
+and deletes of half of the keys.
+"""
+import argparse
+
+from benchmarks._util import print_table, random_keys, timed
+from bplustree import BPlusTree
+from main import BTree
+
+
+def run(n, t, width):
+    keys = random_keys(n)
+    doomed = keys[:n // 2]
+    starts = random_keys(n)[:1000]
+    trees = [("BTree", lambda: BTree(t)),
+             ("BPlusTree", lambda: BPlusTree(t)),
+             (f"BPlusTree(internal_t={2 * t})", lambda: BPlusTree(t, 2 * t))]
+    rows = []
+    for name, make in trees:
+        tree = make()
+
+        def insert():
+            for k in keys:
+                tree.b_tree_insert(k, k)
+
+        def lookup():
+            root = tree.root
+            for k in keys:
+                tree.b_tree_search(root, k)
+
+        def delete():
+            for k in doomed:
+                tree.b_tree_delete(k)
+
+        elapsed_insert, _ = timed(insert)
+        elapsed_lookup, _ = timed(lookup)
+        elapsed_scan, _ = timed(lambda: sum(1 for _ in tree))
+        elapsed_reverse, _ = timed(lambda: sum(1 for _ in tree.range(reverse=True)))
+        elapsed_ranges, _ = timed(lambda: [sum(1 for _ in tree.range(lo, lo + width)) for lo in starts])
+        elapsed_delete, _ = timed(delete)
+        rows.append([name, n / elapsed_insert, n / elapsed_lookup, n / elapsed_scan, n / elapsed_reverse,
+                     len(starts) * width / elapsed_ranges, len(doomed) / elapsed_delete])
+    print(f"n = {n}, t = {t}, entries per second, {len(starts)} ranges of {width} keys")
+    print_table(["tree", "inserts", "lookups", "scan", "reverse scan", "ranges", "deletes"], rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-n", type=int, default=1000000, help="number of keys")
+    parser.add_argument("-t", type=int, default=32, help="minimum degree")
+    parser.add_argument("--width", type=int, default=100, help="keys per range query")
+    args = parser.parse_args()
+    run(args.n, args.t, args.width)
@@ -0,0 +1,56 @@
+"""
+Buffer pool sizing for PagedBTree: hit ratio, evictions, page writes and time of a mixed workload
+(random lookups with some inserts) for several pool sizes, so the pool can be sized for a working set.
+"""
+import argparse
+import os
+import random
+import tempfile
+
+from benchmarks._util import print_table, timed
+from pager import PagedBTree
+
+
+def run(n, t, ops, cache_sizes, write_ratio):
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "index.db")
+        PagedBTree.bulk_load(((2 * k, k) for k in range(n)), t, 0.7, path=path).close()
+        rnd = random.Random(0)
+        workload = [(rnd.random() < write_ratio, rnd.randrange(2 * n)) for _ in range(ops)]
+        for cache_size in cache_sizes:
+            with tempfile.NamedTemporaryFile(dir=tmp_dir, delete=False) as copy:
+                with open(path, 'rb') as original:
+                    copy.write(original.read())
+            tree = PagedBTree.open(copy.name, cache_size=cache_size)
+
+            def run_workload():
+                inserted = set()
+                for is_write, k in workload:
+                    if is_write and k % 2 and k not in inserted:
+                        inserted.add(k)
+                        tree.b_tree_insert(k, k)
+                    else:
+                        tree.b_tree_search(tree.root, k)
+                tree.flush()
+
+            elapsed, _ = timed(run_workload)
+            stats = tree.store.stats()
+            tree.close()
+            os.remove(copy.name)
+            accesses = stats['hits'] + stats['misses']
+            rows.append([cache_size, stats['hits'] / accesses, stats['misses'], stats['evictions'], stats['writes'],
+                         elapsed])
+    print(f"n = {n}, t = {t}, {ops} operations, {write_ratio:.0%} inserts")
+    print_table(["pool size", "hit ratio", "misses", "evictions", "page writes", "seconds"], rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-n", type=int, default=1000000, help="number of keys")
+    parser.add_argument("-t", type=int, default=32, help="minimum degree")
+    parser.add_argument("--ops", type=int, default=100000, help="number of operations")
+    parser.add_argument("--cache-sizes", type=int, nargs="+", default=[16, 256, 4096, 65536])
+    parser.add_argument("--write-ratio", type=float, default=0.1)
+    args = parser.parse_args()
+    run(args.n, args.t, args.ops, args.cache_sizes, args.write_ratio)
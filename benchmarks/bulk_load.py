@@ -0,0 +1,52 @@
+"""
+Building a tree from sorted input: one b_tree_insert per pair against BTree.bulk_load,
+and the external sort path BTree.bulk_load_file against inserting an unsorted file line by line.
+"""
+import argparse
+import os
+import tempfile
+
+from benchmarks._util import print_table, random_keys, timed
+from main import BTree
+
+
+def insert_all(pairs, t):
+    tree = BTree(t)
+    for k, v in pairs:
+        tree.b_tree_insert(k, v)
+    return tree
+
+
+def run(n, t, run_size):
+    pairs = [(k, k) for k in range(n)]
+    rows = []
+    insert_time, _ = timed(insert_all, pairs, t)
+    rows.append(["sorted", "b_tree_insert", insert_time])
+    for fill_factor in (0.7, 1.0):
+        load_time, _ = timed(BTree.bulk_load, pairs, t, fill_factor)
+        rows.append(["sorted", f"bulk_load(fill_factor={fill_factor})", load_time])
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        file_path = os.path.join(tmp_dir, "input.tsv")
+        with open(file_path, 'w') as file:
+            file.writelines(f"{k}\t{k}\n" for k in random_keys(n))
+
+        def insert_file():
+            with open(file_path, 'r') as file:
+                return insert_all((map(int, line.split('\t')) for line in file), t)
+
+        insert_time, _ = timed(insert_file)
+        rows.append(["unsorted file", "b_tree_insert", insert_time])
+        load_time, _ = timed(BTree.bulk_load_file, file_path, t, 1.0, run_size)
+        rows.append(["unsorted file", f"bulk_load_file(run_size={run_size})", load_time])
+    print(f"n = {n}, t = {t}, times in seconds")
+    print_table(["input", "method", "time"], rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-n", type=int, default=1000000, help="number of pairs")
+    parser.add_argument("-t", type=int, default=3, help="minimum degree")
+    parser.add_argument("--run-size", type=int, default=250000, help="lines sorted in memory per run")
+    args = parser.parse_args()
+    run(args.n, args.t, args.run_size)
@@ -0,0 +1,62 @@
+"""
+Memory and lookup cost of CompressedBTree against BTree for dense integer IDs, sparse 64-bit integers,
+URL strings and composite bytes IDs. Memory is measured with tracemalloc around building the tree from freshly
+created keys, as when they are parsed from a file, so it includes the key objects each tree holds on to.
+"""
+import argparse
+import random
+
+from benchmarks._util import print_table, random_keys, timed
+from benchmarks.memory import traced_size
+from compression import CompressedBTree
+from main import BTree
+
+
+def datasets(n):
+    """
+    :return: A list of (name, function returning the keys in insertion order).
+    """
+    order = random_keys(n)
+    return [
+        ("dense int IDs", lambda: [i + 1 for i in order]),
+        ("sparse int64", lambda: [random.Random(i).randrange(-2 ** 63, 2 ** 63) for i in order]),
+        ("URLs", lambda: [f"https://shop.example.com/catalog/category-{i % 50:02d}/product-{i:09d}" for i in order]),
+        ("composite bytes IDs", lambda: [b"tenant-%04d/user-%010d" % (i % 100, i) for i in order]),
+    ]
+
+
+def build(cls, t, make_keys):
+    tree = cls(t)
+    for k in make_keys():
+        tree.b_tree_insert(k, 0)
+    return tree
+
+
+def run(n, t):
+    rows = []
+    for name, make_keys in datasets(n):
+        lookups = make_keys()[::-1]
+        results = []
+        for cls in (BTree, CompressedBTree):
+            size, tree = traced_size(lambda: build(cls, t, make_keys))
+
+            def lookup():
+                root = tree.root
+                for k in lookups:
+                    tree.b_tree_search(root, k)
+
+            elapsed, _ = timed(lookup)
+            results.append((size, elapsed))
+        (plain_size, plain_time), (packed_size, packed_time) = results
+        rows.append([name, plain_size / n, packed_size / n, 1 - packed_size / plain_size,
+                     plain_time / n * 1e9, packed_time / n * 1e9])
+    print(f"n = {n}, t = {t}; bytes per entry (values included), nanoseconds per lookup")
+    print_table(["keys", "BTree B", "compressed B", "saved", "BTree ns", "compressed ns"], rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-n", type=int, default=200000, help="number of keys")
+    parser.add_argument("-t", type=int, default=32, help="minimum degree")
+    args = parser.parse_args()
+    run(args.n, args.t)
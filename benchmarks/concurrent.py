@@ -0,0 +1,75 @@
+"""
+Throughput of ConcurrentBTree by thread count, for a read-heavy workload (95% lookups, 5% inserts and deletes)
+and a mixed one (50% lookups). The single-threaded BTree is the baseline.
+
+With the GIL, threads only interleave, so the numbers show the cost of latching rather than a speed-up.
+On a free-threaded CPython build (3.13t and later, where sys._is_gil_enabled() is False) the threads
+run in parallel and the table shows how throughput scales.
+"""
+import argparse
+import random
+import sys
+import threading
+import time
+
+from benchmarks._util import print_table, random_keys
+from concurrent_btree import ConcurrentBTree
+from main import BTree
+
+
+def make_workload(n, ops, read_ratio, seed):
+    rnd = random.Random(seed)
+    workload = []
+    for _ in range(ops):
+        k = rnd.randrange(2 * n)
+        r = rnd.random()
+        workload.append((0 if r < read_ratio else 1 if r < (1 + read_ratio) / 2 else 2, k))
+    return workload
+
+
+def run_workload(tree, workload):
+    get = tree.get if isinstance(tree, ConcurrentBTree) else \
+        lambda k: tree.b_tree_search(tree.root, k)
+    for op, k in workload:
+        if op == 0:
+            get(k)
+        elif op == 1:
+            tree.b_tree_insert(k, k)
+        else:
+            tree.b_tree_delete(k)
+
+
+def run(n, t, ops, thread_counts):
+    keys = random_keys(n)
+    gil = getattr(sys, '_is_gil_enabled', lambda: True)()
+    rows = []
+    for name, read_ratio in [("read-heavy", 0.95), ("mixed", 0.5)]:
+        tree = BTree.bulk_load(sorted((k, k) for k in keys), t)
+        workload = make_workload(n, ops, read_ratio, 0)
+        start = time.perf_counter()
+        run_workload(tree, workload)
+        base = ops / (time.perf_counter() - start)
+        rows.append([name, "BTree", 1, base, 1.0])
+        for threads in thread_counts:
+            tree = ConcurrentBTree.bulk_load(sorted((k, k) for k in keys), t)
+            workloads = [make_workload(n, ops // threads, read_ratio, seed) for seed in range(threads)]
+            workers = [threading.Thread(target=run_workload, args=(tree, workload)) for workload in workloads]
+            start = time.perf_counter()
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+            throughput = (ops // threads) * threads / (time.perf_counter() - start)
+            rows.append([name, "ConcurrentBTree", threads, throughput, throughput / base])
+    print(f"n = {n}, t = {t}, {ops} operations, Python {sys.version.split()[0]}, GIL {'on' if gil else 'off'}")
+    print_table(["workload", "tree", "threads", "ops/s", "vs BTree"], rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-n", type=int, default=100000, help="number of keys loaded before the run")
+    parser.add_argument("-t", type=int, default=32, help="minimum degree")
+    parser.add_argument("--ops", type=int, default=200000, help="number of operations, split across the threads")
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+    run(args.n, args.t, args.ops, args.threads)
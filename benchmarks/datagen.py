@@ -0,0 +1,139 @@
+"""
+Deterministic key generators for the benchmark suite.
+
+Every generator yields n keys one at a time from a seed, in constant memory, so key streams of 10^8 keys can be
+written to a file or fed to a tree without being held in a list. The same (distribution, n, seed) always gives the
+same keys on every platform and Python version.
+
+    sequential   0, 1, ..., n-1
+    random       a pseudo-random permutation of 0..n-1
+    zipfian      n draws from n ranks with a Zipf distribution (hot keys repeat), ranks scattered over 0..n-1
+    clustered    runs of consecutive keys at random offsets, filled round-robin like many append-only streams
+
+    python -m benchmarks.datagen zipfian 1000000 --seed 1 --out keys.tsv
+"""
+import argparse
+import math
+import random
+import sys
+
+DISTRIBUTIONS = ('sequential', 'random', 'zipfian', 'clustered')
+
+
+class Permutation:
+    """
+    A pseudo-random bijection of range(n), computed per index instead of stored.
+    An invertible mix of multiplications and xor-shifts permutes the smallest power of two >= n, and indices that
+    land outside range(n) are mixed again until they land inside (cycle walking).
+    """
+
+    def __init__(self, n, seed=0):
+        self.n = n
+        self.bits = max(2, (n - 1).bit_length())
+        self.mask = (1 << self.bits) - 1
+        rnd = random.Random(seed)
+        self.multipliers = [rnd.getrandbits(self.bits) | 1 for _ in range(3)]  # odd, hence invertible
+        self.offset = rnd.getrandbits(self.bits)
+
+    def _mix(self, x):
+        shift = self.bits // 2 + 1
+        for multiplier in self.multipliers:
+            x = (x * multiplier + self.offset) & self.mask
+            x ^= x >> shift
+        return x
+
+    def __call__(self, i):
+        x = self._mix(i)
+        while x >= self.n:
+            x = self._mix(x)
+        return x
+
+
+def _zeta(n, theta):
+    """
+    The generalized harmonic number sum(i ** -theta for i in 1..n): the first terms exactly, the tail by the
+    Euler-Maclaurin formula, so it costs O(1) for any n.
+    """
+    exact = min(n, 10000)
+    total = math.fsum(i ** -theta for i in range(1, exact + 1))
+    if n > exact:
+        if theta == 1:
+            total += math.log(n / exact)
+        else:
+            total += (n ** (1 - theta) - exact ** (1 - theta)) / (1 - theta)
+        total += (n ** -theta - exact ** -theta) / 2
+    return total
+
+
+def zipfian_ranks(n, count, theta=0.99, seed=0):
+    """
+    Draw ranks in range(n) where rank r is drawn with probability proportional to 1 / (r + 1) ** theta,
+    with the approximation of Gray et al. ("Quickly generating billion-record synthetic databases") used by YCSB.
+    :return: A generator of count ranks; rank 0 is the most frequent.
+    """
+    rnd = random.Random(seed)
+    zetan = _zeta(n, theta)
+    alpha = 1 / (1 - theta)
+    eta = (1 - (2 / n) ** (1 - theta)) / (1 - _zeta(2, theta) / zetan) if n > 2 else 1
+    for _ in range(count):
+        u = rnd.random()
+        uz = u * zetan
+        if uz < 1:
+            yield 0
+        elif uz < 1 + 0.5 ** theta:
+            yield min(1, n - 1)
+        else:
+            yield min(n - 1, int(n * (eta * u - eta + 1) ** alpha))
+
+
+def generate(distribution, n, seed=0, theta=0.99, clusters=None):
+    """
+    Yield n keys of a distribution.
+    :param distribution: One of DISTRIBUTIONS.
+    :param n: Number of keys, which is also the size of the key space.
+    :param seed: Seed of the pseudo-random choices.
+    :param theta: Skew of the zipfian distribution, in (0, 1).
+    :param clusters: Number of runs of the clustered distribution, about sqrt(n) if None.
+    :return: A generator of integer keys.
+    """
+    if distribution == 'sequential':
+        return iter(range(n))
+    if distribution == 'random':
+        return map(Permutation(n, seed), range(n))
+    if distribution == 'zipfian':
+        # scatter the ranks, so the hot keys are not all in the leftmost leaves
+        return map(Permutation(n, seed), zipfian_ranks(n, n, theta, seed))
+    if distribution == 'clustered':
+        return _clustered(n, seed, clusters or max(1, math.isqrt(n)))
+    raise ValueError(f"unknown distribution {distribution!r}, expected one of {', '.join(DISTRIBUTIONS)}")
+
+
+def _clustered(n, seed, clusters):
+    rnd = random.Random(seed)
+    length = -(-n // clusters)
+    # the runs are separated by random gaps of up to ten run lengths
+    bases = []
+    base = 0
+    for _ in range(clusters):
+        base += rnd.randrange(length * 10 + 1)
+        bases.append(base)
+        base += length
+    for i in range(n):
+        yield bases[i % clusters] + i // clusters
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("distribution", choices=DISTRIBUTIONS)
+    parser.add_argument("n", type=int, help="number of keys")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--theta", type=float, default=0.99, help="skew of the zipfian distribution")
+    parser.add_argument("--out", help="TSV file of (key, value) lines to write (default: standard output)")
+    args = parser.parse_args()
+    file = open(args.out, 'w') if args.out is not None else sys.stdout
+    try:
+        file.writelines(f"{k}\t{i}\n" for i, k in enumerate(generate(args.distribution, args.n, args.seed,
+                                                                      args.theta)))
+    finally:
+        if file is not sys.stdout:
+            file.close()
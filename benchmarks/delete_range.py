@@ -0,0 +1,47 @@
+"""
+BTree.delete_range against deleting the same range key by key with b_tree_delete and with delete_many, for ranges
+of a growing fraction of the keys in the middle of the tree, and the time of split and join on their own.
+"""
+import argparse
+
+from benchmarks._util import print_table, timed
+from main import BTree
+
+FRACTIONS = (0.0001, 0.001, 0.01, 0.1, 0.5)
+
+
+def build(n, t):
+    return BTree.bulk_load(((k, k) for k in range(n)), t, fill_factor=0.7)
+
+
+def run(n, t):
+    rows = []
+    for fraction in FRACTIONS:
+        width = max(1, int(n * fraction))
+        lo = (n - width) // 2
+        hi = lo + width
+        doomed = list(range(lo, hi))
+
+        tree = build(n, t)
+        elapsed_key, _ = timed(lambda: [tree.b_tree_delete(k) for k in doomed])
+        tree = build(n, t)
+        elapsed_many, _ = timed(tree.delete_many, doomed)
+        tree = build(n, t)
+        elapsed_range, _ = timed(tree.delete_range, lo, hi)
+        rows.append([width, elapsed_key * 1e3, elapsed_many * 1e3, elapsed_range * 1e3, elapsed_key / elapsed_range])
+    print(f"n = {n}, t = {t}; milliseconds to delete a range of keys in the middle of the tree")
+    print_table(["keys deleted", "b_tree_delete", "delete_many", "delete_range", "speedup vs b_tree_delete"], rows)
+
+    tree = build(n, t)
+    elapsed_split, (left, right) = timed(tree.split, n // 3)
+    elapsed_join, _ = timed(BTree.join, left, right)
+    print()
+    print(f"split at n/3: {elapsed_split * 1e6:.0f} us, join of the two parts: {elapsed_join * 1e6:.0f} us")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-n", type=int, default=1000000, help="number of keys")
+    parser.add_argument("-t", type=int, default=32, help="minimum degree")
+    args = parser.parse_args()
+    run(args.n, args.t)
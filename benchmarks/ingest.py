@@ -0,0 +1,47 @@
+"""
+Loading a TSV file: the old line-by-line loop (parse, b_tree_insert and print for every record, with the output
+sent to /dev/null) against ingest.ingest, with the pure-Python parser and, when NumPy is installed, with NumPy.
+"""
+import argparse
+import contextlib
+import os
+import tempfile
+
+import ingest
+from benchmarks._util import print_table, random_keys, timed
+from main import BTree
+
+
+def load_line_by_line(tree, file_path):
+    with open(file_path, 'r') as file, open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        for line in file:
+            key_val = line.strip().split('\t')
+            key = int(key_val[0])
+            value = int(key_val[1])
+            tree.b_tree_insert(key, value)
+            print(f"inserted ({key}, {value})")
+
+
+def run(n, t):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        file_path = os.path.join(tmp_dir, "input.tsv")
+        with open(file_path, 'w') as file:
+            file.writelines(f"{k}\t{k}\n" for k in random_keys(n))
+        loaders = [("line by line", lambda tree: load_line_by_line(tree, file_path)),
+                   ("ingest", lambda tree: ingest.ingest(tree, file_path, quiet=True, use_numpy=False))]
+        if ingest.np is not None:
+            loaders.append(("ingest, NumPy", lambda tree: ingest.ingest(tree, file_path, quiet=True, use_numpy=True)))
+        rows = []
+        for name, load in loaders:
+            elapsed, _ = timed(load, BTree(t))
+            rows.append([name, elapsed, n / elapsed])
+    print(f"n = {n}, t = {t}")
+    print_table(["loader", "seconds", "records/s"], rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-n", type=int, default=1000000, help="number of records")
+    parser.add_argument("-t", type=int, default=32, help="minimum degree")
+    args = parser.parse_args()
+    run(args.n, args.t)
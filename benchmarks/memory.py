@@ -0,0 +1,55 @@
+"""
+Memory held by a tree of n integer entries, measured with tracemalloc,
+for the default BTreeNode representation and BTree(t, compact=True).
+"""
+import argparse
+import gc
+import random
+import tracemalloc
+
+from benchmarks._util import print_table
+from main import BTree
+
+
+def traced_size(build):
+    """
+    Measure the memory that stays allocated by the object build() returns.
+    :param build: A callable creating the object to measure.
+    :return: A tuple (bytes allocated, the object).
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        obj = build()
+        gc.collect()
+        size, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return size, obj
+
+
+def build_tree(n, t, compact):
+    rnd = random.Random(n)
+    tree = BTree(t, compact=compact)
+    for _ in range(n):
+        tree.b_tree_insert(rnd.randrange(1 << 62), rnd.randrange(1 << 31))
+    return tree
+
+
+def run(sizes, degrees):
+    rows = []
+    for t in degrees:
+        for n in sizes:
+            default_size, _ = traced_size(lambda: build_tree(n, t, False))
+            compact_size, _ = traced_size(lambda: build_tree(n, t, True))
+            rows.append([t, n, default_size / n, compact_size / n, default_size / compact_size])
+    print("bytes per entry")
+    print_table(["t", "n", "default", "compact", "ratio"], rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000, 1000000])
+    parser.add_argument("--degrees", type=int, nargs="+", default=[3, 32])
+    args = parser.parse_args()
+    run(args.sizes, args.degrees)
@@ -0,0 +1,53 @@
+"""
+Per-operation cost of insert and lookup while the minimum degree t grows.
+
+With a linear scan inside a node, every node visit costs O(t), so large t makes the tree shallow
+but every visit expensive. With bisect the in-node search is O(log t) and the total cost flattens.
+The linear column repeats the lookups with the old scan for comparison.
+"""
+import argparse
+
+from benchmarks._util import print_table, random_keys, timed
+from main import BTree
+
+
+def linear_search(x, k):
+    while True:
+        i = 0
+        while i < len(x.keys) and k > x.keys[i]:
+            i = i + 1
+        if i < len(x.keys) and k == x.keys[i]:
+            return (x, i)
+        elif x.is_leaf:
+            return None
+        x = x.children[i]
+
+
+def run(n, degrees):
+    keys = random_keys(n)
+    rows = []
+    for t in degrees:
+        tree = BTree(t)
+
+        def insert_all():
+            for k in keys:
+                tree.b_tree_insert(k, k)
+
+        def search_all(search):
+            for k in keys:
+                search(tree.root, k)
+
+        insert_time, _ = timed(insert_all)
+        search_time, _ = timed(search_all, tree.b_tree_search)
+        linear_time, _ = timed(search_all, linear_search)
+        rows.append([t, insert_time / n * 1e6, search_time / n * 1e6, linear_time / n * 1e6])
+    print(f"n = {n}, times in microseconds per operation")
+    print_table(["t", "insert", "search", "search(linear)"], rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-n", type=int, default=100000, help="number of keys")
+    parser.add_argument("--degrees", type=int, nargs="+", default=[2, 3, 8, 32, 128, 512])
+    args = parser.parse_args()
+    run(args.n, args.degrees)
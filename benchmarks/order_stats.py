@@ -0,0 +1,52 @@
+"""
+Cost of BTree(t, order_stats=True) against a plain BTree: random inserts, batch inserts, and deletes of half of the
+keys, which now update the subtree sizes on their paths; and rank, select and count_range against counting with
+range, which walks every entry in between.
+"""
+import argparse
+import random
+
+from benchmarks._util import print_table, random_keys, timed
+from main import BTree
+
+QUERIES = 1000
+
+
+def run(n, t):
+    keys = random_keys(n)
+    doomed = keys[:n // 2]
+    rows = []
+    trees = {}
+    for order_stats in (False, True):
+        tree = BTree(t, order_stats=order_stats)
+        elapsed_insert, _ = timed(lambda: [tree.b_tree_insert(k, k) for k in keys])
+        elapsed_delete, _ = timed(lambda: [tree.b_tree_delete(k) for k in doomed])
+        batch = BTree(t, order_stats=order_stats)
+        elapsed_batch, _ = timed(batch.insert_many, ((k, k) for k in keys))
+        rows.append(["order_stats" if order_stats else "plain", elapsed_insert / n * 1e9,
+                     elapsed_batch / n * 1e9, elapsed_delete / len(doomed) * 1e9])
+        trees[order_stats] = batch
+    print(f"n = {n}, t = {t}; nanoseconds per key")
+    print_table(["tree", "insert", "insert_many", "delete"], rows)
+
+    tree = trees[True]
+    rnd = random.Random(1)
+    bounds = [sorted((rnd.randrange(n), rnd.randrange(n))) for _ in range(QUERIES)]
+    positions = [rnd.randrange(n) for _ in range(QUERIES)]
+    elapsed_rank, _ = timed(lambda: [tree.rank(lo) for lo, _ in bounds])
+    elapsed_select, _ = timed(lambda: [tree.select(i) for i in positions])
+    elapsed_count, _ = timed(lambda: [tree.count_range(lo, hi) for lo, hi in bounds])
+    elapsed_scan, _ = timed(lambda: [sum(1 for _ in tree.range(lo, hi)) for lo, hi in bounds])
+    print()
+    print_table(["query", "us per query"],
+                [["rank", elapsed_rank / QUERIES * 1e6], ["select", elapsed_select / QUERIES * 1e6],
+                 ["count_range", elapsed_count / QUERIES * 1e6],
+                 ["count with range (n/3 entries on average)", elapsed_scan / QUERIES * 1e6]])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-n", type=int, default=200000, help="number of keys")
+    parser.add_argument("-t", type=int, default=32, help="minimum degree")
+    args = parser.parse_args()
+    run(args.n, args.t)
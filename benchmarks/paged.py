@@ -0,0 +1,45 @@
+"""
+Paged B-tree: time to build and flush a page file, to reopen it, and to run point lookups on the reopened file.
+Reopening only maps the file, so its cost does not grow with the size of the index.
+"""
+import argparse
+import os
+import random
+import tempfile
+
+from benchmarks._util import print_table, timed
+from pager import PagedBTree
+
+
+def run(n, t, lookups):
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "index.db")
+        build_time, tree = timed(PagedBTree.bulk_load, ((k, k) for k in range(n)), t, path=path)
+        close_time, _ = timed(tree.close)
+        rows.append(["bulk load", build_time])
+        rows.append(["flush and close", close_time])
+        rows.append(["file size (MB)", os.path.getsize(path) / 1e6])
+
+        open_time, tree = timed(PagedBTree.open, path)
+        rows.append(["open", open_time])
+        keys = [random.Random(0).randrange(n) for _ in range(lookups)]
+
+        def search_all():
+            for k in keys:
+                tree.b_tree_search(tree.root, k)
+
+        search_time, _ = timed(search_all)
+        rows.append([f"{lookups} lookups", search_time])
+        tree.close()
+    print(f"n = {n}, t = {t}, times in seconds")
+    print_table(["step", "value"], rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-n", type=int, default=1000000, help="number of keys")
+    parser.add_argument("-t", type=int, default=64, help="minimum degree")
+    parser.add_argument("--lookups", type=int, default=10000)
+    args = parser.parse_args()
+    run(args.n, args.t, args.lookups)
@@ -0,0 +1,68 @@
+"""
+Range queries: BTree.range against a full in-order walk of the tree filtered to the range,
+and paging through the whole tree with a cursor against building the full list of entries.
+"""
+import argparse
+import tracemalloc
+
+from benchmarks._util import print_table, random_keys, timed
+from main import BTree
+
+
+def walk_range(tree, lo, hi):
+    """
+    The only option before range(): visit every node and keep the entries inside [lo, hi).
+    """
+    result = []
+    stack = [tree.root]
+    while stack:
+        node = stack.pop()
+        result.extend((k, v) for k, v in zip(node.keys, node.values) if lo <= k < hi)
+        stack.extend(node.children)
+    result.sort()
+    return result
+
+
+def peak_memory(fn):
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+def run(n, t, page_size):
+    tree = BTree(t)
+    for k in random_keys(n):
+        tree.b_tree_insert(k, k)
+    rows = []
+    for width in (10, 1000, 100000, n):
+        lo = (n - width) // 2
+        range_time, _ = timed(lambda: sum(1 for _ in tree.range(lo, lo + width)))
+        walk_time, _ = timed(walk_range, tree, lo, lo + width)
+        rows.append([width, range_time * 1000, walk_time * 1000])
+    print(f"n = {n}, t = {t}, milliseconds per query")
+    print_table(["keys in range", "range()", "full walk"], rows)
+
+    def page_through():
+        cursor = tree.cursor().seek()
+        while cursor.fetch(page_size):
+            pass
+
+    print()
+    print(f"reading all {n} entries, peak traced memory in bytes")
+    print_table(["method", "peak memory"], [
+        [f"cursor.fetch({page_size})", peak_memory(page_through)],
+        ["list(tree)", peak_memory(lambda: list(tree))],
+    ])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-n", type=int, default=1000000, help="number of keys")
+    parser.add_argument("-t", type=int, default=32, help="minimum degree")
+    parser.add_argument("--page-size", type=int, default=1000)
+    args = parser.parse_args()
+    run(args.n, args.t, args.page_size)
@@ -0,0 +1,99 @@
+"""
+Throughput of the loop-based search, insert and delete paths of BTree
+against the recursive implementations they replaced.
+"""
+import argparse
+from bisect import bisect_left, bisect_right
+
+from benchmarks._util import print_table, random_keys, timed
+from main import BTree
+
+
+class RecursiveBTree(BTree):
+    """
+    BTree with the recursive hot paths, kept for comparison. It produces exactly the same tree shapes.
+    """
+
+    def b_tree_search(self, x, k):
+        i = bisect_left(x.keys, k)
+        if i < len(x.keys) and k == x.keys[i]:
+            return (x, i)
+        elif x.is_leaf:
+            return None
+        else:
+            return self.b_tree_search(x.children[i], k)
+
+    def _b_tree_insert_nonfull(self, x, k, v):
+        i = bisect_right(x.keys, k)
+        if x.is_leaf:
+            x.keys.insert(i, k)
+            x.values.insert(i, v)
+        else:
+            if len(x.children[i].keys) == 2 * self.t - 1:
+                self._b_tree_split_child(x, i)
+                if k > x.keys[i]:
+                    i = i + 1
+            self._b_tree_insert_nonfull(x.children[i], k, v)
+
+    def _b_tree_delete(self, x, k):
+        i = bisect_left(x.keys, k)
+        if i < len(x.keys) and x.keys[i] == k:
+            if x.is_leaf:
+                x.keys.pop(i)
+                x.values.pop(i)
+            else:
+                if len(x.children[i].keys) >= self.t:
+                    node_pred = self._pred(x.children[i])
+                    x.keys[i], x.values[i] = node_pred
+                    self._b_tree_delete(x.children[i], node_pred[0])
+                elif len(x.children[i+1].keys) >= self.t:
+                    node_pred = self._succ(x.children[i+1])
+                    x.keys[i], x.values[i] = node_pred
+                    self._b_tree_delete(x.children[i+1], node_pred[0])
+                else:
+                    self._merge(x, i)
+                    self._b_tree_delete(x.children[i], k)
+        else:
+            if x.is_leaf:
+                return
+            if len(x.children[i].keys) < self.t:
+                i = self._fix_shortage(x, i)
+            self._b_tree_delete(x.children[i], k)
+
+
+def run(n, degrees):
+    keys = random_keys(n)
+    delete_keys = random_keys(n, seed=1)
+    rows = []
+    for t in degrees:
+        row = [t]
+        for tree_class in (RecursiveBTree, BTree):
+            tree = tree_class(t)
+
+            def insert_all():
+                for k in keys:
+                    tree.b_tree_insert(k, k)
+
+            def search_all():
+                for k in keys:
+                    tree.b_tree_search(tree.root, k)
+
+            def delete_all():
+                for k in delete_keys:
+                    tree.b_tree_delete(k)
+
+            for op in (insert_all, search_all, delete_all):
+                elapsed, _ = timed(op)
+                row.append(n / elapsed / 1000)
+        rows.append(row)
+    print(f"n = {n}, thousands of operations per second")
+    print_table(["t", "insert(rec)", "search(rec)", "delete(rec)", "insert(loop)", "search(loop)", "delete(loop)"],
+                rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-n", type=int, default=200000, help="number of keys")
+    parser.add_argument("--degrees", type=int, nargs="+", default=[2, 3, 16, 64])
+    args = parser.parse_args()
+    run(args.n, args.degrees)
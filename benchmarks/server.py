@@ -0,0 +1,81 @@
+"""
+Load generator for server.BTreeServer: starts the server in a separate process on a Unix socket, preloads it, and
+runs concurrent client tasks that keep requests in flight over a pooled, pipelined BTreeClient. Reports throughput
+and p50/p99 request latency for a read-only, a read-heavy and a write-heavy workload.
+"""
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks._util import print_table
+from client import BTreeClient
+
+
+def percentile(sorted_values, p):
+    return sorted_values[min(len(sorted_values) - 1, int(p / 100 * len(sorted_values)))]
+
+
+async def generate(address, n, ops, concurrency, pool_size, write_ratio, seed):
+    latencies = []
+
+    async def worker(client, worker_ops, rnd):
+        for _ in range(worker_ops):
+            k = rnd.randrange(2 * n)
+            start = time.perf_counter()
+            if rnd.random() < write_ratio:
+                if rnd.random() < 0.5:
+                    await client.put(k, k)
+                else:
+                    await client.delete(k)
+            else:
+                await client.get(k)
+            latencies.append(time.perf_counter() - start)
+
+    async with BTreeClient(address, pool_size) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(client, ops // concurrency, random.Random(seed + i))
+                               for i in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    latencies.sort()
+    return len(latencies) / elapsed, percentile(latencies, 50), percentile(latencies, 99)
+
+
+def run(n, t, ops, concurrency, pool_size):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        data = os.path.join(tmp_dir, "data.tsv")
+        with open(data, 'w') as file:
+            file.writelines(f"{2 * k}\t{k}\n" for k in range(n))
+        address = os.path.join(tmp_dir, "btree.sock")
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        server = subprocess.Popen([sys.executable, os.path.join(root, "server.py"), "--unix", address,
+                                   "-t", str(t), "--load", data])
+        try:
+            while not os.path.exists(address):
+                if server.poll() is not None:
+                    raise RuntimeError("the server did not start")
+                time.sleep(0.05)
+            rows = []
+            for name, write_ratio in [("read-only", 0.0), ("read-heavy", 0.05), ("write-heavy", 0.5)]:
+                throughput, p50, p99 = asyncio.run(generate(address, n, ops, concurrency, pool_size, write_ratio, 0))
+                rows.append([name, throughput, p50 * 1e6, p99 * 1e6])
+        finally:
+            server.terminate()
+            server.wait()
+    print(f"n = {n}, t = {t}, {ops} requests, {concurrency} concurrent tasks, {pool_size} connections")
+    print_table(["workload", "requests/s", "p50 us", "p99 us"], rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-n", type=int, default=100000, help="number of keys loaded into the server")
+    parser.add_argument("-t", type=int, default=32, help="minimum degree")
+    parser.add_argument("--ops", type=int, default=100000, help="number of requests per workload")
+    parser.add_argument("--concurrency", type=int, default=64, help="client tasks with a request in flight")
+    parser.add_argument("--pool-size", type=int, default=4, help="connections in the client pool")
+    args = parser.parse_args()
+    run(args.n, args.t, args.ops, args.concurrency, args.pool_size)
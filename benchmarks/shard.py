@@ -0,0 +1,44 @@
+"""
+Scaling of ShardedBTree across cores: bulk load, batched inserts and batched lookups for several shard counts,
+against a single BTree in this process. Every request carries a whole batch, so the time includes pickling the
+batch and the reply through the pipes.
+"""
+import argparse
+import os
+
+from benchmarks._util import print_table, random_keys, timed
+from main import BTree
+from shard import ShardedBTree
+
+
+def run(n, t, batch, shard_counts):
+    keys = random_keys(n)
+    pairs = sorted((2 * k, k) for k in keys)
+    extra = [(2 * k + 1, k) for k in keys[:n // 2]]  # odd keys, spread over every shard
+    lookups = [2 * k for k in keys]
+    batches = [lookups[i:i + batch] for i in range(0, n, batch)]
+    insert_batches = [extra[i:i + batch] for i in range(0, len(extra), batch)]
+
+    rows = []
+    elapsed_load, tree = timed(BTree.bulk_load, pairs, t)
+    elapsed_insert, _ = timed(lambda: [tree.insert_many(b) for b in insert_batches])
+    elapsed_lookup, _ = timed(lambda: [tree.get_many(b) for b in batches])
+    rows.append(["BTree", 1, n / elapsed_load, len(extra) / elapsed_insert, n / elapsed_lookup])
+    for shards in shard_counts:
+        elapsed_load, tree = timed(ShardedBTree.bulk_load, pairs, t, shards, max_shard_size=n)
+        with tree:
+            elapsed_insert, _ = timed(lambda: [tree.insert_many(b) for b in insert_batches])
+            elapsed_lookup, _ = timed(lambda: [tree.get_many(b) for b in batches])
+        rows.append(["ShardedBTree", shards, n / elapsed_load, len(extra) / elapsed_insert, n / elapsed_lookup])
+    print(f"n = {n}, t = {t}, batches of {batch}, {os.cpu_count()} CPUs")
+    print_table(["tree", "shards", "load/s", "inserts/s", "lookups/s"], rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-n", type=int, default=1000000, help="number of keys")
+    parser.add_argument("-t", type=int, default=32, help="minimum degree")
+    parser.add_argument("--batch", type=int, default=100000, help="keys per batch")
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+    run(args.n, args.t, args.batch, args.shards)
@@ -0,0 +1,74 @@
+"""
+Write overhead of CowBTree against the mutable BTree: random inserts followed by deletes of half of the keys,
+without snapshots, and with a snapshot taken every --every writes (the previous one is released, like a reporting
+job that reads one snapshot at a time) or kept until the end.
+"""
+import argparse
+
+from benchmarks._util import print_table, random_keys, timed
+from main import BTree
+from snapshot import CowBTree
+
+
+def run(n, t, every):
+    keys = random_keys(n)
+    doomed = keys[:n // 2]
+    rows = []
+    baseline = None
+    for name, make, mode in [("BTree", BTree, None), ("CowBTree", CowBTree, None),
+                             (f"CowBTree, rolling snapshot every {every}", CowBTree, 'rolling'),
+                             (f"CowBTree, keeping a snapshot every {every}", CowBTree, 'keep')]:
+        tree = make(t)
+        snapshots = []
+
+        def write(k, op):
+            op(k)
+            write.count += 1
+            if mode is not None and write.count % every == 0:
+                if mode == 'rolling' and snapshots:
+                    snapshots.pop().release()
+                snapshots.append(tree.snapshot())
+
+        write.count = 0
+
+        def insert_all():
+            for k in keys:
+                write(k, lambda k: tree.b_tree_insert(k, k))
+
+        def delete_half():
+            for k in doomed:
+                write(k, tree.b_tree_delete)
+
+        elapsed_insert, _ = timed(insert_all)
+        elapsed_delete, _ = timed(delete_half)
+        writes = len(keys) + len(doomed)
+        elapsed = elapsed_insert + elapsed_delete
+        if baseline is None:
+            baseline = elapsed
+        copies = getattr(tree, 'copies', 0)
+        rows.append([name, len(keys) / elapsed_insert, len(doomed) / elapsed_delete, elapsed / baseline,
+                     copies / writes])
+        for snapshot in snapshots:
+            snapshot.release()
+    print(f"n = {n}, t = {t}")
+    print_table(["tree", "inserts/s", "deletes/s", "time vs BTree", "copies per write"], rows)
+
+    tree = CowBTree(t)
+    for k in keys:
+        tree.b_tree_insert(k, k)
+    elapsed_snapshot, snapshot = timed(tree.snapshot)
+    elapsed_tree, _ = timed(lambda: sum(1 for _ in tree))
+    elapsed_view, _ = timed(lambda: sum(1 for _ in snapshot))
+    print()
+    print(f"snapshot() of {n} keys: {elapsed_snapshot * 1e6:.1f} us; full scan: tree {elapsed_tree:.3f} s, "
+          f"snapshot {elapsed_view:.3f} s")
+    snapshot.release()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-n", type=int, default=1000000, help="number of keys")
+    parser.add_argument("-t", type=int, default=32, help="minimum degree")
+    parser.add_argument("--every", type=int, default=1000, help="writes between two snapshots")
+    args = parser.parse_args()
+    run(args.n, args.t, args.every)
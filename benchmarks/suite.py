@@ -0,0 +1,219 @@
+"""
+Reproducible benchmark suite: insert, search, delete, mixed and range workloads over a sweep of t, data sizes and
+key distributions, for main.BTree and the keys-only implementation in source.py.
+
+Every workload starts from keys of benchmarks.datagen with fixed seeds, so two runs execute exactly the same
+operations, and the best of --repeat runs is kept. Results are printed as a table and, with --out, written as JSON;
+--compare prints the change of every result against an earlier JSON file.
+
+    python -m benchmarks.suite --sizes 1000 100000 --degrees 3 32 --out results.json
+    python -m benchmarks.suite --sizes 1000 100000 --degrees 3 32 --compare results.json
+
+source.py has no search and no range scan. The suite searches its nodes with bisect, like BTree does, and scans
+a range with a recursive in-order walk that skips subtrees outside the range.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+from bisect import bisect_left
+
+import source
+from benchmarks._util import print_table, timed
+from benchmarks.datagen import DISTRIBUTIONS, generate
+from main import BTree
+
+WORKLOADS = ('insert', 'search', 'delete', 'mixed', 'range')
+RANGE_QUERIES = 1000
+RANGE_WIDTH = 100
+
+
+class SourceTree:
+    """
+    The functions of source.py behind the interface of BTree that the workloads use.
+    """
+
+    def __init__(self, t):
+        self.t = t
+        self.root = source.init_b_tree(t)
+
+    def b_tree_insert(self, k, v):
+        self.root = source.b_tree_insert(self.root, k)
+
+    def b_tree_search(self, x, k):
+        while True:
+            i = bisect_left(x.keys, k)
+            if i < len(x.keys) and x.keys[i] == k:
+                return x, i
+            if x.leaf:
+                return None
+            x = x.children[i]
+
+    def b_tree_delete(self, k):
+        self.root = source.b_tree_delete(self.root, k) or source.init_b_tree(self.t)
+
+    def range(self, lo, hi):
+        out = []
+
+        def walk(x):
+            i = bisect_left(x.keys, lo)
+            end = bisect_left(x.keys, hi)
+            if x.leaf:
+                out.extend(x.keys[i:end])
+                return
+            for j in range(i, end):
+                walk(x.children[j])
+                out.append(x.keys[j])
+            walk(x.children[end])
+
+        walk(self.root)
+        return out
+
+
+IMPLEMENTATIONS = {'BTree': BTree, 'source': SourceTree}
+
+
+def load(make, t, keys):
+    tree = make(t)
+    for k in keys:
+        tree.b_tree_insert(k, k)
+    return tree
+
+
+def run_workload(workload, make, t, n, distribution, seed):
+    """
+    Run one workload on a fresh tree.
+    :return: A tuple (number of operations, seconds). Building the tree a workload starts from is not timed.
+    """
+    keys = list(generate(distribution, n, seed))
+    if workload == 'insert':
+        elapsed, _ = timed(load, make, t, keys)
+        return n, elapsed
+    tree = load(make, t, keys)
+    if workload == 'search':
+        queries = list(generate(distribution, n, seed + 1))
+
+        def search():
+            root = tree.root
+            for k in queries:
+                tree.b_tree_search(root, k)
+
+        return n, timed(search)[0]
+    if workload == 'delete':
+        doomed = keys[:n // 2]
+
+        def delete():
+            for k in doomed:
+                tree.b_tree_delete(k)
+
+        return len(doomed), timed(delete)[0]
+    if workload == 'mixed':
+        # 50% searches, 25% inserts and 25% deletes of keys from a second stream of the same distribution
+        rnd = random.Random(seed)
+        ops = [(rnd.random(), k) for k in generate(distribution, n, seed + 2)]
+
+        def mixed():
+            for r, k in ops:
+                if r < 0.5:
+                    tree.b_tree_search(tree.root, k)
+                elif r < 0.75:
+                    tree.b_tree_insert(k, k)
+                else:
+                    tree.b_tree_delete(k)
+
+        return n, timed(mixed)[0]
+    if workload == 'range':
+        rnd = random.Random(seed)
+        starts = [rnd.randrange(max(keys) + 1) for _ in range(RANGE_QUERIES)]
+        def scan():
+            for lo in starts:
+                list(tree.range(lo, lo + RANGE_WIDTH))
+
+        return RANGE_QUERIES, timed(scan)[0]
+    raise ValueError(f"unknown workload {workload!r}")
+
+
+def environment():
+    """
+    :return: A dict describing where the results were measured.
+    """
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {'python': sys.version.split()[0], 'implementation': platform.python_implementation(),
+            'machine': platform.machine(), 'system': platform.system(), 'cpus': os.cpu_count(), 'commit': commit}
+
+
+def run(sizes, degrees, distributions, workloads, implementations, repeat=3, seed=0):
+    """
+    Run every combination of the parameters.
+    :return: A list of result dicts, one per combination, in a fixed order.
+    """
+    results = []
+    for n in sizes:
+        for distribution in distributions:
+            for t in degrees:
+                for workload in workloads:
+                    for name in implementations:
+                        runs = [run_workload(workload, IMPLEMENTATIONS[name], t, n, distribution, seed)
+                                for _ in range(repeat)]
+                        count = runs[0][0]
+                        best = min(seconds for _, seconds in runs)
+                        results.append({'implementation': name, 'workload': workload, 'distribution': distribution,
+                                        'n': n, 't': t, 'operations': count, 'seconds': best,
+                                        'operations_per_second': count / best if best else None})
+                        print(f"{name} {workload} {distribution} n={n} t={t}: {best:.4f}s", file=sys.stderr)
+    return results
+
+
+def _key(result):
+    return result['implementation'], result['workload'], result['distribution'], result['n'], result['t']
+
+
+def compare(results, baseline):
+    """
+    :param results: The results of this run.
+    :param baseline: The results of an earlier run.
+    :return: Table rows with the time of both runs and their ratio, for every result present in both.
+    """
+    before = {_key(r): r for r in baseline}
+    rows = []
+    for result in results:
+        old = before.get(_key(result))
+        if old is not None:
+            rows.append([*_key(result), old['seconds'], result['seconds'], result['seconds'] / old['seconds']])
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000],
+                        help="numbers of keys, up to 10^8 if the memory allows")
+    parser.add_argument("--degrees", type=int, nargs="+", default=[2, 3, 8, 32, 128], help="minimum degrees")
+    parser.add_argument("--distributions", nargs="+", choices=DISTRIBUTIONS, default=list(DISTRIBUTIONS))
+    parser.add_argument("--workloads", nargs="+", choices=WORKLOADS, default=list(WORKLOADS))
+    parser.add_argument("--implementations", nargs="+", choices=list(IMPLEMENTATIONS), default=list(IMPLEMENTATIONS))
+    parser.add_argument("--repeat", type=int, default=3, help="runs per combination; the fastest is kept")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="JSON file of an earlier run to compare with")
+    args = parser.parse_args()
+    results = run(args.sizes, args.degrees, args.distributions, args.workloads, args.implementations, args.repeat,
+                  args.seed)
+    print_table(["implementation", "workload", "distribution", "n", "t", "ops/s"],
+                [[r['implementation'], r['workload'], r['distribution'], r['n'], r['t'], r['operations_per_second']]
+                 for r in results])
+    if args.out is not None:
+        with open(args.out, 'w') as file:
+            json.dump({'environment': environment(), 'parameters': vars(args), 'results': results}, file, indent=1)
+    if args.compare is not None:
+        with open(args.compare) as file:
+            baseline = json.load(file)['results']
+        print()
+        print_table(["implementation", "workload", "distribution", "n", "t", "before s", "after s", "after/before"],
+                    compare(results, baseline))
@@ -0,0 +1,56 @@
+"""
+Verifying a loaded tree against its input file: the old way (look up every key, write a '_created' copy and compare
+the two files line by line) against verify.verify, which compares checksums of one pass over the file and one
+in-order pass over the tree, and verify.lookup, which looks up the keys of the file in batches.
+"""
+import argparse
+import os
+import tempfile
+
+import ingest
+import verify
+from benchmarks._util import print_table, random_keys, timed
+from main import BTree, UserInterface
+
+
+def verify_by_created_file(tree, file_path):
+    created_path = UserInterface._get_new_file_name(file_path)
+    with open(file_path, 'r') as file, open(created_path, 'w') as file_to_write:
+        for line in file:
+            key = int(line.strip().split('\t')[0])
+            result = tree.b_tree_search(tree.root, key)
+            if result is not None:
+                x, i = result
+                file_to_write.write(f"{x.keys[i]}\t{x.values[i]}\n")
+    with open(file_path, 'r') as file1, open(created_path, 'r') as file2:
+        for line1, line2 in zip(file1, file2):
+            if line1.strip() != line2.strip():
+                return False
+        return next(file1, None) is None and next(file2, None) is None
+
+
+def run(n, t):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        file_path = os.path.join(tmp_dir, "input.tsv")
+        with open(file_path, 'w') as file:
+            file.writelines(f"{k}\t{k}\n" for k in random_keys(n))
+        tree = BTree(t)
+        ingest.ingest(tree, file_path, quiet=True)
+        rows = []
+        for name, check in [("created file", lambda: verify_by_created_file(tree, file_path)),
+                            ("checksum", lambda: verify.verify(tree, file_path)['ok']),
+                            ("lookups", lambda: verify.lookup(tree, file_path)['ok']),
+                            ("checksum + created file",
+                             lambda: verify.verify(tree, file_path, os.path.join(tmp_dir, "created.tsv"))['ok'])]:
+            elapsed, ok = timed(check)
+            rows.append([name, ok, elapsed, n / elapsed])
+    print(f"n = {n}, t = {t}")
+    print_table(["method", "ok", "seconds", "records/s"], rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-n", type=int, default=1000000, help="number of records")
+    parser.add_argument("-t", type=int, default=32, help="minimum degree")
+    args = parser.parse_args()
+    run(args.n, args.t)
@@ -0,0 +1,60 @@
+"""
+Cost of durability for PagedBTree: inserts and deletes per second without a write-ahead log and with one under
+each fsync policy ('never', 'interval' with group commit, 'always'), plus the log commits, fsyncs and the
+checkpoint time at the end.
+"""
+import argparse
+import os
+import random
+import tempfile
+
+from benchmarks._util import print_table, timed
+from pager import PagedBTree
+
+POLICIES = [None, 'never', 'interval', 'always']
+
+
+def run(ops, t, cache_size, interval_ms, delete_ratio):
+    rnd = random.Random(0)
+    keys = rnd.sample(range(ops * 4), ops)
+    workload = []
+    inserted = []
+    for k in keys:
+        if inserted and rnd.random() < delete_ratio:
+            workload.append((False, inserted.pop(rnd.randrange(len(inserted)))))
+        else:
+            workload.append((True, k))
+            inserted.append(k)
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for policy in POLICIES:
+            path = os.path.join(tmp_dir, f"{policy}.db")
+            tree = PagedBTree(t, path, cache_size, wal_sync=policy, wal_interval_ms=interval_ms)
+
+            def run_workload():
+                for is_insert, k in workload:
+                    if is_insert:
+                        tree.b_tree_insert(k, k)
+                    else:
+                        tree.b_tree_delete(k)
+
+            elapsed, _ = timed(run_workload)
+            wal = tree.store.wal
+            commits, syncs = (wal.commits, wal.syncs) if wal is not None else ("-", "-")
+            checkpoint, _ = timed(tree.flush)
+            tree.close()
+            rows.append([policy or "no log", len(workload) / elapsed, commits, syncs, checkpoint])
+    print(f"{ops} operations, t = {t}, pool size {cache_size}, {delete_ratio:.0%} deletes, "
+          f"interval {interval_ms} ms")
+    print_table(["fsync policy", "ops/s", "commits", "fsyncs", "checkpoint s"], rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--ops", type=int, default=20000, help="number of operations")
+    parser.add_argument("-t", type=int, default=32, help="minimum degree")
+    parser.add_argument("--cache-size", type=int, default=4096)
+    parser.add_argument("--interval-ms", type=int, default=10)
+    parser.add_argument("--delete-ratio", type=float, default=0.2)
+    args = parser.parse_args()
+    run(args.ops, args.t, args.cache_size, args.interval_ms, args.delete_ratio)
@@ -0,0 +1,474 @@
+"""
+A B+-tree with the interface of BTree.
+
+Every entry lives in a leaf, and the leaves are linked in both directions in key order. Internal nodes only hold
+separator keys and children, so they need no values list, and a delete never swaps in a predecessor or successor:
+it removes the entry from its leaf and repairs underfull nodes on the way back up. A scan descends once to its
+first leaf and then follows the leaf links, without visiting an internal node again.
+
+Separators are copies of keys: every key in children[i] is <= keys[i] <= every key in children[i + 1].
+A separator may outlive the entry it was copied from, which keeps deletes local to one leaf.
+"""
+from bisect import bisect_left, bisect_right
+from itertools import islice
+from operator import itemgetter
+
+
+class BPlusLeaf:
+    __slots__ = ('keys', 'values', 'prev', 'next')
+    is_leaf = True
+    children = ()
+
+    def __init__(self, keys, values, prev=None, next=None):
+        """
+        :param keys: A sorted list of keys.
+        :param values: A list of values, where values[i] belongs to keys[i].
+        :param prev: The leaf holding the next smaller keys, or None.
+        :param next: The leaf holding the next larger keys, or None.
+        """
+        self.keys = keys
+        self.values = values
+        self.prev = prev
+        self.next = next
+
+
+class BPlusInternal:
+    __slots__ = ('keys', 'children')
+    is_leaf = False
+
+    def __init__(self, keys, children):
+        """
+        :param keys: A sorted list of separator keys.
+        :param children: A list of len(keys) + 1 children.
+        """
+        self.keys = keys
+        self.children = children
+
+
+def _group_sizes(n, low, high, target):
+    """
+    Cut n items into groups of between low and high items each, as close to target as possible.
+    A single group may be smaller than low; it becomes the root.
+    :return: A list with the number of items of each group.
+    """
+    g = max(1, -(-n // high), min(-(-n // target), n // max(low, 1)))
+    base, extra = divmod(n, g)
+    return [base + 1 if j < extra else base for j in range(g)]
+
+
+class BPlusTree:
+    def __init__(self, t, internal_t=None):
+        """
+        Create an empty tree.
+
+        :param t: The minimum degree of the leaves. Every leaf other than the root holds between t-1 and 2t-1 entries.
+        :param internal_t: The minimum degree of the internal nodes, t if None. Every internal node other than the
+                root has between internal_t and 2*internal_t children. Internal nodes carry no values, so in the
+                same memory (or the same page) they can have a higher degree than the leaves.
+        """
+        if t < 2 or (internal_t is not None and internal_t < 2):
+            raise ValueError("the minimum degree must be at least 2")
+        self.t = t
+        self.internal_t = internal_t if internal_t is not None else t
+        self.root = BPlusLeaf([], [])
+
+    @classmethod
+    def bulk_load(cls, iterable, t, fill_factor=1.0, **kwargs):
+        """
+        Build a tree bottom-up from (key, value) pairs that are already sorted by key, see BTree.bulk_load.
+
+        :param iterable: (key, value) pairs in non-decreasing key order.
+        :param t: The minimum degree of the leaves.
+        :param fill_factor: Fraction of the slots to fill in every node, clamped to the minimum fill.
+        :param kwargs: Further keyword arguments of the constructor, e.g. internal_t.
+        :return: A new BPlusTree holding all pairs.
+        """
+        if not 0 < fill_factor <= 1:
+            raise ValueError(f"fill_factor must be in (0, 1], got {fill_factor}")
+        keys = []
+        values = []
+        for k, v in iterable:
+            if keys and k < keys[-1]:
+                raise ValueError(f"bulk_load input is not sorted: {k} comes after {keys[-1]}")
+            keys.append(k)
+            values.append(v)
+        tree = cls(t, **kwargs)
+        if not keys:
+            return tree
+        level = []
+        lows = []  # the smallest key below each node of the level
+        pos = 0
+        target = max(t - 1, round(fill_factor * (2 * t - 1)))
+        for size in _group_sizes(len(keys), t - 1, 2 * t - 1, target):
+            leaf = BPlusLeaf(keys[pos:pos + size], values[pos:pos + size], level[-1] if level else None)
+            if level:
+                level[-1].next = leaf
+            level.append(leaf)
+            lows.append(keys[pos])
+            pos += size
+        internal_t = tree.internal_t
+        target = max(internal_t, round(fill_factor * 2 * internal_t))
+        while len(level) > 1:
+            children, child_lows = level, lows
+            level = []
+            lows = []
+            pos = 0
+            for size in _group_sizes(len(children), internal_t, 2 * internal_t, target):
+                level.append(BPlusInternal(child_lows[pos + 1:pos + size], children[pos:pos + size]))
+                lows.append(child_lows[pos])
+                pos += size
+        tree.root = level[0]
+        return tree
+
+    def _find_leaf(self, x, k):
+        """
+        Descend from x to the leaf that k is routed to. Keys equal to a separator go right.
+        """
+        while not x.is_leaf:
+            x = x.children[bisect_right(x.keys, k)]
+        return x
+
+    def b_tree_search(self, x, k):
+        """
+        Search the subtree of x for key k.
+        :param x: A root node of a subtree.
+        :param k: A key to be searched for.
+        :return: A tuple (leaf, index) of the entry with key k, or None if k is not found.
+        """
+        x = self._find_leaf(x, k)
+        i = bisect_left(x.keys, k)
+        if i < len(x.keys) and x.keys[i] == k:
+            return x, i
+        # equal keys may continue at the end of the previous leaf if they were split apart
+        if i == 0 and x.prev is not None and x.prev.keys and x.prev.keys[-1] == k:
+            return x.prev, len(x.prev.keys) - 1
+        return None
+
+    def get(self, k, default=None):
+        """
+        :return: The value of key k, or default if k is not in the tree.
+        """
+        found = self.b_tree_search(self.root, k)
+        return found[0].values[found[1]] if found is not None else default
+
+    def _split_child(self, x, i):
+        """
+        Split the full child x.children[i] in two and add the new right half as x.children[i + 1].
+        A leaf keeps its smaller half and copies the first key of the right half up as the separator;
+        an internal node moves its median key up, as in BTree.
+        """
+        y = x.children[i]
+        if y.is_leaf:
+            t = self.t
+            z = BPlusLeaf(y.keys[t:], y.values[t:], y, y.next)
+            if y.next is not None:
+                y.next.prev = z
+            y.next = z
+            del y.keys[t:]
+            del y.values[t:]
+            separator = z.keys[0]
+        else:
+            t = self.internal_t
+            z = BPlusInternal(y.keys[t:], y.children[t:])
+            separator = y.keys[t - 1]
+            del y.keys[t - 1:]
+            del y.children[t:]
+        x.keys.insert(i, separator)
+        x.children.insert(i + 1, z)
+
+    def _is_full(self, x):
+        return len(x.keys) == (2 * self.t - 1 if x.is_leaf else 2 * self.internal_t - 1)
+
+    def b_tree_insert(self, k, v):
+        """
+        Insert key k and value v in a single pass down the tree, splitting every full node on the way
+        before descending into it. Equal keys stay in insertion order.
+        :param k: A key to insert.
+        :param v: A value to insert.
+        :return: None. This function performs its operation without returning a value.
+        """
+        x = self.root
+        if self._is_full(x):
+            x = self.root = BPlusInternal([], [x])
+            self._split_child(x, 0)
+        while not x.is_leaf:
+            i = bisect_right(x.keys, k)
+            if self._is_full(x.children[i]):
+                self._split_child(x, i)
+                if not k < x.keys[i]:
+                    i += 1
+            x = x.children[i]
+        i = bisect_right(x.keys, k)
+        x.keys.insert(i, k)
+        x.values.insert(i, v)
+
+    def delete(self, k):
+        """
+        Delete one entry with key k. The path from the root is recorded on the way down; after the entry is removed
+        from its leaf, every node on the path that fell below the minimum borrows from or merges with a sibling.
+        :param k: A key to delete.
+        :return: True if an entry was deleted, False if k was not found.
+        """
+        path = []  # [node, index of the child on the path] frames, root first
+        x = self.root
+        while not x.is_leaf:
+            i = bisect_right(x.keys, k)
+            path.append([x, i])
+            x = x.children[i]
+        i = bisect_left(x.keys, k)
+        if not (i < len(x.keys) and x.keys[i] == k):
+            if i > 0 or x.prev is None or not x.prev.keys or x.prev.keys[-1] != k:
+                return False
+            # the key is at the end of the previous leaf: move the path to the rightmost leaf of the left neighbour
+            d = len(path) - 1
+            while path[d][1] == 0:
+                d -= 1
+            del path[d + 1:]
+            path[d][1] -= 1
+            x = path[d][0].children[path[d][1]]
+            while not x.is_leaf:
+                path.append([x, len(x.children) - 1])
+                x = x.children[-1]
+            i = len(x.keys) - 1
+        del x.keys[i]
+        del x.values[i]
+        while path:
+            if len(x.keys) >= (self.t - 1 if x.is_leaf else self.internal_t - 1):
+                return True
+            x, i = path.pop()
+            self._fix_shortage(x, i)
+        if not self.root.is_leaf and not self.root.keys:
+            self.root = self.root.children[0]
+        return True
+
+    def b_tree_delete(self, k):
+        """
+        Delete key k and its value from the tree.
+        :param k: A key to delete.
+        :return: None. This function performs its operation without returning a value.
+        """
+        self.delete(k)
+
+    def _fix_shortage(self, x, i):
+        """
+        Refill the underfull child x.children[i] from a sibling that can spare an entry, or merge it with a sibling.
+        """
+        me = x.children[i]
+        minimum = self.t - 1 if me.is_leaf else self.internal_t - 1
+        if i > 0 and len(x.children[i - 1].keys) > minimum:
+            left = x.children[i - 1]
+            if me.is_leaf:
+                me.keys.insert(0, left.keys.pop())
+                me.values.insert(0, left.values.pop())
+                x.keys[i - 1] = me.keys[0]
+            else:
+                me.keys.insert(0, x.keys[i - 1])
+                x.keys[i - 1] = left.keys.pop()
+                me.children.insert(0, left.children.pop())
+        elif i < len(x.keys) and len(x.children[i + 1].keys) > minimum:
+            right = x.children[i + 1]
+            if me.is_leaf:
+                me.keys.append(right.keys.pop(0))
+                me.values.append(right.values.pop(0))
+                x.keys[i] = right.keys[0]
+            else:
+                me.keys.append(x.keys[i])
+                x.keys[i] = right.keys.pop(0)
+                me.children.append(right.children.pop(0))
+        else:
+            self._merge(x, i - 1 if i == len(x.keys) else i)
+
+    def _merge(self, x, i):
+        """
+        Merge x.children[i + 1] into x.children[i] and drop the separator x.keys[i].
+        Merged leaves simply concatenate; merged internal nodes pull the separator down between their keys.
+        """
+        left = x.children[i]
+        right = x.children.pop(i + 1)
+        separator = x.keys.pop(i)
+        if left.is_leaf:
+            left.keys.extend(right.keys)
+            left.values.extend(right.values)
+            left.next = right.next
+            if right.next is not None:
+                right.next.prev = left
+        else:
+            left.keys.append(separator)
+            left.keys.extend(right.keys)
+            left.children.extend(right.children)
+
+    def get_many(self, keys, default=None):
+        """
+        Look up a batch of keys. The batch is sorted, and a key that falls inside the key range of the leaf of the
+        previous key is looked up in that leaf without a descent.
+
+        :param keys: An iterable of keys, e.g. a list or a NumPy array.
+        :param default: The value returned for keys that are not in the tree.
+        :return: A list of values in the order of keys.
+        """
+        if hasattr(keys, 'tolist'):
+            keys = keys.tolist()
+        keys = list(keys)
+        result = [default] * len(keys)
+        leaf = None
+        for j in sorted(range(len(keys)), key=keys.__getitem__):
+            k = keys[j]
+            if leaf is not None and leaf.keys and leaf.keys[0] <= k <= leaf.keys[-1]:
+                i = bisect_left(leaf.keys, k)
+                if leaf.keys[i] == k:
+                    result[j] = leaf.values[i]
+                continue
+            found = self.b_tree_search(self.root, k)
+            if found is not None:
+                leaf, i = found
+                result[j] = leaf.values[i]
+            else:
+                leaf = self._find_leaf(self.root, k)
+        return result
+
+    def insert_many(self, pairs):
+        """
+        Insert a batch of (key, value) pairs. The batch is sorted by key, and a key that falls strictly inside the
+        key range of the leaf of the previous insertion goes straight into that leaf while it is not full.
+
+        :param pairs: An iterable of (key, value) pairs, e.g. a list or a NumPy array of shape (n, 2).
+        :return: None. This function performs its operation without returning a value.
+        """
+        if hasattr(pairs, 'tolist'):
+            pairs = pairs.tolist()
+        full = 2 * self.t - 1
+        leaf = None
+        for k, v in sorted(pairs, key=itemgetter(0)):
+            if leaf is not None and len(leaf.keys) < full and leaf.keys[0] <= k < leaf.keys[-1]:
+                i = bisect_right(leaf.keys, k)
+                leaf.keys.insert(i, k)
+                leaf.values.insert(i, v)
+                continue
+            self.b_tree_insert(k, v)
+            leaf = self._find_leaf(self.root, k)
+
+    def delete_many(self, keys):
+        """
+        Delete a batch of keys.
+        :param keys: An iterable of keys, e.g. a list or a NumPy array.
+        :return: The number of keys deleted.
+        """
+        if hasattr(keys, 'tolist'):
+            keys = keys.tolist()
+        deleted = 0
+        for k in sorted(keys):
+            if self.delete(k):
+                deleted += 1
+        return deleted
+
+    def cursor(self, reverse=False):
+        """
+        Create a cursor over the entries of the tree. Call seek on it before reading.
+        :param reverse: Walk from the largest key to the smallest one.
+        :return: A BPlusTreeCursor.
+        """
+        return BPlusTreeCursor(self, reverse)
+
+    def range(self, lo=None, hi=None, reverse=False):
+        """
+        Lazily yield the entries with lo <= key < hi in key order, following the leaf links.
+        The tree must not be modified while the generator is in use.
+
+        :param lo: The smallest key to yield, or None to start at the smallest key of the tree.
+        :param hi: The first key not to yield, or None to run to the largest key of the tree.
+        :param reverse: Yield the entries from the largest key to the smallest one.
+        :return: A generator of (key, value) tuples.
+        """
+        cursor = BPlusTreeCursor(self, reverse).seek(hi if reverse else lo)
+        leaf, i = cursor._leaf, cursor._i
+        # whole leaves are streamed as slices; only the last one is cut at the bound
+        if reverse:
+            while leaf is not None:
+                keys, values = leaf.keys, leaf.values
+                if lo is not None and keys and keys[0] < lo:
+                    j = bisect_left(keys, lo, 0, i + 1)
+                    yield from zip(reversed(keys[j:i + 1]), reversed(values[j:i + 1]))
+                    return
+                yield from zip(reversed(keys[:i + 1]), reversed(values[:i + 1]))
+                leaf = leaf.prev
+                i = len(leaf.keys) - 1 if leaf is not None else 0
+        else:
+            while leaf is not None:
+                keys, values = leaf.keys, leaf.values
+                if hi is not None and keys and not keys[-1] < hi:
+                    j = bisect_left(keys, hi, i)
+                    yield from zip(keys[i:j], values[i:j])
+                    return
+                yield from zip(keys[i:], values[i:])
+                leaf = leaf.next
+                i = 0
+
+    def __iter__(self):
+        return self.range()
+
+
+class BPlusTreeCursor:
+    """
+    A resumable position in the key order of a BPlusTree: a leaf and an index into it.
+    The tree must not be modified while a cursor is in use.
+    """
+
+    def __init__(self, tree, reverse=False):
+        """
+        :param tree: The BPlusTree to read.
+        :param reverse: Walk from the largest key to the smallest one.
+        """
+        self.tree = tree
+        self.reverse = reverse
+        self._leaf = None
+        self._i = 0
+
+    def seek(self, k=None):
+        """
+        Move the cursor in one descent from the root.
+        A forward cursor then yields the first entry with key >= k, a reverse cursor the last entry with key < k.
+        :param k: The key to seek, or None for the start (the end for a reverse cursor) of the tree.
+        :return: The cursor itself.
+        """
+        x = self.tree.root
+        # route keys equal to a separator left: every leaf before the one reached holds only keys < k
+        while not x.is_leaf:
+            if k is None:
+                x = x.children[-1 if self.reverse else 0]
+            else:
+                x = x.children[bisect_left(x.keys, k)]
+        if k is None:
+            i = len(x.keys) if self.reverse else 0
+        else:
+            i = bisect_left(x.keys, k)
+        self._leaf = x
+        self._i = i - 1 if self.reverse else i
+        return self
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        leaf, i = self._leaf, self._i
+        if self.reverse:
+            while leaf is not None and i < 0:
+                leaf = leaf.prev
+                i = len(leaf.keys) - 1 if leaf is not None else 0
+            self._i = i - 1
+        else:
+            while leaf is not None and i >= len(leaf.keys):
+                leaf = leaf.next
+                i = 0
+            self._i = i + 1
+        self._leaf = leaf
+        if leaf is None:
+            raise StopIteration
+        return leaf.keys[i], leaf.values[i]
+
+    def fetch(self, n):
+        """
+        Read the next page of entries.
+        :param n: The maximum number of entries to read.
+        :return: A list of at most n (key, value) tuples. It is shorter than n only at the end of the tree.
+        """
+        return list(islice(self, n))
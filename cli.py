@@ -0,0 +1,294 @@
+"""
+Non-interactive command line for the B-tree.
+
+    python cli.py [-t T] [--index PATH] [--metrics] [--filter] [--quiet | --json] COMMAND ...
+
+Commands:
+
+    load FILE           insert the records of a TSV/CSV file
+    delete FILE         delete the keys of a file
+    verify FILE         check that the tree holds exactly the entries of a file
+    scan                write the entries with lo <= key < hi in key order
+    stats               print the size and shape of the tree, and its counters and latencies with --metrics
+    bench FILE          time load, lookup and delete of a file on fresh trees
+    run SCRIPT          run a script of the commands above, one per line, on the same tree
+
+Without --index the tree lives in memory for the duration of the process, so load and verify are usually
+combined in a script; with --index it is a PagedBTree file that persists between runs.
+Every command prints one report: 'command: name value, ...' by default, one JSON object per line with --json,
+nothing with --quiet.
+"""
+import argparse
+import json
+import os
+import shlex
+import sys
+import tempfile
+import time
+
+import ingest
+import metrics
+import verify
+from main import BTree
+
+
+class Session:
+    """
+    The tree the commands of one process work on, and how they report.
+    """
+
+    def __init__(self, t=None, index=None, cache_size=1024, wal_sync=None, quiet=False, json_output=False,
+                 progress_every=1000000, instrument=False, bloom_filter=False):
+        """
+        :param t: The minimum degree. Taken from the index file when it exists; 3 if not given otherwise.
+        :param index: Path of a PagedBTree file, or None for an in-memory BTree.
+        :param cache_size: Buffer pool size of the PagedBTree.
+        :param wal_sync: fsync policy of the write-ahead log of the PagedBTree, or None for no log.
+        :param quiet: Print no reports and no progress.
+        :param json_output: Print reports as JSON.
+        :param progress_every: Number of records between two progress reports on stderr.
+        :param instrument: Enable the instrumentation of the tree, see metrics.
+        :param bloom_filter: Keep a Bloom filter of the keys in front of lookups and deletes, see BTree.enable_filter.
+        """
+        self.quiet = quiet
+        self.json_output = json_output
+        self.progress_every = progress_every
+        self.t = t if t is not None else 3
+        self.index = index
+        self.cache_size = cache_size
+        self.wal_sync = wal_sync
+        self.tree = self.new_tree(index)
+        if instrument:
+            self.tree.enable_stats()
+        if bloom_filter:
+            self.tree.enable_filter()
+
+    def new_tree(self, path=None):
+        """
+        Create an empty tree of the kind of this session, or open the index at path.
+        """
+        if path is None:
+            return BTree(self.t)
+        from pager import PagedBTree
+
+        exists = os.path.exists(path) and os.path.getsize(path) > 0
+        return PagedBTree(None if exists else self.t, path, self.cache_size, self.wal_sync)
+
+    def report(self, command, **fields):
+        if self.quiet:
+            return
+        fields = {name: round(value, 6) if isinstance(value, float) else value for name, value in fields.items()}
+        if self.json_output:
+            print(json.dumps({'command': command, **fields}, allow_nan=False))
+        else:
+            print(f"{command}: " + ", ".join(f"{name} {value}" for name, value in fields.items()))
+
+    def close(self):
+        if self.index is not None:
+            self.tree.close()
+
+
+def cmd_load(session, args):
+    elapsed, count = _timed(ingest.ingest, session.tree, args.file, progress_every=session.progress_every,
+                            quiet=session.quiet)
+    session.report('load', file=args.file, records=count, seconds=elapsed, records_per_second=count / elapsed)
+
+
+def cmd_delete(session, args):
+    start = time.perf_counter()
+    progress = ingest.Progress("deleted", session.progress_every, session.quiet)
+    deleted = 0
+    for keys, _ in ingest.read_batches(args.file):
+        deleted += session.tree.delete_many(keys)
+        progress.add(len(keys))
+    elapsed = time.perf_counter() - start
+    session.report('delete', file=args.file, records=progress.count, deleted=deleted, seconds=elapsed)
+
+
+def cmd_verify(session, args):
+    """
+    Check that the tree holds exactly the entries of FILE ('<key>\tN/A' lines name keys that must be absent).
+    """
+    elapsed, result = _timed(verify.verify, session.tree, args.file, args.out)
+    session.report('verify', file=args.file, **result, seconds=elapsed)
+    return result['ok']
+
+
+def cmd_scan(session, args):
+    entries = session.tree.range(args.lo, args.hi, args.reverse)
+    count = 0
+    if args.out is None and session.json_output:
+        pairs = [list(entry) for _, entry in zip(range(args.limit), entries)] if args.limit is not None \
+            else [list(entry) for entry in entries]
+        session.report('scan', records=len(pairs), pairs=pairs)
+        return
+    file = open(args.out, 'w') if args.out is not None else sys.stdout
+    try:
+        for k, v in entries:
+            if count == args.limit:
+                break
+            file.write(f"{k}\t{v}\n")
+            count += 1
+    finally:
+        if file is not sys.stdout:
+            file.close()
+    if args.out is not None:
+        session.report('scan', out=args.out, records=count)
+
+
+def cmd_stats(session, args):
+    snap = metrics.snapshot(session.tree)
+    if args.prometheus:
+        text = metrics.to_prometheus(snap)
+        if args.out is not None:
+            with open(args.out, 'w') as file:
+                file.write(text)
+        elif not session.quiet:
+            sys.stdout.write(text)
+        return
+    stats = metrics.summary(snap)
+    if session.index is not None:
+        stats.update(session.tree.store.stats())
+    if session.json_output:
+        stats['snapshot'] = snap
+    session.report('stats', **stats)
+
+
+def cmd_bench(session, args):
+    """
+    Load, look up and delete every record of FILE on a fresh tree, repeat times, and report the best times.
+    """
+    best = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for repeat in range(args.repeat):
+            tree = session.new_tree(os.path.join(tmp_dir, f"{repeat}.db") if session.index is not None else None)
+            timings = {'load': _timed(ingest.ingest, tree, args.file, quiet=True)}
+            timings['lookup'] = _timed(lambda: sum(len(tree.get_many(keys)) for keys, _ in
+                                                   ingest.read_batches(args.file)))
+            timings['delete'] = _timed(lambda: sum(tree.delete_many(keys) for keys, _ in
+                                                   ingest.read_batches(args.file)))
+            if session.index is not None:
+                tree.close()
+            for phase, (elapsed, count) in timings.items():
+                if phase not in best or elapsed < best[phase][0]:
+                    best[phase] = (elapsed, count)
+    fields = {}
+    for phase, (elapsed, count) in best.items():
+        fields[f'{phase}_seconds'] = elapsed
+        fields[f'{phase}_per_second'] = count / elapsed
+    session.report('bench', file=args.file, records=best['load'][1], repeat=args.repeat, **fields)
+
+
+def cmd_run(session, args):
+    """
+    Run every command of a script on the session tree. Blank lines and lines starting with '#' are skipped.
+    """
+    parser = build_parser(script=True)
+    failed = False
+    with open(args.script, 'r') as script:
+        for line_number, line in enumerate(script, 1):
+            words = shlex.split(line, comments=True)
+            if not words:
+                continue
+            try:
+                command = parser.parse_args(words)
+            except SystemExit:
+                raise SystemExit(f"{args.script}:{line_number}: invalid command: {line.strip()}")
+            if command.func(session, command) is False:
+                failed = True
+                if args.stop_on_failure:
+                    break
+    return not failed
+
+
+def _timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def _positive_int(text):
+    """
+    argparse type of the options that count something and must be at least 1.
+    """
+    value = int(text)
+    if value < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {value}")
+    return value
+
+
+def build_parser(script=False):
+    """
+    The argument parser of the command line, or of one line of a script if script is True.
+    """
+    parser = argparse.ArgumentParser(prog='cli.py' if not script else 'script', description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    if not script:
+        parser.add_argument('-t', type=int, help="minimum degree of a new tree (default 3)")
+        parser.add_argument('--index', help="PagedBTree file to work on instead of an in-memory tree")
+        parser.add_argument('--cache-size', type=int, default=1024, help="buffer pool size of the index")
+        parser.add_argument('--wal', choices=['always', 'interval', 'never'],
+                            help="write-ahead log fsync policy of the index (default: no log)")
+        parser.add_argument('--progress-every', type=_positive_int, default=1000000,
+                            help="records between two progress reports on stderr")
+        parser.add_argument('--metrics', action='store_true',
+                            help="count node visits, splits, merges and borrows and record latencies for stats")
+        parser.add_argument('--filter', action='store_true',
+                            help="answer lookups and deletes of absent keys from a Bloom filter of the keys")
+        output = parser.add_mutually_exclusive_group()
+        output.add_argument('-q', '--quiet', action='store_true', help="print no reports")
+        output.add_argument('--json', action='store_true', help="print reports as JSON lines")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    command = commands.add_parser('load', help="insert the records of a file")
+    command.add_argument('file')
+    command.set_defaults(func=cmd_load)
+
+    command = commands.add_parser('delete', help="delete the keys of a file")
+    command.add_argument('file')
+    command.set_defaults(func=cmd_delete)
+
+    command = commands.add_parser('verify', help="check that the tree holds exactly the entries of a file")
+    command.add_argument('file')
+    command.add_argument('--out', help="also write the looked-up entries of the keys of FILE to this file")
+    command.set_defaults(func=cmd_verify)
+
+    command = commands.add_parser('scan', help="write the entries with lo <= key < hi in key order")
+    command.add_argument('--lo', type=int)
+    command.add_argument('--hi', type=int)
+    command.add_argument('--reverse', action='store_true')
+    command.add_argument('--limit', type=int)
+    command.add_argument('--out', help="output file (default: standard output)")
+    command.set_defaults(func=cmd_scan)
+
+    command = commands.add_parser('stats', help="print the size and shape of the tree")
+    command.add_argument('--prometheus', action='store_true', help="print the Prometheus text format")
+    command.add_argument('--out', help="write the Prometheus text to this file instead")
+    command.set_defaults(func=cmd_stats)
+
+    command = commands.add_parser('bench', help="time load, lookup and delete of a file on fresh trees")
+    command.add_argument('file')
+    command.add_argument('--repeat', type=_positive_int, default=3, help="runs of each phase; the best one is reported")
+    command.set_defaults(func=cmd_bench)
+
+    if not script:
+        command = commands.add_parser('run', help="run a script of commands on the same tree")
+        command.add_argument('script')
+        command.add_argument('--stop-on-failure', action='store_true', help="stop at the first failed verify")
+        command.set_defaults(func=cmd_run)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    session = Session(args.t, args.index, args.cache_size, args.wal, args.quiet, args.json, args.progress_every,
+                      args.metrics, args.filter)
+    try:
+        result = args.func(session, args)
+    finally:
+        session.close()
+    return 1 if result is False else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
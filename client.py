@@ -0,0 +1,166 @@
+"""
+An asyncio client for server.BTreeServer.
+
+BTreeClient keeps a pool of connections and spreads requests over them round-robin. Every connection pipelines:
+a request is written as soon as it is made, and a reader task matches the responses to the waiting requests by
+request id, so many requests can be in flight on one connection.
+
+    async with BTreeClient('/tmp/btree.sock') as client:
+        await client.put(1, 100)
+        value = await client.get(1)
+"""
+import asyncio
+from itertools import count
+
+import protocol
+
+_WRITE_BUFFER_LIMIT = 1 << 20  # bytes of requests queued on a connection before the client waits for the server
+
+
+class _Connection:
+    """
+    One pipelined connection to the server.
+    """
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.waiting = {}  # request id -> future of (status, payload)
+        self.request_ids = count()
+        self.task = asyncio.get_running_loop().create_task(self._read_responses())
+
+    @classmethod
+    async def open(cls, address):
+        if isinstance(address, str):
+            reader, writer = await asyncio.open_unix_connection(address)
+        else:
+            reader, writer = await asyncio.open_connection(*address)
+        return cls(reader, writer)
+
+    def request(self, op, payload=b''):
+        """
+        Send a request.
+        :return: A future of the (status, payload) response.
+        """
+        if self.task.done():
+            raise ConnectionError("the connection to the server is closed")
+        request_id = next(self.request_ids) & 0xffffffff
+        future = asyncio.get_running_loop().create_future()
+        self.waiting[request_id] = future
+        self.writer.write(protocol.frame(request_id, op, payload))
+        return future
+
+    async def _read_responses(self):
+        error = ConnectionError("the server closed the connection")
+        try:
+            while True:
+                length, = protocol.LENGTH.unpack(await self.reader.readexactly(protocol.LENGTH.size))
+                body = await self.reader.readexactly(length)
+                request_id, status = protocol.HEADER.unpack_from(body)
+                future = self.waiting.pop(request_id, None)
+                if future is not None and not future.done():
+                    future.set_result((status, body[protocol.HEADER.size:]))
+        except (asyncio.IncompleteReadError, ConnectionError) as e:
+            error = ConnectionError(f"the connection to the server was lost: {e}")
+        finally:
+            for future in self.waiting.values():
+                if not future.done():
+                    future.set_exception(error)
+            self.waiting.clear()
+
+    async def close(self):
+        self.writer.close()
+        try:
+            await self.writer.wait_closed()
+        except ConnectionError:
+            pass
+        self.task.cancel()
+        await asyncio.gather(self.task, return_exceptions=True)
+
+
+class BTreeClient:
+    def __init__(self, address, pool_size=4):
+        """
+        :param address: A path for a Unix socket, or a (host, port) tuple for TCP.
+        :param pool_size: Number of connections; each is opened the first time it is used.
+        """
+        self.address = address
+        self._pool = [None] * pool_size
+        self._locks = [asyncio.Lock() for _ in range(pool_size)]
+        self._next = 0
+
+    async def _connection(self):
+        i = self._next
+        self._next = (i + 1) % len(self._pool)
+        connection = self._pool[i]
+        if connection is None or connection.task.done():
+            async with self._locks[i]:
+                connection = self._pool[i]
+                if connection is None or connection.task.done():
+                    connection = self._pool[i] = await _Connection.open(self.address)
+        return connection
+
+    async def _call(self, op, payload=b''):
+        connection = await self._connection()
+        response = connection.request(op, payload)
+        if connection.writer.transport.get_write_buffer_size() > _WRITE_BUFFER_LIMIT:
+            await connection.writer.drain()
+        status, payload = await response
+        if status == protocol.ERROR:
+            raise RuntimeError(f"server error: {payload.decode()}")
+        return status, payload
+
+    async def get(self, k, default=None):
+        """
+        :return: The value of k, or default if k is not in the tree.
+        """
+        status, payload = await self._call(protocol.GET, protocol.KEY.pack(k))
+        return protocol.KEY.unpack(payload)[0] if status == protocol.OK else default
+
+    async def put(self, k, v):
+        """
+        Insert the entry (k, v).
+        """
+        await self._call(protocol.PUT, protocol.PAIR.pack(k, v))
+
+    async def delete(self, k):
+        """
+        Delete k.
+        :return: True if k was deleted, False if it was not found.
+        """
+        status, _ = await self._call(protocol.DELETE, protocol.KEY.pack(k))
+        return status == protocol.OK
+
+    async def get_many(self, keys, default=None):
+        """
+        Look up a batch of keys in one request.
+        :return: A list of values in the order of keys.
+        """
+        _, payload = await self._call(protocol.GET_MANY, protocol.pack_keys(list(keys)))
+        return protocol.unpack_found(payload, default)
+
+    async def range(self, lo=None, hi=None, reverse=False, limit=0):
+        """
+        Read the entries with lo <= key < hi in key order.
+        :param lo: The smallest key, or None for no lower bound.
+        :param hi: The first key not to read, or None for no upper bound.
+        :param reverse: Read from the largest key to the smallest one.
+        :param limit: The maximum number of entries, 0 for no limit.
+        :return: A list of (key, value) tuples.
+        """
+        flags = (lo is not None) | (hi is not None) << 1
+        _, payload = await self._call(protocol.RANGE, protocol.RANGE_ARGS.pack(
+            flags, lo if lo is not None else 0, hi if hi is not None else 0, limit, reverse))
+        return protocol.unpack_pairs(payload)
+
+    async def close(self):
+        for i, connection in enumerate(self._pool):
+            if connection is not None:
+                await connection.close()
+                self._pool[i] = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
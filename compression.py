@@ -0,0 +1,316 @@
+"""
+Per-node key compression for BTree.
+
+CompressedBTree stores the keys of every node in an encoded sequence instead of a list:
+
+    FrameKeys    64-bit integer keys as offsets from the smallest key of the node (frame of reference), in the
+                 narrowest unsigned array that holds them: dense IDs take 1 or 2 bytes per key instead of a pointer
+                 to an int object.
+    PrefixKeys   str or bytes keys as the prefix shared by every key of the node and the remaining suffixes.
+
+Both behave like the list of decoded keys, so every operation of BTree works on them unchanged, and both find the
+position of a key on the encoded form: FrameKeys subtracts the base once and bisects the offsets, PrefixKeys compares
+the key with the prefix once and bisects the suffixes. Only the key at the found position is decoded.
+
+The kind of the keys is taken from the first key inserted. A key of another kind (or an integer outside the 64-bit
+range) turns compression off and every node goes back to a list of keys, like BTree(t, compact=True) does.
+"""
+import os
+import sys
+from array import array
+from bisect import bisect_left
+
+from main import BTree, _is_int64
+
+_TYPECODES = [(code, (1 << 8 * array(code).itemsize) - 1) for code in 'BHIQ']  # unsigned, narrowest first
+
+
+def _typecode(span):
+    for code, largest in _TYPECODES:
+        if span <= largest:
+            return code
+    raise OverflowError(f"a key span of {span} does not fit in 64 bits")
+
+
+class FrameKeys:
+    """
+    A sorted sequence of integer keys stored as unsigned offsets from base.
+    """
+    __slots__ = ('base', 'offsets')
+
+    def __init__(self, keys=()):
+        """
+        :param keys: Sorted integer keys, whose span (largest minus smallest) fits in 64 bits.
+        """
+        keys = list(keys)
+        self.base = keys[0] if keys else 0
+        self.offsets = array(_typecode(keys[-1] - keys[0] if keys else 0), [k - self.base for k in keys])
+
+    def _fit(self, k):
+        """
+        Rebase or widen the offsets so that k can be stored.
+        """
+        offsets = self.offsets
+        if not offsets:
+            self.base = k
+        elif k < self.base:
+            shift = self.base - k
+            self.offsets = array(_typecode(max(offsets) + shift), [o + shift for o in offsets])
+            self.base = k
+        elif k - self.base >= 1 << 8 * offsets.itemsize:
+            self.offsets = array(_typecode(k - self.base), offsets)
+
+    def search(self, k):
+        """
+        :return: bisect_left(self, k), computed on the offsets.
+        """
+        d = k - self.base
+        if d < 0:
+            return 0
+        if d >= 1 << 8 * self.offsets.itemsize:
+            return len(self.offsets)
+        return bisect_left(self.offsets, d)
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return FrameKeys([self.base + o for o in self.offsets[i]])
+        return self.base + self.offsets[i]
+
+    def __setitem__(self, i, k):
+        self._fit(k)
+        self.offsets[i] = k - self.base
+
+    def __delitem__(self, i):
+        del self.offsets[i]
+
+    def __iter__(self):
+        base = self.base
+        return (base + o for o in self.offsets)
+
+    def insert(self, i, k):
+        self._fit(k)
+        self.offsets.insert(i, k - self.base)
+
+    def append(self, k):
+        self._fit(k)
+        self.offsets.append(k - self.base)
+
+    def extend(self, keys):
+        for k in keys:
+            self.append(k)
+
+    def pop(self, i=-1):
+        k = self.base + self.offsets[i]
+        del self.offsets[i]
+        return k
+
+    def __sizeof__(self):
+        return object.__sizeof__(self) + sys.getsizeof(self.offsets) + sys.getsizeof(self.base)
+
+    def __repr__(self):
+        return f"FrameKeys({list(self)})"
+
+
+class PrefixKeys:
+    """
+    A sorted sequence of str or bytes keys stored as their common prefix and the remaining suffixes.
+    """
+    __slots__ = ('prefix', 'suffixes')
+
+    def __init__(self, keys=()):
+        """
+        :param keys: Sorted keys, all str or all bytes.
+        """
+        keys = list(keys)
+        # in a sorted sequence, the prefix shared by the first and the last key is shared by all keys
+        self.prefix = os.path.commonprefix([keys[0], keys[-1]]) if keys else None  # None while empty
+        cut = len(self.prefix) if keys else 0
+        self.suffixes = [k[cut:] for k in keys]
+
+    def _fit(self, k):
+        """
+        Shorten the prefix, if needed, so that k can be stored.
+        """
+        prefix = self.prefix
+        if prefix is None or not self.suffixes:
+            self.prefix = k
+        elif not k.startswith(prefix):
+            shared = os.path.commonprefix([prefix, k])
+            moved = prefix[len(shared):]
+            self.suffixes = [moved + s for s in self.suffixes]
+            self.prefix = shared
+
+    def search(self, k):
+        """
+        :return: bisect_left(self, k), computed on the suffixes.
+        """
+        prefix = self.prefix
+        if prefix is None or not self.suffixes:
+            return 0
+        if k.startswith(prefix):
+            return bisect_left(self.suffixes, k[len(prefix):])
+        # every key starts with the prefix, so k sorts before all of them or after all of them
+        return 0 if k < prefix else len(self.suffixes)
+
+    def __len__(self):
+        return len(self.suffixes)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return PrefixKeys([self.prefix + s for s in self.suffixes[i]])
+        return self.prefix + self.suffixes[i]
+
+    def __setitem__(self, i, k):
+        self._fit(k)
+        self.suffixes[i] = k[len(self.prefix):]
+
+    def __delitem__(self, i):
+        del self.suffixes[i]
+
+    def __iter__(self):
+        prefix = self.prefix
+        return (prefix + s for s in self.suffixes)
+
+    def insert(self, i, k):
+        self._fit(k)
+        self.suffixes.insert(i, k[len(self.prefix):])
+
+    def append(self, k):
+        self.insert(len(self.suffixes), k)
+
+    def extend(self, keys):
+        for k in keys:
+            self.append(k)
+
+    def pop(self, i=-1):
+        k = self.prefix + self.suffixes[i]
+        del self.suffixes[i]
+        return k
+
+    def __sizeof__(self):
+        return (object.__sizeof__(self) + sys.getsizeof(self.prefix) + sys.getsizeof(self.suffixes)
+                + sum(map(sys.getsizeof, self.suffixes)))
+
+    def __repr__(self):
+        return f"PrefixKeys({list(self)})"
+
+
+def _codec_of(k):
+    """
+    :return: The key sequence class for keys of the kind of k, or None if keys like k are not compressed.
+    """
+    if _is_int64(k):
+        return FrameKeys
+    if type(k) is str or type(k) is bytes:
+        return PrefixKeys
+    return None
+
+
+class CompressedBTree(BTree):
+    def __init__(self, t):
+        """
+        :param t: The minimum degree of the B-tree.
+        """
+        self._codec = None  # FrameKeys or PrefixKeys once the kind of the keys is known
+        self._kind = None  # type of the keys, or False once compression is off
+        super().__init__(t)
+
+    def _new_node(self, keys, values, children, is_leaf):
+        if self._codec is not None and type(keys) is not self._codec:
+            keys = self._codec(keys)
+        return super()._new_node(keys, values, children, is_leaf)
+
+    def _admit(self, k):
+        """
+        Called before key k is inserted: pick the codec on the first key, turn compression off on a key of another kind.
+        """
+        if type(k) is self._kind and (self._codec is not FrameKeys or _is_int64(k)):
+            return
+        if self._kind is None and _codec_of(k) is not None:
+            self._kind = type(k)
+            self._codec = _codec_of(k)
+        else:
+            self._kind = False
+            self._codec = None
+        self._recode()
+
+    def _recode(self):
+        """
+        Store the keys of every node with the current codec, or as lists if compression is off.
+        """
+        codec = self._codec or list
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            node.keys = codec(node.keys)
+            stack.extend(node.children)
+
+    def _build_from_sorted(self, keys, values, fill_factor):
+        if keys and self._kind is not False:
+            for k in (keys[0], keys[-1]):
+                self._admit(k)
+            if self._kind is not False and not all(type(k) is self._kind for k in keys):
+                self._admit(None)
+        super()._build_from_sorted(keys, values, fill_factor)
+
+    def b_tree_insert(self, k, v):
+        if self._kind is not False:
+            self._admit(k)
+        super().b_tree_insert(k, v)
+
+    def insert_many(self, pairs):
+        if hasattr(pairs, 'tolist'):
+            pairs = pairs.tolist()
+        pairs = list(pairs)
+        if self._kind is not False:
+            for k, _ in pairs:
+                self._admit(k)
+        super().insert_many(pairs)
+
+    @classmethod
+    def join(cls, left, right):
+        if left._kind is None or right._kind is None:  # an empty tree takes the codec of the other one
+            empty, other = (left, right) if left._kind is None else (right, left)
+            empty._kind, empty._codec = other._kind, other._codec
+            empty._recode()
+        elif left._kind is not right._kind:
+            left._admit(None)
+            right._admit(None)
+        return super().join(left, right)
+
+    def b_tree_search(self, x, k):
+        """
+        BTree.b_tree_search that finds the position of k in a node on its encoded keys.
+        """
+        if self.stats is not None or self.filter is not None:
+            return super().b_tree_search(x, k)
+        if self._codec is FrameKeys:
+            while True:
+                keys = x.keys
+                offsets = keys.offsets
+                d = k - keys.base
+                i = bisect_left(offsets, d) if d >= 0 else 0
+                if i < len(offsets) and offsets[i] == d:
+                    return (x, i)
+                elif x.is_leaf:
+                    return None
+                x = x.children[i]
+        if self._codec is PrefixKeys:
+            while True:
+                keys = x.keys
+                prefix = keys.prefix
+                suffixes = keys.suffixes
+                if prefix is not None and k.startswith(prefix):
+                    suffix = k[len(prefix):]
+                    i = bisect_left(suffixes, suffix)
+                    if i < len(suffixes) and suffixes[i] == suffix:
+                        return (x, i)
+                else:
+                    i = keys.search(k)
+                if x.is_leaf:
+                    return None
+                x = x.children[i]
+        return super().b_tree_search(x, k)
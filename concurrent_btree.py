@@ -0,0 +1,393 @@
+"""
+A BTree that can be shared by threads.
+
+Every node has a reader/writer latch, and operations couple latches top-down ("crabbing"): a thread latches a child
+before it releases the parent, and releases the parent as soon as the child is safe, i.e. as soon as no change
+below can reach back up to the parent. The insert and delete of BTree make every child safe before they descend
+into it (the full child is split, the child with t-1 keys borrows or merges), so a writer never holds more than
+a node, its child and, during a borrow or merge, the child's siblings.
+
+A tree latch guards the root pointer. Ordinary operations hold it in shared mode. The few operations that may
+replace the root (splitting a full root, shrinking a root with a single key) and deletes of a key found in an
+internal node, which read its predecessor or successor from a whole subtree, hold it in exclusive mode and
+run the plain BTree algorithm.
+"""
+import threading
+from bisect import bisect_left, bisect_right
+from contextlib import contextmanager
+
+from main import BTree, BTreeNode
+
+
+class RWLatch:
+    """
+    A reader/writer latch. Any number of readers or one writer hold it at a time.
+    Waiting writers go first, so a stream of readers cannot starve them.
+    An uncontended acquire or release only takes the internal lock; the condition is used only to wait.
+    """
+    __slots__ = ('_lock', '_cond', '_readers', '_writer', '_waiting_writers', '_waiting')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+        self._readers = 0
+        self._writer = False
+        self._waiting_writers = 0
+        self._waiting = 0  # threads waiting on the condition
+
+    def acquire_read(self):
+        with self._lock:
+            if self._writer or self._waiting_writers:
+                self._waiting += 1
+                while self._writer or self._waiting_writers:
+                    self._cond.wait()
+                self._waiting -= 1
+            self._readers += 1
+
+    def release_read(self):
+        with self._lock:
+            self._readers -= 1
+            if not self._readers and self._waiting:
+                self._cond.notify_all()
+
+    def acquire_write(self):
+        with self._lock:
+            if self._writer or self._readers:
+                self._waiting_writers += 1
+                self._waiting += 1
+                while self._writer or self._readers:
+                    self._cond.wait()
+                self._waiting -= 1
+                self._waiting_writers -= 1
+            self._writer = True
+
+    def release_write(self):
+        with self._lock:
+            self._writer = False
+            if self._waiting:
+                self._cond.notify_all()
+
+    @contextmanager
+    def read(self):
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @contextmanager
+    def write(self):
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
+
+
+class LatchedNode(BTreeNode):
+    """
+    A BTreeNode with its own RWLatch.
+    """
+
+    def __init__(self, keys, values, children, is_leaf):
+        super().__init__(keys, values, children, is_leaf)
+        self.latch = RWLatch()
+
+
+class ConcurrentBTree(BTree):
+    """
+    A thread-safe BTree. b_tree_search, get, b_tree_insert and b_tree_delete (or delete, which reports whether
+    the key was found) run concurrently with latch crabbing.
+    get_many, insert_many and delete_many run their keys one by one, and range scans read a page of entries at
+    a time under the latches.
+    """
+    range_page = 256  # entries a range scan reads before it releases its latches
+    no_filter_reason = "the counters of the filter are not latched"
+    no_split_reason = "both parts would share its tree latch"
+
+    def __init__(self, t):
+        """
+        :param t: The minimum degree of the B-tree.
+        """
+        self._tree_latch = RWLatch()
+        super().__init__(t)
+
+    def _new_node(self, keys, values, children, is_leaf):
+        return LatchedNode(keys, values, children, is_leaf)
+
+    def b_tree_search(self, x, k):
+        """
+        Search for k from node x (normally the root) with read latch crabbing.
+        The node returned may change as soon as the search returns; use get for the value.
+        :return: A tuple (node, index), or None if k is not found.
+        """
+        self._tree_latch.acquire_read()
+        x.latch.acquire_read()
+        try:
+            while True:
+                i = bisect_left(x.keys, k)
+                if i < len(x.keys) and k == x.keys[i]:
+                    return x, i
+                if x.is_leaf:
+                    return None
+                child = x.children[i]
+                child.latch.acquire_read()
+                x.latch.release_read()
+                x = child
+        finally:
+            x.latch.release_read()
+            self._tree_latch.release_read()
+
+    def get(self, k, default=None):
+        """
+        Look up the value of k.
+        :param k: The key.
+        :param default: The value returned if k is not in the tree.
+        :return: The value of the first entry with key k, or default.
+        """
+        self._tree_latch.acquire_read()
+        x = self.root
+        x.latch.acquire_read()
+        try:
+            while True:
+                i = bisect_left(x.keys, k)
+                if i < len(x.keys) and k == x.keys[i]:
+                    return x.values[i]
+                if x.is_leaf:
+                    return default
+                child = x.children[i]
+                child.latch.acquire_read()
+                x.latch.release_read()
+                x = child
+        finally:
+            x.latch.release_read()
+            self._tree_latch.release_read()
+
+    def b_tree_insert(self, k, v):
+        self._tree_latch.acquire_read()
+        try:
+            x = self.root
+            x.latch.acquire_write()
+            if len(x.keys) < 2 * self.t - 1:
+                self._insert_latched(x, k, v)
+                return
+            x.latch.release_write()
+        finally:
+            self._tree_latch.release_read()
+        with self._tree_latch.write():  # the full root is split, which replaces it
+            super().b_tree_insert(k, v)
+
+    def _insert_latched(self, x, k, v):
+        """
+        _b_tree_insert_nonfull with write latch crabbing. x is latched and not full; a child is latched before
+        it is split, so the parent is released once the descent has moved to a child that is not full.
+        """
+        full = 2 * self.t - 1
+        try:
+            while not x.is_leaf:
+                i = bisect_right(x.keys, k)
+                child = x.children[i]
+                child.latch.acquire_write()
+                if len(child.keys) == full:
+                    self._b_tree_split_child(x, i)
+                    if k > x.keys[i]:
+                        # the new right half is only reachable through x, which is still latched
+                        right = x.children[i + 1]
+                        right.latch.acquire_write()
+                        child.latch.release_write()
+                        child = right
+                x.latch.release_write()
+                x = child
+            i = bisect_right(x.keys, k)
+            x.keys.insert(i, k)
+            x.values.insert(i, v)
+        finally:
+            x.latch.release_write()
+
+    def b_tree_delete(self, k):
+        self.delete(k)
+
+    def delete(self, k):
+        """
+        Delete k.
+        :return: True if k was deleted, False if it was not found.
+        """
+        self._tree_latch.acquire_read()
+        try:
+            x = self.root
+            x.latch.acquire_write()
+            # a root with two keys keeps at least one after the single merge a deletion can do below it
+            if x.is_leaf or len(x.keys) >= 2:
+                found = self._delete_latched(x, k)
+                if found is not None:
+                    return found
+            else:
+                x.latch.release_write()
+        finally:
+            self._tree_latch.release_read()
+        with self._tree_latch.write():
+            found = self._b_tree_delete(self.root, k)
+            if len(self.root.keys) == 0 and not self.root.is_leaf:
+                old_root = self.root
+                self.root = old_root.children[0]
+                self._free_node(old_root)
+            return found
+
+    def _delete_latched(self, x, k):
+        """
+        _b_tree_delete with write latch crabbing for keys found in a leaf. x is latched. Before the descent moves
+        to a child, the child and the siblings a borrow or merge may use are latched; the parent is released once
+        the child has at least t keys.
+        :return: True if k was deleted, False if it was not found, None if k is in an internal node
+                 and the deletion has to be redone with the tree latch held exclusively.
+        """
+        t = self.t
+        try:
+            while True:
+                i = bisect_left(x.keys, k)
+                if i < len(x.keys) and x.keys[i] == k:
+                    if not x.is_leaf:
+                        return None
+                    x.keys.pop(i)
+                    x.values.pop(i)
+                    return True
+                if x.is_leaf:
+                    return False
+                child = x.children[i]
+                child.latch.acquire_write()
+                if len(child.keys) < t:
+                    siblings = [x.children[j] for j in (i - 1, i + 1) if 0 <= j < len(x.children)]
+                    for sibling in siblings:
+                        sibling.latch.acquire_write()
+                    i = self._fix_shortage(x, i)
+                    kept = x.children[i]  # the left sibling, if the child was merged into it
+                    for node in [child, *siblings]:
+                        if node is not kept:
+                            node.latch.release_write()
+                    child = kept
+                x.latch.release_write()
+                x = child
+        finally:
+            x.latch.release_write()
+
+    def get_many(self, keys, default=None):
+        if hasattr(keys, 'tolist'):
+            keys = keys.tolist()
+        return [self.get(k, default) for k in keys]
+
+    def insert_many(self, pairs):
+        if hasattr(pairs, 'tolist'):
+            pairs = pairs.tolist()
+        for k, v in pairs:
+            self.b_tree_insert(k, v)
+
+    def delete_many(self, keys):
+        if hasattr(keys, 'tolist'):
+            keys = keys.tolist()
+        return sum(self.delete(k) for k in keys)
+
+    def delete_range(self, lo=None, hi=None):
+        self._tree_latch.acquire_write()
+        try:
+            super().delete_range(lo, hi)
+        finally:
+            self._tree_latch.release_write()
+
+    def range(self, lo=None, hi=None, reverse=False):
+        """
+        Lazily yield the entries with lo <= key < hi in key order, in pages of range_page entries.
+        Each page is read with read latch crabbing under the shared tree latch, and every latch is released before
+        the page is yielded, so a scan that is consumed slowly or left open never holds up other threads.
+        A page starts after the last entry yielded, so the changes made between two pages are seen as by a new scan
+        from that key.
+        """
+        start = hi if reverse else lo
+        find = bisect_left
+        skip = 0  # entries with key start that were already yielded
+        while True:
+            page = self._range_page(start, find, skip, lo, hi, reverse)
+            yield from page
+            if len(page) < self.range_page:
+                return
+            last = page[-1][0]
+            tail = 0
+            for k, _ in reversed(page):
+                if k != last:
+                    break
+                tail += 1
+            skip = skip + tail if tail == len(page) and last == start else tail
+            start = last
+            if reverse:
+                find = bisect_right  # the next page starts with the entries with key last that were not yielded
+
+    def _range_page(self, k, find, skip, lo, hi, reverse):
+        """
+        Read a page of range, starting at position find(node.keys, k) (the start, or the end for a reverse scan,
+        of the tree if k is None) and leaving out the first skip entries with key k.
+        The nodes on the path from the root to the current entry stay read-latched until the page is read.
+        :return: A list of at most range_page (key, value) tuples. It is shorter only at the end of the range.
+        """
+        n = self.range_page
+        page = []
+        stack = []
+        self._tree_latch.acquire_read()
+        try:
+            x = self.root
+            while True:
+                x.latch.acquire_read()
+                stack.append([x, 0])
+                if k is None:
+                    i = len(x.keys) if reverse else 0
+                else:
+                    i = find(x.keys, k)
+                stack[-1][1] = i
+                if x.is_leaf:
+                    break
+                x = x.children[i]
+            while stack and len(page) < n:
+                frame = stack[-1]
+                x, i = frame
+                if reverse:
+                    if i == 0:
+                        stack.pop()
+                        x.latch.release_read()
+                        continue
+                    i -= 1
+                    frame[1] = i
+                    if not x.is_leaf:
+                        child = x.children[i]
+                        while True:
+                            child.latch.acquire_read()
+                            stack.append([child, len(child.keys)])
+                            if child.is_leaf:
+                                break
+                            child = child.children[-1]
+                    key = x.keys[i]
+                    if lo is not None and key < lo:
+                        break
+                else:
+                    if i == len(x.keys):
+                        stack.pop()
+                        x.latch.release_read()
+                        continue
+                    frame[1] = i + 1
+                    if not x.is_leaf:
+                        child = x.children[i + 1]
+                        while True:
+                            child.latch.acquire_read()
+                            stack.append([child, 0])
+                            if child.is_leaf:
+                                break
+                            child = child.children[0]
+                    key = x.keys[i]
+                    if hi is not None and not key < hi:
+                        break
+                if skip and key == k:
+                    skip -= 1
+                    continue
+                page.append((key, x.values[i]))
+        finally:
+            for x, _ in stack:
+                x.latch.release_read()
+            self._tree_latch.release_read()
+        return page
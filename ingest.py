@@ -0,0 +1,180 @@
+"""
+Streaming ingestion of (key, value) files into a B-tree.
+
+The file is read in large chunks that end at a line boundary. A chunk is parsed in one go, by splitting the whole
+text on whitespace (or with NumPy, if it is installed) instead of line by line, once a scan of its bytes has shown
+that every line holds exactly one separator; other chunks are parsed line by line. Every chunk is inserted into
+the tree with one insert_many call. Progress is reported every progress_every records instead of once per record.
+
+Lines hold a key and a value separated by a tab (TSV) or a comma (CSV).
+"""
+import sys
+import time
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+CHUNK_SIZE = 1 << 22  # bytes of text parsed and inserted at a time
+_SEPARATORS = bytes.maketrans(b',', b'\t')  # a comma separates a key and a value like a tab
+_NUMBER_BYTES = b'0123456789+-\r'  # deleted to leave the separators and line ends of a chunk
+
+
+def read_chunks(file_path, chunk_size=CHUNK_SIZE):
+    """
+    Read a text file in chunks of about chunk_size characters that end at a line boundary.
+    :param file_path: Path of the file.
+    :param chunk_size: Number of characters read at a time.
+    :return: A generator of strings.
+    """
+    with open(file_path, 'r') as file:
+        rest = ''
+        while True:
+            block = file.read(chunk_size)
+            if not block:
+                break
+            end = block.rfind('\n') + 1
+            if end == 0:  # a line longer than the chunk
+                rest += block
+                continue
+            yield rest + block[:end]
+            rest = block[end:]
+        if rest:
+            yield rest
+
+
+def _well_formed(text, lines):
+    """
+    Check that every line of a chunk holds one separator and otherwise only digits and signs, so that the numbers
+    of the whole chunk pair up line by line. This runs in C over the bytes of the chunk.
+    """
+    try:
+        delimiters = text.encode('ascii').translate(_SEPARATORS, _NUMBER_BYTES)
+    except UnicodeEncodeError:
+        return False
+    expected = b'\t\n' * lines
+    return delimiters == (expected if text.endswith('\n') else expected[:-1])
+
+
+def _parse_lines(text):
+    """
+    Parse a chunk line by line, skipping blank lines.
+    :return: A (keys, values) tuple of lists.
+    :raise ValueError: For the first line that is not a key and a value.
+    """
+    keys = []
+    values = []
+    for line in text.splitlines():
+        fields = line.replace(',', ' ').split()
+        if not fields:
+            continue
+        try:
+            if len(fields) != 2:
+                raise ValueError
+            k, v = int(fields[0]), int(fields[1])
+        except ValueError:
+            raise ValueError(f"malformed line {line!r}: expected '<key>\\t<value>' or '<key>,<value>'") from None
+        keys.append(k)
+        values.append(v)
+    return keys, values
+
+
+def parse_chunk(text, use_numpy=None):
+    """
+    Parse the lines of a chunk into keys and values.
+
+    :param text: Complete lines of '<key>\\t<value>' or '<key>,<value>'.
+    :param use_numpy: Parse with NumPy into int64 arrays. None uses NumPy when it is installed.
+    :return: A (keys, values) tuple of lists, or of NumPy arrays when NumPy is used.
+    """
+    lines = text.count('\n') + (not text.endswith('\n'))
+    if not _well_formed(text, lines):
+        # blank lines, spaces or malformed lines: parse line by line, which reports the line at fault
+        return _parse_lines(text)
+    if ',' in text:
+        text = text.replace(',', ' ')
+    if use_numpy is None:
+        use_numpy = np is not None
+    if use_numpy:
+        numbers = np.fromstring(text, dtype=np.int64, sep=' ')
+    else:
+        numbers = text.split()
+    if len(numbers) != 2 * lines:  # an empty key or value
+        return _parse_lines(text)
+    if use_numpy:
+        return numbers[0::2], numbers[1::2]
+    try:
+        numbers = list(map(int, numbers))
+    except ValueError:  # a sign without digits
+        return _parse_lines(text)
+    return numbers[0::2], numbers[1::2]
+
+
+def read_batches(file_path, chunk_size=CHUNK_SIZE, use_numpy=None):
+    """
+    Read a file as batches of parsed keys and values.
+    :param file_path: Path of the file.
+    :param chunk_size: Number of characters parsed at a time.
+    :param use_numpy: See parse_chunk.
+    :return: A generator of (keys, values) tuples.
+    """
+    for text in read_chunks(file_path, chunk_size):
+        yield parse_chunk(text, use_numpy)
+
+
+class Progress:
+    """
+    Reports a running count of records every `every` records, with the rate since the start.
+    """
+
+    def __init__(self, verb, every=1000000, quiet=False, out=None):
+        """
+        :param verb: What happens to the records, e.g. 'inserted'.
+        :param every: Number of records between two reports.
+        :param quiet: Report nothing.
+        :param out: Stream to report to, sys.stderr by default.
+        """
+        self.verb = verb
+        self.every = every
+        self.quiet = quiet
+        self.out = out if out is not None else sys.stderr
+        self.count = 0
+        self._next = every
+        self._start = time.perf_counter()
+
+    def add(self, n):
+        self.count += n
+        if self.count >= self._next:
+            self._next = (self.count // self.every + 1) * self.every
+            self.report()
+
+    def report(self):
+        if not self.quiet:
+            elapsed = time.perf_counter() - self._start
+            print(f"{self.verb} {self.count} records ({self.count / max(elapsed, 1e-9):,.0f} records/s)",
+                  file=self.out)
+
+
+def ingest(tree, file_path, chunk_size=CHUNK_SIZE, progress_every=1000000, quiet=False, use_numpy=None):
+    """
+    Insert every record of a file into a tree, one insert_many batch per chunk.
+
+    :param tree: A BTree, or any tree with insert_many.
+    :param file_path: Path of the TSV or CSV file.
+    :param chunk_size: Number of characters parsed and inserted at a time.
+    :param progress_every: Number of records between two progress reports on stderr.
+    :param quiet: Report no progress.
+    :param use_numpy: See parse_chunk.
+    :return: The number of records inserted.
+    """
+    progress = Progress("inserted", progress_every, quiet)
+    for keys, values in read_batches(file_path, chunk_size, use_numpy):
+        if np is not None and isinstance(keys, np.ndarray):
+            tree.insert_many(np.column_stack((keys, values)))
+        else:
+            tree.insert_many(zip(keys, values))
+        progress.add(len(keys))
+    if progress.count % progress_every:
+        progress.report()
+    return progress.count
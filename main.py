@@ -1,33 +1,299 @@
+import copy
+import heapq
+import os
 import sys
+import tempfile
 import traceback
+from array import array
+from time import perf_counter
+from bisect import bisect_left, bisect_right
+from itertools import islice
+from operator import itemgetter
+
+
+def _parse_pairs(lines):
+    """
+    Parse tab-separated (key, value) lines into pairs of integers.
+    :param lines: An iterable of lines, e.g. an open file.
+    :return: A generator of (key, value) tuples.
+    """
+    for line in lines:
+        key_val = line.strip().split('\t')
+        yield int(key_val[0]), int(key_val[1])
+
+
+_NO_CHILDREN = ()  # shared by the leaves of compact trees
 
 
 class BTreeNode:
-    def __init__(self, key_value_list, children, is_leaf):
+    def __init__(self, keys, values, children, is_leaf):
         """
         Initialize a BTreeNode.
 
-        :param key_value_list: A list of tuples(key, value).
+        :param keys: A sorted list of keys.
+        :param values: A list of values, where values[i] belongs to keys[i].
         :param children: A list of children(BTreeNode).
         :param is_leaf: A boolean value representing whether it is a leaf node.
         """
-        self.key_value_list = key_value_list
+        self.keys = keys
+        self.values = values
         self.children = children
         self.is_leaf = is_leaf
 
 
+class CompactBTreeNode:
+    """
+    A BTreeNode without a per-instance __dict__, used by BTree(t, compact=True).
+    While every key and value of the tree is a 64-bit integer, keys and values are kept in array('q')
+    buffers instead of lists of int objects, and leaves share one empty tuple as their children.
+    """
+    __slots__ = ('keys', 'values', 'children', 'is_leaf', 'size')
+
+    def __init__(self, keys, values, children, is_leaf):
+        self.keys = keys
+        self.values = values
+        self.children = children
+        self.is_leaf = is_leaf
+
+
+def _is_int64(x):
+    return type(x) is int and -0x8000000000000000 <= x <= 0x7fffffffffffffff
+
+
 class BTree:
-    def __init__(self, t):
+    stats = None  # a metrics.TreeStats while instrumentation is enabled, see enable_stats
+    filter = None  # a bloom.CountingBloomFilter of the keys while enabled, see enable_filter
+    no_filter_reason = None  # why a subclass cannot keep a filter, or None if it can
+    no_split_reason = None  # why a subclass cannot be split and joined, or None if it can
+
+    def __init__(self, t, compact=False, order_stats=False):
         """
         create an empty root node.
 
         :param t: The minimum degree of the B-tree. Every node other than the root must have at least t-1 keys.
                 Every internal node other than the root thus has at least t children.
                 Every node may contain at most 2t-1 keys. Therefore, internal node may have at most 2t children.
+        :param compact: Use CompactBTreeNode to cut the memory per key. Keys and values are stored in
+                array('q') buffers until the first key or value that is not a 64-bit integer is inserted,
+                then every node falls back to lists.
+        :param order_stats: Keep the number of keys of its subtree in every node (node.size), for rank, select and
+                count_range in O(t log n). Inserts and deletes update the sizes on their path.
 
         """
-        self.root = BTreeNode([], [], True)
         self.t = t
+        self.compact = compact
+        self._typed = compact  # keys and values are stored in array('q') buffers
+        self.order_stats = order_stats
+        self.root = self._new_node([], [], [], True)
+
+    def _new_node(self, keys, values, children, is_leaf):
+        """
+        Create a node of the kind this tree stores. Every node of the tree is created here.
+        :param keys: A sorted list of keys.
+        :param values: A list of values, where values[i] belongs to keys[i].
+        :param children: A list of children(BTreeNode).
+        :param is_leaf: A boolean value representing whether it is a leaf node.
+        :return: The new node.
+        """
+        if not self.compact:
+            node = BTreeNode(keys, values, children, is_leaf)
+        else:
+            if self._typed:
+                if not isinstance(keys, array):
+                    keys = array('q', keys)
+                if not isinstance(values, array):
+                    values = array('q', values)
+            node = CompactBTreeNode(keys, values, _NO_CHILDREN if is_leaf else children, is_leaf)
+        if self.order_stats:
+            node.size = len(keys) + sum(child.size for child in node.children)
+        return node
+
+    def _free_node(self, node):
+        """
+        Called when a node is dropped from the tree by a merge or when the root shrinks.
+        Nodes in memory are simply left to the garbage collector; subclasses that store nodes elsewhere release them here.
+        :param node: The dropped node. Its children have already been handed over to another node.
+        :return: None. This function performs its operation without returning a value.
+        """
+
+    def enable_stats(self):
+        """
+        Start recording the latency and node visits of every search, insert and delete, and counting splits,
+        merges and borrows. While disabled, the operations only test self.stats once each.
+        :return: The metrics.TreeStats the tree records into. See metrics.snapshot for exporting it.
+        """
+        from metrics import TreeStats
+
+        self.stats = TreeStats()
+        return self.stats
+
+    def disable_stats(self):
+        self.stats = None
+
+    def enable_filter(self, capacity=None, error_rate=0.01):
+        """
+        Keep a counting Bloom filter of the keys, so that b_tree_search, get_many and the deletes return at once
+        for keys that are certainly not in the tree. Inserts add their key to the filter, deletes remove it, and
+        the filter is rebuilt twice as large whenever the tree outgrows its capacity.
+        :param capacity: The number of keys the filter is sized for. Default: twice the current number, at least 1024.
+        :param error_rate: The false-positive rate of the filter at capacity.
+        :return: The bloom.CountingBloomFilter. See its snapshot for its memory and false-positive rate.
+        :raise TypeError: If the class of the tree cannot keep a filter (see no_filter_reason).
+        """
+        if self.no_filter_reason is not None:
+            raise TypeError(f"{type(self).__name__} cannot keep a filter: {self.no_filter_reason}")
+        from bloom import CountingBloomFilter
+
+        keys = [k for k, _ in self]
+        bloom = CountingBloomFilter(capacity or max(1024, 2 * len(keys)), error_rate)
+        for k in keys:
+            bloom.add(k)
+        self.filter = bloom
+        return bloom
+
+    def disable_filter(self):
+        self.filter = None
+
+    def _filter_add(self, k):
+        bloom = self.filter
+        bloom.add(k)
+        if bloom.count > bloom.capacity:
+            self.enable_filter(2 * bloom.capacity, bloom.error_rate)
+
+    def _untype(self):
+        """
+        Convert the array('q') buffers of every node back into lists, so keys and values of any type can be stored.
+        :return: None. This function performs its operation without returning a value.
+        """
+        self._typed = False
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            node.keys = list(node.keys)
+            node.values = list(node.values)
+            stack.extend(node.children)
+
+    @classmethod
+    def bulk_load(cls, iterable, t, fill_factor=1.0, **kwargs):
+        """
+        Build a B-tree bottom-up from (key, value) pairs that are already sorted by key.
+        Leaves are packed left to right in a single pass, and every upper level is built from the
+        separator keys of the level below, so no node is ever split.
+
+        :param iterable: (key, value) pairs in non-decreasing key order.
+        :param t: The minimum degree of the B-tree.
+        :param fill_factor: Fraction of the 2t-1 slots to fill in every node. It is clamped so that
+                every node other than the root still holds at least t-1 keys.
+        :param kwargs: Further keyword arguments of the BTree constructor, e.g. compact.
+        :return: A new BTree holding all pairs.
+        """
+        if not 0 < fill_factor <= 1:
+            raise ValueError(f"fill_factor must be in (0, 1], got {fill_factor}")
+        keys = []
+        values = []
+        for k, v in iterable:
+            if keys and k < keys[-1]:
+                raise ValueError(f"bulk_load input is not sorted: {k} comes after {keys[-1]}")
+            keys.append(k)
+            values.append(v)
+        tree = cls(t, **kwargs)
+        tree._build_from_sorted(keys, values, fill_factor)
+        return tree
+
+    @classmethod
+    def bulk_load_file(cls, file_path, t, fill_factor=1.0, run_size=1000000, **kwargs):
+        """
+        Build a B-tree from a tab-separated file of (key, value) lines in any order.
+        The file is cut into runs of run_size lines, each run is sorted and spilled to a temporary file,
+        and the runs are merged into bulk_load, so at most one run is held in memory besides the tree.
+
+        :param file_path: Path of the input file.
+        :param t: The minimum degree of the B-tree.
+        :param fill_factor: See bulk_load.
+        :param run_size: Number of lines sorted in memory at once.
+        :param kwargs: Further keyword arguments of the BTree constructor, e.g. compact.
+        :return: A new BTree holding all pairs of the file.
+        """
+        by_key = itemgetter(0)
+        with open(file_path, 'r') as file, tempfile.TemporaryDirectory() as run_dir:
+            runs = []
+            pairs = _parse_pairs(file)
+            while True:
+                run = sorted(islice(pairs, run_size), key=by_key)
+                if not runs and len(run) < run_size:  # the whole file fits into one run
+                    return cls.bulk_load(run, t, fill_factor, **kwargs)
+                if not run:
+                    break
+                run_path = os.path.join(run_dir, f"run{len(runs)}.tsv")
+                with open(run_path, 'w') as run_file:
+                    run_file.writelines(f"{k}\t{v}\n" for k, v in run)
+                runs.append(run_path)
+            run_files = [open(run_path, 'r') for run_path in runs]
+            try:
+                merged = heapq.merge(*(_parse_pairs(run_file) for run_file in run_files), key=by_key)
+                return cls.bulk_load(merged, t, fill_factor, **kwargs)
+            finally:
+                for run_file in run_files:
+                    run_file.close()
+
+    def _level_sizes(self, n, fill_factor):
+        """
+        Decide how n keys of one level are cut into nodes. Consecutive nodes are separated by one key
+        that moves up to the parent level, so g nodes hold n-g+1 keys in total.
+        :param n: Number of keys on the level.
+        :param fill_factor: Target fraction of the 2t-1 slots to fill.
+        :return: A list with the number of keys of each node.
+        """
+        t = self.t
+        capacity = min(2 * t - 1, max(t - 1, round(fill_factor * (2 * t - 1))))
+        g = -(-(n + 1) // (capacity + 1))
+        # every node must keep between t-1 and 2t-1 keys, unless it is the only (root) node
+        g = max(-(-(n + 1) // (2 * t)), min(g, max(1, (n + 1) // t)))
+        base, extra = divmod(n - g + 1, g)
+        return [base + 1 if j < extra else base for j in range(g)]
+
+    def _build_from_sorted(self, keys, values, fill_factor):
+        """
+        Replace the tree with one built bottom-up from sorted keys and values.
+        :param keys: A sorted list of keys.
+        :param values: A list of values, where values[i] belongs to keys[i].
+        :param fill_factor: Target fraction of the 2t-1 slots to fill.
+        :return: None. This function performs its operation without returning a value.
+        """
+        if self._typed and not (all(map(_is_int64, keys)) and all(map(_is_int64, values))):
+            self._typed = False
+        level = []
+        pos = 0
+        sep_keys = []
+        sep_values = []
+        for j, size in enumerate(self._level_sizes(len(keys), fill_factor)):
+            if j > 0:
+                sep_keys.append(keys[pos])
+                sep_values.append(values[pos])
+                pos += 1
+            level.append(self._new_node(keys[pos:pos + size], values[pos:pos + size], [], True))
+            pos += size
+        while len(level) > 1:
+            keys, values = sep_keys, sep_values
+            children = level
+            level = []
+            pos = 0
+            sep_keys = []
+            sep_values = []
+            for j, size in enumerate(self._level_sizes(len(keys), fill_factor)):
+                if j > 0:
+                    sep_keys.append(keys[pos])
+                    sep_values.append(values[pos])
+                    pos += 1
+                # a node with size keys takes the next size+1 nodes of the level below as children;
+                # the keys consumed so far (separators included) equal the children handed out so far
+                level.append(self._new_node(keys[pos:pos + size], values[pos:pos + size],
+                                            children[pos:pos + size + 1], False))
+                pos += size
+        self._free_node(self.root)
+        self.root = level[0]
+        if self.filter is not None:
+            self.enable_filter(error_rate=self.filter.error_rate)
 
     def b_tree_search(self, x, k):
         """
@@ -37,18 +303,66 @@ class BTree:
         :param k: A key to be searched for
         :return: A tuple (node, index) where 'node' is the node containing the key 'k', and its index is 'i'. Returns None if 'k' is not found.
         """
+        if self.filter is not None and x is self.root:
+            return self._b_tree_search_filtered(x, k)
+        if self.stats is not None:
+            return self._b_tree_search_counted(x, k)
+        while True:
+            i = bisect_left(x.keys, k)
+            if i < len(x.keys) and k == x.keys[i]:
+                return (x, i)
+            elif x.is_leaf:
+                return None
+            x = x.children[i]
 
-        i = 0
-        while i < len(x.key_value_list) and k > x.key_value_list[i][0]:
-            i = i + 1
-        if i < len(x.key_value_list) and k == x.key_value_list[i][0]:
-            return (x, i)
-        elif x.is_leaf:
+    def _b_tree_search_filtered(self, x, k):
+        """
+        b_tree_search from the root that asks self.filter first, and counts the lookups the filter ruled out or
+        let through in vain.
+        """
+        bloom = self.filter
+        bloom.checks += 1
+        if self.stats is not None:
+            start = perf_counter()
+        if k not in bloom:
+            bloom.negatives += 1
+            if self.stats is not None:
+                self.stats.record('search', perf_counter() - start, 0)
             return None
+        if self.stats is not None:
+            result = self._b_tree_search_counted(x, k)
         else:
-            return self.b_tree_search(x.children[i], k)
-
+            while True:
+                i = bisect_left(x.keys, k)
+                if i < len(x.keys) and k == x.keys[i]:
+                    result = (x, i)
+                    break
+                elif x.is_leaf:
+                    result = None
+                    break
+                x = x.children[i]
+        if result is None:
+            bloom.false_positives += 1
+        return result
 
+    def _b_tree_search_counted(self, x, k):
+        """
+        b_tree_search that records its latency and the number of nodes it visits in self.stats.
+        """
+        start = perf_counter()
+        visits = 0
+        while True:
+            visits += 1
+            i = bisect_left(x.keys, k)
+            if i < len(x.keys) and k == x.keys[i]:
+                result = (x, i)
+                break
+            elif x.is_leaf:
+                result = None
+                break
+            x = x.children[i]
+        self.stats.record('search', perf_counter() - start, visits)
+        return result
 
     def _b_tree_split_child(self, x, i):
         """
@@ -64,66 +378,96 @@ class BTree:
         :return: None. This function performs its operation without returning a value.
         """
 
+        if self.stats is not None:
+            self.stats.splits += 1
+        t = self.t
         y = x.children[i]
-        z = BTreeNode([], [], y.is_leaf)
-        z.key_value_list.extend(y.key_value_list[self.t: 2 * self.t - 1])
-        for j in range(self.t, 2 * self.t - 1):
-            y.key_value_list.pop()
+        z = self._new_node(y.keys[t:], y.values[t:], [], y.is_leaf)
         if not y.is_leaf:
-            z.children.extend(y.children[self.t: 2 * self.t])
-            for j in range(self.t, 2 * self.t):
-                y.children.pop()
+            z.children.extend(y.children[t:])
+            del y.children[t:]
         x.children.insert(i+1, z)
-        x.key_value_list.insert(i, y.key_value_list[self.t - 1])
-        y.key_value_list.pop()
+        x.keys.insert(i, y.keys[t - 1])
+        x.values.insert(i, y.values[t - 1])
+        del y.keys[t - 1:]
+        del y.values[t - 1:]
+        if self.order_stats:
+            z.size = len(z.keys) + sum(child.size for child in z.children)
+            y.size -= z.size + 1
 
 
     def b_tree_insert(self, k, v):
         """
         Insert a key k and value v into the B-tree in a single pass down the tree.
-        The b_tree_insert procedure uses _b_tree_split_child to guarantee that the recursion never descends to a full node.
+        The b_tree_insert procedure uses _b_tree_split_child to guarantee that the descent never reaches a full node.
         :param k: A key to insert.
         :param v: A value to insert.
         :return: None. This function performs its operation without returning a value.
         """
+        stats = self.stats
+        if stats is not None:
+            start = perf_counter()
+        if self._typed and not (_is_int64(k) and _is_int64(v)):
+            self._untype()
         r = self.root
-        if len(self.root.key_value_list) == 2 * self.t - 1:
-            s = BTreeNode([], [], False)
-            self.root = s
-            s.children.insert(0, r)
-            self._b_tree_split_child(s, 0)
-            self._b_tree_insert_nonfull(s, k, v)
-        else:
+        if len(self.root.keys) == 2 * self.t - 1:
+            r = self._split_root()
+        if stats is None:
             self._b_tree_insert_nonfull(r, k, v)
+        else:
+            path = [[r, None]]
+            self._b_tree_insert_nonfull(r, k, v, path)
+        if self.filter is not None:
+            self._filter_add(k)
+        if stats is not None:
+            stats.record('insert', perf_counter() - start, len(path))
+
+    def _split_root(self):
+        """
+        Split the full root under a new root, which makes the tree one level taller.
+        :return: The new root, which has a single key.
+        """
+        r = self.root
+        s = self._new_node([], [], [], False)
+        self.root = s
+        s.children.insert(0, r)
+        if self.order_stats:
+            s.size = r.size
+        self._b_tree_split_child(s, 0)
+        return s
 
-    def _b_tree_insert_nonfull(self, x, k, v):
+    def _b_tree_insert_nonfull(self, x, k, v, path=None):
         """
         Insert key k and value v into the tree rooted at the nonfull root node.
-        _b_tree_insert_nonfull recurses as necessary down the tree, at all times guaranteeing
-        that the node to which it recurses is not full by calling _b_tree_split_child as necessary.
+        _b_tree_insert_nonfull walks down the tree in a loop, at all times guaranteeing
+        that the node to which it descends is not full by calling _b_tree_split_child as necessary.
 
         :param x: A node to insert.
         :param k: A key to insert into node x.
         :param v: A value to insert into node x.
+        :param path: Optional list of [node, hi] frames ending with the frame of x. A frame is appended for every
+                node the insertion descends to, where hi is the first key that is routed past the node
+                (None for no bound).
         :return: None. This function performs its operation without returning a value.
         """
-        i = len(x.key_value_list) - 1
-        if x.is_leaf:
-            x.key_value_list.append((None, None))
-            while i >= 0 and k < x.key_value_list[i][0]:
-                x.key_value_list[i + 1] = x.key_value_list[i]
-                i = i - 1
-            x.key_value_list[i + 1] = (k, v)
-        else:
-            while i >= 0 and k < x.key_value_list[i][0]:
-                i = i - 1
-            i = i + 1
-            if len(x.children[i].key_value_list) == 2 * self.t - 1:
+        full = 2 * self.t - 1
+        sized = self.order_stats
+        while not x.is_leaf:
+            if sized:
+                x.size += 1
+            i = bisect_right(x.keys, k)
+            if len(x.children[i].keys) == full:
                 self._b_tree_split_child(x, i)
-                if k > x.key_value_list[i][0]:
+                if k > x.keys[i]:
                     i = i + 1
-
-            self._b_tree_insert_nonfull(x.children[i], k, v)
+            if path is not None:
+                path.append([x.children[i], x.keys[i] if i < len(x.keys) else path[-1][1]])
+            x = x.children[i]
+        if sized:
+            x.size += 1
+        i = bisect_right(x.keys, k)  # equal keys stay in insertion order
+        x.keys.insert(i, k)
+        x.values.insert(i, v)
 
     def _pred(self, x):
         """
@@ -134,7 +478,7 @@ class BTree:
         """
         while not x.is_leaf:
             x = x.children[-1]
-        return x.key_value_list[-1]
+        return x.keys[-1], x.values[-1]
 
     def _succ(self, x):
         """
@@ -145,35 +489,46 @@ class BTree:
         """
         while not x.is_leaf:
             x = x.children[0]
-        return x.key_value_list[0]
+        return x.keys[0], x.values[0]
 
     def _merge(self, x, i):
         """
-        Merge children nodes x.children[i] and x.children[i + 1] along with node x.key_value_list[i]
+        Merge children nodes x.children[i] and x.children[i + 1] along with node x.keys[i]
         :param x: A parent node of the subtree.
         :param i: Index of the node to merge.
         :return: None. This function performs its operation without returning a value.
         """
+        if self.stats is not None:
+            self.stats.merges += 1
         if len(x.children) == 2 and x == self.root:
             left_children = x.children[0]
             right_children = x.children[1]
-            root_node = x.key_value_list[0]
 
-            left_children.key_value_list.append(root_node)
-            left_children.key_value_list.extend(right_children.key_value_list)
+            left_children.keys.append(x.keys[0])
+            left_children.values.append(x.values[0])
+            left_children.keys.extend(right_children.keys)
+            left_children.values.extend(right_children.values)
             if not left_children.is_leaf:
                 left_children.children.extend(right_children.children)
+            if self.order_stats:
+                left_children.size += 1 + right_children.size
             self.root = left_children
+            self._free_node(x)
+            self._free_node(right_children)
         else:
             left_children = x.children[i]
             right_children = x.children[i + 1]
-            mid_node = x.key_value_list.pop(i)
-            left_children.key_value_list.append(mid_node)
-            left_children.key_value_list.extend(right_children.key_value_list)
+            left_children.keys.append(x.keys.pop(i))
+            left_children.values.append(x.values.pop(i))
+            left_children.keys.extend(right_children.keys)
+            left_children.values.extend(right_children.values)
             if not left_children.is_leaf:
                 left_children.children.extend(right_children.children)
+            if self.order_stats:
+                left_children.size += 1 + right_children.size
 
             x.children.pop(i+1)  # remove the right children from the parent x
+            self._free_node(right_children)
     def _borrow_from_left(self, parent, i):
         """
         Borrow from the left sibling (not from the parent's perspective)
@@ -181,12 +536,20 @@ class BTree:
         :param i: Index of the child node that borrows from the left sibling
         :return: None. This function performs its operation without returning a value.
         """
+        if self.stats is not None:
+            self.stats.borrows_left += 1
         left_sibling = parent.children[i-1]  # not parent's sibling
         me = parent.children[i]  # node which needs to borrow from the left_sibling
-        me.key_value_list.insert(0, parent.key_value_list[i-1])  # take parent's data
-        parent.key_value_list[i-1] = left_sibling.key_value_list.pop()  # swap parent's data with the left sibling's biggest data
+        me.keys.insert(0, parent.keys[i-1])  # take parent's data
+        me.values.insert(0, parent.values[i-1])
+        parent.keys[i-1] = left_sibling.keys.pop()  # swap parent's data with the left sibling's biggest data
+        parent.values[i-1] = left_sibling.values.pop()
         if not me.is_leaf:
             me.children.insert(0, left_sibling.children.pop())
+        if self.order_stats:
+            moved = 1 + (me.children[0].size if not me.is_leaf else 0)
+            me.size += moved
+            left_sibling.size -= moved
 
     def _borrow_from_right(self, parent, i):
         """
@@ -195,12 +558,20 @@ class BTree:
         :param i: Index of the child node("me") that borrows from the right sibling
         :return: None. This function performs its operation without returning a value.
         """
+        if self.stats is not None:
+            self.stats.borrows_right += 1
         right_sibling = parent.children[i+1]  # not parent's sibling
         me = parent.children[i]  # node which needs to borrow from the right_sibling
-        me.key_value_list.append(parent.key_value_list[i])  # take parent's data
-        parent.key_value_list[i] = right_sibling.key_value_list.pop(0)  # swap parent's data with the right sibling's smallest data
+        me.keys.append(parent.keys[i])  # take parent's data
+        me.values.append(parent.values[i])
+        parent.keys[i] = right_sibling.keys.pop(0)  # swap parent's data with the right sibling's smallest data
+        parent.values[i] = right_sibling.values.pop(0)
         if not me.is_leaf:
             me.children.append(right_sibling.children.pop(0))
+        if self.order_stats:
+            moved = 1 + (me.children[-1].size if not me.is_leaf else 0)
+            me.size += moved
+            right_sibling.size -= moved
     def _fix_shortage(self, x, i):
         """
         Reshape (fix shortage) if the number of data is below t-1 after deleting
@@ -208,12 +579,12 @@ class BTree:
         :param i: index of the child node to fix
         :return: changed i value
         """
-        if i < len(x.key_value_list) and len(x.children[i+1].key_value_list) >= self.t:
+        if i < len(x.keys) and len(x.children[i+1].keys) >= self.t:
             self._borrow_from_right(x, i)
-        elif i > 0 and len(x.children[i-1].key_value_list) >= self.t:
+        elif i > 0 and len(x.children[i-1].keys) >= self.t:
             self._borrow_from_left(x, i)
         else:
-            if i == len(x.key_value_list):  # if the child to deal with is the right-most one
+            if i == len(x.keys):  # if the child to deal with is the right-most one
                 self._merge(x, i-1)
                 return i-1
             else:
@@ -229,64 +600,651 @@ class BTree:
         """
         if self.root is None:
             return None
-        self._b_tree_delete(self.root, k)
-        if len(self.root.key_value_list) == 0:
+        if self.filter is not None and k not in self.filter:
+            return None
+        stats = self.stats
+        if stats is None:
+            deleted = self._b_tree_delete(self.root, k)
+        else:
+            start = perf_counter()
+            path = [[self.root, None, None]]
+            deleted = self._b_tree_delete(self.root, k, path)
+        if deleted and self.filter is not None:
+            self.filter.remove(k)
+        if len(self.root.keys) == 0:
             if not self.root.is_leaf:
                 """
                 Consider a B-tree where the root node has a single key and two children. 
                 If the only key in the root is deleted, and it was the median that allowed for merging its two children into one, 
                 the root would be left with no keys
                 """
-                self.root = self.root.children[0]
+                old_root = self.root
+                self.root = old_root.children[0]
+                self._free_node(old_root)
+        if stats is not None:
+            stats.record('delete', perf_counter() - start, len(path))
         return
 
-    def _b_tree_delete(self, x, k):
+    def _b_tree_delete(self, x, k, path=None):
         """
         Helper function to delete a key k and the corresponding value v from the B-tree.
 
         :param x: A root of the subtree.
         :param k: A key to delete.
-        :return: None. This function performs its operation without returning a value.
+        :param path: Optional list of [node, lo, hi] frames ending with the frame of x. A frame is appended for every
+                node the deletion descends to, where only keys strictly between lo and hi are routed to the node
+                (None for no bound).
+        :return: True if a key was deleted, False if k was not found.
         """
 
-        i = 0
-        while i < len(x.key_value_list) and k > x.key_value_list[i][0]:
-            i += 1
-        if i < len(x.key_value_list) and x.key_value_list[i][0] == k:  # found a key to delete
-            if x.is_leaf:
-                x.key_value_list.pop(i)
-            else:  # if x is not a leaf
-                if len(x.children[i].key_value_list) >= self.t:
+        t = self.t
+        visited = [] if self.order_stats else None  # nodes whose subtree loses a key if k is found
+        while True:
+            if visited is not None:
+                visited.append(x)
+            i = bisect_left(x.keys, k)
+            if i < len(x.keys) and x.keys[i] == k:  # found a key to delete
+                if x.is_leaf:
+                    x.keys.pop(i)
+                    x.values.pop(i)
+                    if visited is not None:
+                        for node in visited:
+                            node.size -= 1
+                    return True
+                # if x is not a leaf
+                if len(x.children[i].keys) >= t:
                     node_pred = self._pred(x.children[i])
-                    x.key_value_list[i] = node_pred
+                    x.keys[i], x.values[i] = node_pred
                     # logically, the target node to delete is swapped with the predecessor
-                    self._b_tree_delete(x.children[i], node_pred[0])
-                elif len(x.children[i+1].key_value_list) >= self.t:
+                    k = node_pred[0]
+                elif len(x.children[i+1].keys) >= t:
                     node_pred = self._succ(x.children[i+1])
-                    x.key_value_list[i] = node_pred
-                    self._b_tree_delete(x.children[i+1], node_pred[0])
+                    x.keys[i], x.values[i] = node_pred
+                    k = node_pred[0]
+                    i = i + 1
                 else:
                     self._merge(x, i)
-                    self._b_tree_delete(x.children[i], k)
-        else:  # if target key is not in the current node
-            if x.is_leaf:  # if not found until leaf
-                return
-            if len(x.children[i].key_value_list) < self.t:
-                i = self._fix_shortage(x, i)
-            self._b_tree_delete(x.children[i], k)
+            else:  # if target key is not in the current node
+                if x.is_leaf:  # if not found until leaf
+                    return False
+                if len(x.children[i].keys) < t:
+                    i = self._fix_shortage(x, i)
+            if path is not None:
+                path.append([x.children[i], x.keys[i-1] if i > 0 else path[-1][1],
+                             x.keys[i] if i < len(x.keys) else path[-1][2]])
+            x = x.children[i]
+
+    def get_many(self, keys, default=None):
+        """
+        Look up a batch of keys in one walk of the tree.
+        The batch is sorted, and all keys that fall into the same subtree share the descent into it,
+        so every node is visited at most once per batch.
+
+        :param keys: An iterable of keys, e.g. a list or a NumPy array.
+        :param default: The value returned for keys that are not in the tree.
+        :return: A list of values in the order of keys.
+        """
+        if self.stats is not None:
+            start = perf_counter()
+        if hasattr(keys, 'tolist'):  # NumPy arrays and array.array
+            keys = keys.tolist()
+        keys = list(keys)
+        bloom = self.filter
+        if bloom is None:
+            order = sorted(range(len(keys)), key=keys.__getitem__)
+        else:
+            # only the keys the filter cannot rule out are looked up
+            order = sorted([j for j, k in enumerate(keys) if k in bloom], key=keys.__getitem__)
+            bloom.checks += len(keys)
+            bloom.negatives += len(keys) - len(order)
+        batch = [keys[j] for j in order]
+        found = [default] * len(batch)
+        stack = [(self.root, 0, len(batch))]
+        while stack:
+            x, lo, hi = stack.pop()  # batch[lo:hi] falls into the subtree of x
+            pos = lo
+            while pos < hi:
+                k = batch[pos]
+                i = bisect_left(x.keys, k)
+                if i < len(x.keys) and x.keys[i] == k:
+                    v = x.values[i]
+                    while pos < hi and batch[pos] == k:
+                        found[pos] = v
+                        pos += 1
+                else:
+                    # every key of the batch before x.keys[i] goes to the same child
+                    end = bisect_left(batch, x.keys[i], pos, hi) if i < len(x.keys) else hi
+                    if not x.is_leaf:
+                        stack.append((x.children[i], pos, end))
+                    elif bloom is not None:
+                        bloom.false_positives += end - pos
+                    pos = end
+        result = [default] * len(keys)
+        for pos, j in enumerate(order):
+            result[j] = found[pos]
+        if self.stats is not None:
+            self.stats.record('get_many', perf_counter() - start)
+        return result
+
+    def insert_many(self, pairs):
+        """
+        Insert a batch of (key, value) pairs.
+        The batch is sorted by key, and each insertion starts from the deepest node on the path of the previous one
+        that still covers the key and is not full, instead of from the root.
+
+        :param pairs: An iterable of (key, value) pairs, e.g. a list or a NumPy array of shape (n, 2).
+        :return: None. This function performs its operation without returning a value.
+        """
+        stats = self.stats
+        if stats is not None:
+            start = perf_counter()
+        if hasattr(pairs, 'tolist'):
+            pairs = pairs.tolist()
+        full = 2 * self.t - 1
+        path = []  # [node, hi] frames of the previous insertion, root first
+        for k, v in sorted(pairs, key=itemgetter(0)):
+            if self._typed and not (_is_int64(k) and _is_int64(v)):
+                self._untype()
+            # keys only grow, so a node on the path covers k as long as k is below its upper bound
+            while path and not ((path[-1][1] is None or k < path[-1][1]) and len(path[-1][0].keys) < full):
+                path.pop()
+            if not path:
+                path.append([self._split_root() if len(self.root.keys) == full else self.root, None])
+            if self.order_stats:
+                for frame in path[:-1]:  # the insertion only counts itself in the nodes from path[-1] down
+                    frame[0].size += 1
+            self._b_tree_insert_nonfull(path[-1][0], k, v, path)
+            if self.filter is not None:
+                self._filter_add(k)
+        if stats is not None:
+            stats.record('insert_many', perf_counter() - start)
+
+    def delete_many(self, keys):
+        """
+        Delete a batch of keys.
+        The batch is sorted, and each deletion starts from the deepest node on the path of the previous one
+        that still covers the key and has at least t keys, instead of from the root.
+
+        :param keys: An iterable of keys, e.g. a list or a NumPy array.
+        :return: The number of keys deleted.
+        """
+        if self.stats is not None:
+            start = perf_counter()
+        if hasattr(keys, 'tolist'):
+            keys = keys.tolist()
+        deleted = 0
+        path = []  # [node, lo, hi] frames of the previous deletion, root first
+        bloom = self.filter
+        for k in sorted(keys):
+            if bloom is not None and k not in bloom:
+                continue
+            # a node below the root can only lose a key to a merge if it has more than t-1 keys
+            while path and not ((path[-1][1] is None or path[-1][1] < k) and (path[-1][2] is None or k < path[-1][2])
+                                and (len(path) == 1 or len(path[-1][0].keys) >= self.t)):
+                path.pop()
+            if not path:
+                path.append([self.root, None, None])
+            depth = len(path)
+            if self._b_tree_delete(path[-1][0], k, path):
+                deleted += 1
+                if self.order_stats:
+                    for frame in path[:depth - 1]:
+                        frame[0].size -= 1
+                if bloom is not None:
+                    bloom.remove(k)
+            if len(self.root.keys) == 0 and not self.root.is_leaf:
+                old_root = self.root
+                self.root = old_root.children[0]
+                self._free_node(old_root)
+            if path[0][0] is not self.root:
+                path.clear()
+        if self.stats is not None:
+            self.stats.record('delete_many', perf_counter() - start)
+        return deleted
+
+    def _height(self, x):
+        h = 0
+        while not x.is_leaf:
+            x = x.children[0]
+            h += 1
+        return h
+
+    def _fix_pair(self, x, i):
+        """
+        Give both x.children[i] and x.children[i + 1] at least t-1 keys, by merging them if their keys fit into one
+        node and by moving keys from one to the other otherwise.
+        """
+        t = self.t
+        y = x.children[i]
+        z = x.children[i + 1]
+        if len(y.keys) + len(z.keys) < 2 * t - 1:
+            self._merge(x, i)
+            return
+        while len(y.keys) < t - 1:
+            self._borrow_from_right(x, i)
+        while len(z.keys) < t - 1:
+            self._borrow_from_left(x, i + 1)
+
+    def _split_overfull(self, spine, i, h):
+        """
+        Split the nodes of spine that have 2t keys, bottom-up.
+        :param spine: A path of nodes from a root down, each node being child i of the one before it.
+        :param i: 0 for a path along the first children, -1 for a path along the last children.
+        :param h: The height of the root.
+        :return: A tuple (root, height), the root being a new one if the old one was split.
+        """
+        full = 2 * self.t - 1
+        for depth in range(len(spine) - 1, 0, -1):
+            if len(spine[depth].keys) <= full:
+                break
+            parent = spine[depth - 1]
+            self._b_tree_split_child(parent, i % len(parent.children))
+        root = spine[0]
+        if len(root.keys) <= full:
+            return root, h
+        s = self._new_node([], [], [], False)
+        s.children.insert(0, root)
+        if self.order_stats:
+            s.size = root.size
+        self._b_tree_split_child(s, 0)
+        return s, h + 1
+
+    def _join3(self, a, ha, k, v, b, hb):
+        """
+        Join two subtrees and an entry that sorts between them, by hanging the lower subtree under the spine of the
+        higher one at its height. Only the roots of a and b may have fewer than t-1 keys, and a leaf root may be empty.
+        :param a: The root of the subtree with the smaller keys, of height ha (0 for a leaf).
+        :param k: The key of the entry, not smaller than the keys of a and not larger than those of b.
+        :param v: The value of the entry.
+        :param b: The root of the subtree with the larger keys, of height hb.
+        :return: A tuple (root, height) of the joined subtree.
+        """
+        if ha == hb:
+            root = self._new_node([k], [v], [a, b], False)
+            self._fix_pair(root, 0)
+            if not root.keys:
+                self._free_node(root)
+                return root.children[0], ha
+            return root, ha + 1
+        if ha > hb:
+            spine = [a]
+            for _ in range(ha - hb - 1):
+                spine.append(spine[-1].children[-1])
+            x = spine[-1]
+            x.keys.append(k)
+            x.values.append(v)
+            x.children.append(b)
+            extra = b
+        else:
+            spine = [b]
+            for _ in range(hb - ha - 1):
+                spine.append(spine[-1].children[0])
+            x = spine[-1]
+            x.keys.insert(0, k)
+            x.values.insert(0, v)
+            x.children.insert(0, a)
+            extra = a
+        if self.order_stats:
+            for node in spine:
+                node.size += 1 + extra.size
+        i = len(x.keys) - 1 if ha > hb else 0
+        self._fix_pair(x, i)
+        return self._split_overfull(spine, -1 if ha > hb else 0, max(ha, hb))
+
+    def _pop_first(self, x):
+        """
+        Remove the first entry of the non-empty subtree x, descending like _b_tree_delete.
+        :return: A tuple (key, value, root of the remaining subtree).
+        """
+        t = self.t
+        root = x
+        while not x.is_leaf:
+            if self.order_stats:
+                x.size -= 1
+            if len(x.children[0].keys) < t:
+                self._fix_shortage(x, 0)
+            if x is root and not x.keys:  # the root was merged into its only child
+                self._free_node(x)
+                root = x.children[0]
+            x = x.children[0]
+        if self.order_stats:
+            x.size -= 1
+        return x.keys.pop(0), x.values.pop(0), root
+
+    def _join2(self, a, b):
+        """
+        Join two subtrees, where the keys of a are not larger than those of b.
+        :return: The root of the joined subtree.
+        """
+        if not b.keys:
+            return a
+        if not a.keys:
+            return b
+        k, v, b = self._pop_first(b)
+        return self._join3(a, self._height(a), k, v, b, self._height(b))[0]
+
+    def _split_nodes(self, x, k, want_left=True, want_right=True):
+        """
+        Split the subtree x into the entries with keys < k and those with keys >= k.
+        On the way down, every node is cut at k into a left and a right piece around the child that holds k. The
+        pieces of each side are then joined bottom-up with the entries that separated them from that child.
+        :param want_left: Build the left subtree; the right one only, when False.
+        :param want_right: Build the right subtree; the left one only, when False.
+        :return: A tuple (left root, right root); None for a side that is not wanted.
+        """
+        h = self._height(x)
+        lefts = []  # (piece, height, key, value), the entry sorting between the piece and the rest of the side
+        rights = []
+        while not x.is_leaf:
+            i = bisect_left(x.keys, k)
+            if want_left and i > 0:
+                if i == 1:
+                    piece, ph = x.children[0], h - 1
+                else:
+                    piece, ph = self._new_node(x.keys[:i - 1], x.values[:i - 1], x.children[:i], False), h
+                lefts.append((piece, ph, x.keys[i - 1], x.values[i - 1]))
+            if want_right and i < len(x.keys):
+                if i == len(x.keys) - 1:
+                    piece, ph = x.children[-1], h - 1
+                else:
+                    piece, ph = self._new_node(x.keys[i + 1:], x.values[i + 1:], x.children[i + 1:], False), h
+                rights.append((piece, ph, x.keys[i], x.values[i]))
+            self._free_node(x)
+            x = x.children[i]
+            h -= 1
+        i = bisect_left(x.keys, k)
+        left = right = None
+        if want_left:
+            left, lh = self._new_node(x.keys[:i], x.values[:i], [], True), 0
+            for piece, ph, pk, pv in reversed(lefts):
+                left, lh = self._join3(piece, ph, pk, pv, left, lh)
+        if want_right:
+            right, rh = self._new_node(x.keys[i:], x.values[i:], [], True), 0
+            for piece, ph, pk, pv in reversed(rights):
+                right, rh = self._join3(right, rh, pk, pv, piece, ph)
+        self._free_node(x)
+        return left, right
+
+    def _with_root(self, root):
+        """
+        :return: An empty copy of the configuration of this tree with root as its root.
+        """
+        tree = copy.copy(self)
+        tree.root = root
+        tree.stats = None
+        tree.filter = None
+        if self.filter is not None:
+            tree.enable_filter(error_rate=self.filter.error_rate)
+        return tree
+
+    def _require_splittable(self):
+        if self.no_split_reason is not None:
+            raise TypeError(f"{type(self).__name__} cannot be split or joined: {self.no_split_reason}")
+
+    def split(self, k):
+        """
+        Split the tree at k in O(t log^2 n) time, without visiting the entries on either side.
+        This tree is left empty.
+        :param k: A key, which does not have to be in the tree.
+        :return: A tuple (left, right) of two trees like this one: left holds the entries with keys < k and right
+                 those with keys >= k. If this tree has a filter, each of them gets a new one.
+        :raise TypeError: If the class of the tree cannot be split (see no_split_reason).
+        """
+        self._require_splittable()
+        root = self.root
+        self.root = self._new_node([], [], [], True)
+        left, right = self._split_nodes(root, k)
+        if self.filter is not None:
+            self.enable_filter(error_rate=self.filter.error_rate)
+        return self._with_root(left), self._with_root(right)
+
+    @classmethod
+    def join(cls, left, right):
+        """
+        Concatenate two trees of the same kind and minimum degree in O(t log n) time, where no key of left is
+        larger than a key of right. right is left empty.
+        :param left: The tree with the smaller keys. It receives the entries of right.
+        :param right: The tree with the larger keys.
+        :return: left.
+        :raise TypeError: If the class of the trees cannot be joined (see no_split_reason).
+        """
+        left._require_splittable()
+        right._require_splittable()
+        if type(left) is not type(right) or left.t != right.t or left.compact != right.compact \
+                or left.order_stats != right.order_stats:
+            raise ValueError("only trees of the same kind, minimum degree and options can be joined")
+        if left.root.keys and right.root.keys and right._succ(right.root)[0] < left._pred(left.root)[0]:
+            raise ValueError("the keys of left must not be larger than the keys of right")
+        if left._typed != right._typed:
+            (left if left._typed else right)._untype()
+        if left.filter is not None:
+            for k, _ in right:
+                left._filter_add(k)
+        a, b = left.root, right.root
+        left.root = left._new_node([], [], [], True)
+        right.root = right._new_node([], [], [], True)
+        if right.filter is not None:
+            right.enable_filter(error_rate=right.filter.error_rate)
+        left.root = left._join2(a, b)
+        return left
+
+    def delete_range(self, lo=None, hi=None):
+        """
+        Delete the entries with lo <= key < hi, the entries range(lo, hi) yields.
+        The tree is split at lo and at hi and the outer parts are joined again: whole subtrees inside the range are
+        dropped without being visited, and only the nodes along the two boundary paths are rebuilt and rebalanced.
+        Use count_range first to know how many entries go.
+        :param lo: The smallest key to delete, or None for no lower bound.
+        :param hi: The first key not to delete, or None for no upper bound.
+        :return: None. This function performs its operation without returning a value.
+        """
+        if lo is not None and hi is not None and not lo < hi:
+            return
+        stats = self.stats
+        if stats is not None:
+            start = perf_counter()
+        if self.filter is not None:
+            for k, _ in self.range(lo, hi):
+                self.filter.remove(k)
+        root = self.root
+        self.root = self._new_node([], [], [], True)
+        if lo is None:
+            left, rest = None, root
+        else:
+            left, rest = self._split_nodes(root, lo, want_right=hi is not None)
+        right = self._split_nodes(rest, hi, want_left=False)[1] if hi is not None else None
+        if left is not None and right is not None:
+            self.root = self._join2(left, right)
+        elif left is not None or right is not None:
+            self.root = left if left is not None else right
+        if stats is not None:
+            stats.record('delete_range', perf_counter() - start)
 
     def print_tree(self, node, l=0):
-        print("Level ", l, " ", end=":")
-        for i in node.key_value_list:
-            print(i, end=" ")
-        print()
-        l += 1
-        if len(node.children) > 0:
-            for i in node.children:
-                self.print_tree(i, l)
+        stack = [(node, l)]
+        while stack:
+            node, l = stack.pop()
+            print("Level ", l, " ", end=":")
+            for i in zip(node.keys, node.values):
+                print(i, end=" ")
+            print()
+            stack.extend((child, l + 1) for child in reversed(node.children))
+
+    def cursor(self, reverse=False):
+        """
+        Create a cursor over the entries of the tree. Call seek on it before reading.
+        :param reverse: Walk from the largest key to the smallest one.
+        :return: A BTreeCursor.
+        """
+        return BTreeCursor(self, reverse)
+
+    def range(self, lo=None, hi=None, reverse=False):
+        """
+        Lazily yield the entries with lo <= key < hi in key order.
+        The start is found with one descent from the root, after that entries are streamed without building a list.
+        The tree must not be modified while the generator is in use.
+
+        :param lo: The smallest key to yield, or None to start at the smallest key of the tree.
+        :param hi: The first key not to yield, or None to run to the largest key of the tree.
+        :param reverse: Yield the entries from the largest key to the smallest one.
+        :return: A generator of (key, value) tuples.
+        """
+        cursor = BTreeCursor(self, reverse)
+        if reverse:
+            cursor.seek(hi)
+            for entry in cursor:
+                if lo is not None and entry[0] < lo:
+                    return
+                yield entry
+        else:
+            cursor.seek(lo)
+            for entry in cursor:
+                if hi is not None and not entry[0] < hi:
+                    return
+                yield entry
+
+    def _require_order_stats(self):
+        if not self.order_stats:
+            raise ValueError("rank, select and count_range need a tree created with order_stats=True")
+
+    def rank(self, k):
+        """
+        Count the keys smaller than k in one descent, adding up the sizes of the subtrees left of the path.
+        :param k: A key, which does not have to be in the tree.
+        :return: The number of keys < k, which is also the position of the first key >= k in key order.
+        """
+        self._require_order_stats()
+        x = self.root
+        r = 0
+        while True:
+            i = bisect_left(x.keys, k)
+            if x.is_leaf:
+                return r + i
+            r += i + sum(child.size for child in x.children[:i])
+            x = x.children[i]
+
+    def select(self, i):
+        """
+        Find the entry at position i of the key order in one descent, e.g. select(len * 99 // 100) for the
+        99th percentile.
+        :param i: A position, 0 for the smallest key. Negative positions count from the end, as for a list.
+        :return: The (key, value) tuple at position i.
+        """
+        self._require_order_stats()
+        x = self.root
+        if i < 0:
+            i += x.size
+        if not 0 <= i < x.size:
+            raise IndexError(f"position {i} out of range for a tree of {x.size} keys")
+        while not x.is_leaf:
+            for j, child in enumerate(x.children):
+                if i < child.size:
+                    break
+                i -= child.size
+                if i == 0:
+                    return x.keys[j], x.values[j]
+                i -= 1
+            x = child
+        return x.keys[i], x.values[i]
+
+    def count_range(self, lo=None, hi=None):
+        """
+        Count the entries with lo <= key < hi, the entries range(lo, hi) would yield, in two descents.
+        :param lo: The smallest key to count, or None for no lower bound.
+        :param hi: The first key not to count, or None for no upper bound.
+        :return: The number of entries.
+        """
+        self._require_order_stats()
+        upper = self.rank(hi) if hi is not None else self.root.size
+        lower = self.rank(lo) if lo is not None else 0
+        return max(0, upper - lower)
+
+    def __iter__(self):
+        return self.range()
+
+
+class BTreeCursor:
+    """
+    A resumable position in the key order of a BTree.
+    The path from the root to the current position is kept on an explicit stack of [node, index] frames,
+    so reading the next entry never starts over from the root. The tree must not be modified while a cursor is in use.
+    """
+
+    def __init__(self, tree, reverse=False):
+        """
+        :param tree: The BTree to read.
+        :param reverse: Walk from the largest key to the smallest one.
+        """
+        self.tree = tree
+        self.reverse = reverse
+        self._stack = []
+
+    def seek(self, k=None):
+        """
+        Move the cursor in one descent from the root.
+        A forward cursor then yields the first entry with key >= k, a reverse cursor the last entry with key < k.
+        :param k: The key to seek, or None for the start (the end for a reverse cursor) of the tree.
+        :return: The cursor itself.
+        """
+        stack = self._stack = []
+        x = self.tree.root
+        while True:
+            if k is None:
+                i = len(x.keys) if self.reverse else 0
+            else:
+                i = bisect_left(x.keys, k)
+            stack.append([x, i])
+            if x.is_leaf:
+                return self
+            x = x.children[i]
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        stack = self._stack
+        while stack:
+            frame = stack[-1]
+            x, i = frame
+            if self.reverse:
+                if i > 0:
+                    i -= 1
+                    frame[1] = i
+                    if not x.is_leaf:  # continue with the largest entries of the subtree left of key i
+                        child = x.children[i]
+                        while True:
+                            stack.append([child, len(child.keys)])
+                            if child.is_leaf:
+                                break
+                            child = child.children[-1]
+                    return x.keys[i], x.values[i]
+            elif i < len(x.keys):
+                frame[1] = i + 1
+                if not x.is_leaf:  # continue with the smallest entries of the subtree right of key i
+                    child = x.children[i + 1]
+                    while True:
+                        stack.append([child, 0])
+                        if child.is_leaf:
+                            break
+                        child = child.children[0]
+                return x.keys[i], x.values[i]
+            stack.pop()
+        raise StopIteration
+
+    def fetch(self, n):
+        """
+        Read the next page of entries.
+        :param n: The maximum number of entries to read.
+        :return: A list of at most n (key, value) tuples. It is shorter than n only at the end of the tree.
+        """
+        return list(islice(self, n))
 
 
 class UserInterface:
+    progress_every = 1000000  # records between two progress reports
+    quiet = False  # no progress reports
+    write_created = False  # also write the looked-up entries to a '_created' file when verifying
+
     @classmethod
     def main(cls):
         while True:
@@ -317,56 +1275,38 @@ class UserInterface:
         return modified_name
 
     @classmethod
-    def _compare_two_files(cls, file1_path, file2_path):
-        with open(file1_path, 'r') as file1, open(file2_path, 'r') as file2:
-            for line1, line2 in zip(file1, file2):
-                if line1.strip() != line2.strip():
-                    return False
-            return next(file1, None) is None and next(file2, None) is None
-
-
+    def _verify(cls, expected_file_path, created_file_name):
+        from verify import verify
 
+        # the tree keeps the entries of every file loaded so far, so only the entries of this file are looked up
+        result = verify(b_tree, expected_file_path, created_file_name if cls.write_created else None, exact=False)
+        print()
+        if result['ok']:
+            print(f"The tree holds every entry of '{expected_file_path}'! ({result['expected']} entries)\n")
+        else:
+            print(f"The tree differs from '{expected_file_path}': {result['mismatched']} mismatched, "
+                  f"{result['missing']} missing and {result['extra']} extra keys.")
+            for kind, examples in result['examples'].items():
+                if examples:
+                    print(f"  {kind}: {examples}")
+            print()
+        if cls.write_created:
+            print(f"Created file: {created_file_name}\n")
+        print()
 
     @classmethod
     def _insertion(cls):
         while True:
-            global insert_file_path
             insert_file_path = input("Please enter the file path for insertion, or type 'exit' to quit: \n")
             if insert_file_path.lower() == "exit":
                 print("Exiting the program.")
                 sys.exit(0)
             try:
-                with open(insert_file_path, 'r') as file:
-                    for line in file:
-                        key_val = line.strip().split('\t')
-                        key = int(key_val[0])
-                        value = int(key_val[1])
-                        b_tree.b_tree_insert(key, value)
-                        print(f"inserted ({key}, {value})")
-                        # b_tree.print_tree(b_tree.root)
-                        # input()
+                from ingest import ingest
 
-                    file.seek(0)
-                    modified_file_name = cls._get_new_file_name(insert_file_path)
-                    with open(modified_file_name, 'w') as file_to_write:
-                        for line in file:
-                            key_val = line.strip().split('\t')
-                            key = int(key_val[0])
-                            result = b_tree.b_tree_search(b_tree.root, key)
-                            if result is not None:
-                                x, i = result
-                                file_to_write.write(f"{x.key_value_list[i][0]}\t{x.key_value_list[i][1]}\n")
-                                print(f"(key: {x.key_value_list[i][0]}, value: {x.key_value_list[i][1]}) found!")                                # input()
-                            else:
-                                print(f"key: {key} not found.")
-                                # b_tree.print_tree(b_tree.root)
-                                # input()
-                print()
-                if cls._compare_two_files(insert_file_path, modified_file_name):
-                    print("Created file is the same as the original file!\n")
-                else:
-                    print("Created file is different from the original file!\n")
-                print()
+                inserted = ingest(b_tree, insert_file_path, progress_every=cls.progress_every, quiet=cls.quiet)
+                print(f"inserted {inserted} records")
+                cls._verify(insert_file_path, cls._get_new_file_name(insert_file_path))
                 break
 
             except FileNotFoundError:
@@ -398,29 +1338,8 @@ class UserInterface:
                         print(f"deleted ({key}, {value})")
                         # b_tree.print_tree(b_tree.root)
                         # input()
-                with open(insert_file_path, 'r') as file:
-                    modified_file_name = cls._get_new_file_name(delete_file_path)
-                    with open(modified_file_name, 'w') as file_to_write:
-                        for line in file:
-                            key_val = line.strip().split('\t')
-                            key = int(key_val[0])
-                            result = b_tree.b_tree_search(b_tree.root, key)
-                            if result is not None:
-                                x, i = result
-                                file_to_write.write(f"{x.key_value_list[i][0]}\t{x.key_value_list[i][1]}\n")
-                                print(
-                                    f"(key: {x.key_value_list[i][0]}, value: {x.key_value_list[i][1]}) found!")  # input()
-                            else:
-                                file_to_write.write(f"{key}\tN/A\n")
-                                print(f"key: {key} not found.")
-                                # b_tree.print_tree(b_tree.root)
-                                # input()
-                print()
-                if cls._compare_two_files(delete_compare_file_path, modified_file_name):
-                    print("Created file is the same as the original file!\n")
-                else:
-                    print("Created file is different from the original file!\n")
-                print()
+                # the comparison file lists every key of the tree before the deletion, 'N/A' for the deleted ones
+                cls._verify(delete_compare_file_path, cls._get_new_file_name(delete_file_path))
                 break
 
             except FileNotFoundError:
@@ -0,0 +1,252 @@
+"""
+Opt-in instrumentation of a BTree.
+
+    stats = tree.enable_stats()
+    ...
+    print(metrics.to_json(tree))
+    print(metrics.to_prometheus(metrics.snapshot(tree)))
+
+While tree.stats is None (the default) the operations only test that attribute, once per operation. Once enabled,
+search, insert and delete record their latency in a histogram and the number of nodes they visit, the batch
+operations (get_many, insert_many, delete_many) record the latency of every batch, and every split, merge and borrow
+is counted. The shape of the tree (height, fill of the nodes, memory) is not tracked by the operations; snapshot
+computes it with one walk over the tree when it is called.
+
+Only the operations of BTree and its subclasses that reuse them (PagedBTree) are instrumented. The counters are not
+synchronized between threads.
+"""
+import json
+import sys
+from bisect import bisect_left
+
+LATENCY_BUCKETS = tuple(1e-6 * 2 ** i for i in range(24))  # 1 us .. 8 s, in seconds
+FILL_BUCKETS = tuple(i / 10 for i in range(1, 11))
+
+
+class Histogram:
+    """
+    A histogram with fixed upper bounds, as in Prometheus: counts[i] observations fell in (bounds[i-1], bounds[i]],
+    and the last count holds the observations above every bound.
+    """
+    __slots__ = ('bounds', 'counts', 'sum', 'count')
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        """
+        Estimate a quantile as the upper bound of the bucket it falls in.
+        :param q: The quantile, between 0 and 1.
+        :return: The estimate, inf if it falls above the last bound, or None if nothing was observed.
+        """
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, n in zip(self.bounds, self.counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return float('inf')
+
+    def snapshot(self):
+        return {'bounds': list(self.bounds), 'counts': list(self.counts), 'sum': self.sum, 'count': self.count}
+
+
+class TreeStats:
+    """
+    Counters and latency histograms of one tree, see BTree.enable_stats.
+    """
+
+    def __init__(self):
+        self.operations = {}  # operation name -> [count, node visits]
+        self.latency = {}  # operation name -> Histogram of seconds
+        self.splits = 0
+        self.merges = 0
+        self.borrows_left = 0
+        self.borrows_right = 0
+
+    def record(self, op, seconds, visits=0):
+        """
+        Record one operation.
+        :param op: The operation name, e.g. 'search'.
+        :param seconds: The latency of the operation.
+        :param visits: The number of nodes the operation visited.
+        """
+        counters = self.operations.get(op)
+        if counters is None:
+            counters = self.operations[op] = [0, 0]
+            self.latency[op] = Histogram(LATENCY_BUCKETS)
+        counters[0] += 1
+        counters[1] += visits
+        self.latency[op].observe(seconds)
+
+    def reset(self):
+        self.__init__()
+
+    def snapshot(self):
+        """
+        :return: A dict of the counters, safe to serialize as JSON.
+        """
+        return {
+            'operations': {op: {'count': count, 'node_visits': visits, 'latency': self.latency[op].snapshot()}
+                           for op, (count, visits) in self.operations.items()},
+            'splits': self.splits,
+            'merges': self.merges,
+            'borrows_left': self.borrows_left,
+            'borrows_right': self.borrows_right,
+        }
+
+
+def _node_size(node):
+    size = sys.getsizeof(node)
+    if hasattr(node, '__dict__'):
+        size += sys.getsizeof(node.__dict__)
+    for items in (node.keys, node.values):
+        size += sys.getsizeof(items)
+        if isinstance(items, list):  # an array('q') holds its items in its own buffer
+            size += sum(map(sys.getsizeof, items))
+    if not node.is_leaf:
+        size += sys.getsizeof(node.children)
+    return size
+
+
+def tree_shape(tree):
+    """
+    Size and shape of a tree, computed with one walk over all nodes.
+    :param tree: A BTree.
+    :return: A dict with t, the number of keys and nodes, the height, the average fill of the nodes, a Histogram
+            snapshot of the fill of the nodes, and an estimate of the memory held by the nodes in bytes.
+    """
+    keys = nodes = height = memory = 0
+    capacity = 2 * tree.t - 1
+    fill = Histogram(FILL_BUCKETS)
+    stack = [(tree.root, 1)]
+    while stack:
+        node, depth = stack.pop()
+        nodes += 1
+        keys += len(node.keys)
+        height = max(height, depth)
+        fill.observe(len(node.keys) / capacity)
+        memory += _node_size(node)
+        if not node.is_leaf:
+            stack.extend((child, depth + 1) for child in node.children)
+    return {'t': tree.t, 'keys': keys, 'nodes': nodes, 'height': height, 'fill': keys / (nodes * capacity),
+            'fill_distribution': fill.snapshot(), 'memory_bytes': memory}
+
+
+def snapshot(tree):
+    """
+    :param tree: A BTree, with or without instrumentation enabled.
+    :return: A dict with the shape of the tree under 'tree', the counters of tree.stats if it is enabled, and the
+             size and false-positive rate of tree.filter under 'filter' if it is enabled.
+    """
+    result = {'tree': tree_shape(tree)}
+    if tree.stats is not None:
+        result.update(tree.stats.snapshot())
+    if getattr(tree, 'filter', None) is not None:
+        result['filter'] = tree.filter.snapshot()
+    return result
+
+
+def to_json(tree):
+    return json.dumps(snapshot(tree))
+
+
+def summary(snap):
+    """
+    Flatten a snapshot into name -> number fields: the shape of the tree, and per operation its count, the average
+    number of node visits and the estimated p50/p99 latency in microseconds. A latency above the last bucket is
+    reported as that bound, with an '<op>_p50_overflow' or '<op>_p99_overflow' field set to True, so every field
+    stays a finite number.
+    """
+    shape = snap['tree']
+    fields = {name: shape[name] for name in ('t', 'keys', 'nodes', 'height', 'fill', 'memory_bytes')}
+    for op, counters in snap.get('operations', {}).items():
+        latency = counters['latency']
+        histogram = Histogram(tuple(latency['bounds']))
+        histogram.counts, histogram.count = latency['counts'], latency['count']
+        fields[f'{op}_count'] = counters['count']
+        if counters['node_visits']:
+            fields[f'{op}_visits'] = counters['node_visits'] / counters['count']
+        for name, q in (('p50', 0.5), ('p99', 0.99)):
+            estimate = histogram.quantile(q)
+            if estimate == float('inf'):
+                estimate = histogram.bounds[-1]
+                fields[f'{op}_{name}_overflow'] = True
+            fields[f'{op}_{name}_us'] = estimate * 1e6
+    for name in ('splits', 'merges', 'borrows_left', 'borrows_right'):
+        if name in snap:
+            fields[name] = snap[name]
+    for name, value in snap.get('filter', {}).items():
+        if value is not None:
+            fields[f'filter_{name}'] = value
+    return fields
+
+
+def _histogram_lines(name, labels, histogram):
+    lines = []
+    cumulative = 0
+    for bound, n in zip(histogram['bounds'] + ['+Inf'], histogram['counts']):
+        cumulative += n
+        lines.append(f'{name}_bucket{{{labels}le="{bound}"}} {cumulative}')
+    labels = '{' + labels.rstrip(',') + '}' if labels else ''
+    lines.append(f'{name}_sum{labels} {histogram["sum"]}')
+    lines.append(f'{name}_count{labels} {histogram["count"]}')
+    return lines
+
+
+def to_prometheus(snap, prefix='btree'):
+    """
+    Render a snapshot in the Prometheus text exposition format.
+    :param snap: A dict returned by snapshot.
+    :param prefix: The prefix of every metric name.
+    :return: The text, one metric sample per line.
+    """
+    shape = snap['tree']
+    lines = []
+    for name, help_text in [('keys', "Entries in the tree."), ('nodes', "Nodes in the tree."),
+                            ('height', "Levels of the tree."), ('memory_bytes', "Estimated memory of the nodes.")]:
+        lines += [f'# HELP {prefix}_{name} {help_text}', f'# TYPE {prefix}_{name} gauge',
+                  f'{prefix}_{name} {shape[name]}']
+    lines += [f'# HELP {prefix}_node_fill Fraction of the 2t-1 key slots used by a node.',
+              f'# TYPE {prefix}_node_fill histogram']
+    lines += _histogram_lines(f'{prefix}_node_fill', '', shape['fill_distribution'])
+    bloom = snap.get('filter')
+    if bloom is not None:
+        for name, kind, help_text in [
+                ('filter_memory_bytes', 'gauge', "Memory of the Bloom filter."),
+                ('filter_expected_false_positive_rate', 'gauge', "False-positive rate of the filter at its load."),
+                ('filter_checks_total', 'counter', "Lookups answered by the filter."),
+                ('filter_negatives_total', 'counter', "Lookups the filter ruled out."),
+                ('filter_false_positives_total', 'counter', "Lookups of absent keys the filter let through.")]:
+            value = bloom[name[len('filter_'):].replace('_total', '')]
+            lines += [f'# HELP {prefix}_{name} {help_text}', f'# TYPE {prefix}_{name} {kind}',
+                      f'{prefix}_{name} {value}']
+    operations = snap.get('operations')
+    if operations is None:
+        return '\n'.join(lines) + '\n'
+    lines += [f'# HELP {prefix}_operations_total Operations by type.', f'# TYPE {prefix}_operations_total counter']
+    lines += [f'{prefix}_operations_total{{op="{op}"}} {c["count"]}' for op, c in operations.items()]
+    lines += [f'# HELP {prefix}_node_visits_total Nodes visited by operations.',
+              f'# TYPE {prefix}_node_visits_total counter']
+    lines += [f'{prefix}_node_visits_total{{op="{op}"}} {c["node_visits"]}' for op, c in operations.items()]
+    for name, help_text in [('splits', "Node splits."), ('merges', "Node merges.")]:
+        lines += [f'# HELP {prefix}_{name}_total {help_text}', f'# TYPE {prefix}_{name}_total counter',
+                  f'{prefix}_{name}_total {snap[name]}']
+    lines += [f'# HELP {prefix}_borrows_total Keys borrowed from a sibling.', f'# TYPE {prefix}_borrows_total counter',
+              f'{prefix}_borrows_total{{side="left"}} {snap["borrows_left"]}',
+              f'{prefix}_borrows_total{{side="right"}} {snap["borrows_right"]}']
+    lines += [f'# HELP {prefix}_operation_seconds Latency of operations.',
+              f'# TYPE {prefix}_operation_seconds histogram']
+    for op, c in operations.items():
+        lines += _histogram_lines(f'{prefix}_operation_seconds', f'op="{op}",', c['latency'])
+    return '\n'.join(lines) + '\n'
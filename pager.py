@@ -0,0 +1,660 @@
+"""
+Disk-resident B-tree: every node lives in a fixed-size page of one file, and the file is read through mmap.
+
+File layout, all integers little-endian:
+
+    page 0      header: magic, page size, t, root page id, page count, head of the free-page list
+    page 1..    one node per page: is_leaf (1 byte), 3 bytes padding, number of keys n (4 bytes),
+                number of children m (4 bytes), n int64 keys, n int64 values and m int64 child page ids.
+                A free page holds the id of the next free page (0 ends the list).
+
+PagedBTree runs the insert/search/delete algorithms of main.BTree unchanged. Its nodes load their pages lazily
+into a bounded LRU buffer pool and record every change to their keys, values and children. Dirty nodes are
+written back in page order when they are evicted and on flush(). Keys and values must be 64-bit integers.
+
+With a write-ahead log (see wal.py), every insert or delete is one logged operation: when it ends, the new
+images of the pages it changed and the new header fields are appended to '<path>-wal' and committed.
+Pages changed by an operation that is still running are never written to the page file, and the log is
+synced before any page is. flush() is a checkpoint: it writes every dirty page and the header, syncs the
+page file and empties the log. Opening a file whose log is not empty replays the committed operations first.
+"""
+import mmap
+import os
+import struct
+import weakref
+from collections import OrderedDict
+from contextlib import contextmanager
+from operator import attrgetter
+
+from main import BTree, _is_int64
+from wal import HEADER, PAGE, WriteAheadLog, read_committed
+
+MAGIC = b'BTREEPG1'
+_HEADER = struct.Struct('<8sIIqqq')
+_NODE_HEADER = struct.Struct('<BxxxII')
+_NEXT_FREE = struct.Struct('<q')
+_LOGGED_HEADER = struct.Struct('<qqq')  # root page id, page count, number of free pages, then the free page ids
+
+
+def page_size_for(t):
+    """
+    Size of a page that can hold a full node of minimum degree t, rounded up to a multiple of 64 bytes.
+    :param t: The minimum degree of the B-tree.
+    :return: The page size in bytes.
+    """
+    size = max(_HEADER.size, _NODE_HEADER.size + (2 * t - 1) * 16 + 2 * t * 8)
+    return -(-size // 64) * 64
+
+
+class _TrackedList(list):
+    """
+    A list of keys or values that marks its node dirty whenever it is modified.
+    The node is marked after the change, so a write-back triggered by marking it already sees the new content.
+    Slicing returns plain lists, so copies made by the algorithms are not tracked.
+    """
+    __slots__ = ('owner',)
+
+    def __init__(self, items, owner):
+        super().__init__(items)
+        self.owner = owner
+
+    def __setitem__(self, index, value):
+        super().__setitem__(index, value)
+        self.owner.mark_dirty()
+
+    def __delitem__(self, index):
+        super().__delitem__(index)
+        self.owner.mark_dirty()
+
+    def __iadd__(self, other):
+        result = super().__iadd__(other)
+        self.owner.mark_dirty()
+        return result
+
+    def append(self, value):
+        super().append(value)
+        self.owner.mark_dirty()
+
+    def extend(self, values):
+        super().extend(values)
+        self.owner.mark_dirty()
+
+    def insert(self, index, value):
+        super().insert(index, value)
+        self.owner.mark_dirty()
+
+    def pop(self, index=-1):
+        value = super().pop(index)
+        self.owner.mark_dirty()
+        return value
+
+
+class _ChildList:
+    """
+    The children of a PagedNode. Only page ids are kept; a child node is loaded when it is indexed.
+    Slicing returns a detached _ChildList of page ids, so moving children between nodes never loads them.
+    """
+    __slots__ = ('ids', 'store', 'owner')
+
+    def __init__(self, ids, store, owner=None):
+        self.ids = ids
+        self.store = store
+        self.owner = owner
+
+    def _changed(self):
+        if self.owner is not None:
+            self.owner.mark_dirty()
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return _ChildList(self.ids[index], self.store)
+        return self.store.node(self.ids[index])
+
+    def __iter__(self):
+        node = self.store.node
+        for page_id in self.ids:
+            yield node(page_id)
+
+    def __delitem__(self, index):
+        del self.ids[index]
+        self._changed()
+
+    def insert(self, index, node):
+        self.ids.insert(index, node.page_id)
+        self._changed()
+
+    def append(self, node):
+        self.ids.append(node.page_id)
+        self._changed()
+
+    def extend(self, nodes):
+        if isinstance(nodes, _ChildList):
+            self.ids.extend(nodes.ids)
+        else:
+            self.ids.extend(node.page_id for node in nodes)
+        self._changed()
+
+    def pop(self, index=-1):
+        page_id = self.ids.pop(index)
+        self._changed()
+        return self.store.node(page_id)
+
+
+class PagedNode:
+    """
+    A B-tree node backed by one page. It has the attributes of main.BTreeNode.
+    """
+    __slots__ = ('page_id', 'keys', 'values', 'children', 'is_leaf', 'dirty', 'store', '__weakref__')
+
+    def __init__(self, store, page_id, keys, values, child_ids, is_leaf):
+        self.store = store
+        self.page_id = page_id
+        self.keys = _TrackedList(keys, self)
+        self.values = _TrackedList(values, self)
+        self.children = _ChildList(child_ids, store, self)
+        self.is_leaf = is_leaf
+        self.dirty = False
+
+    def mark_dirty(self):
+        store = self.store
+        if store.changed is not None and self.page_id is not None:
+            store.changed[self.page_id] = self
+        if not self.dirty:
+            self.dirty = True
+            store.dirtied(self)
+
+
+class PageStore:
+    """
+    Fixed-size pages of one file, mapped into memory with mmap, with a buffer pool of decoded nodes.
+
+    The pool holds at most cache_size nodes in LRU order. When it overflows, a batch of the least recently used
+    nodes that are not pinned is evicted and the dirty ones among them are written back in page order.
+    A node that is evicted while the caller still holds it stays the only node object of its page, and
+    modifying it puts it back into the pool, so no change is lost.
+
+    The free pages are kept in a list in memory and written to the file as a chain on flush().
+    """
+
+    def __init__(self, path, t=None, cache_size=1024, wal_sync=None, wal_interval_ms=10):
+        """
+        Open the page file at path, creating it if it does not exist or is empty.
+        If the write-ahead log of the file holds committed operations, they are replayed and checkpointed first.
+
+        :param path: Path of the page file.
+        :param t: The minimum degree of the tree. Required to create a file; must match when opening one.
+        :param cache_size: Number of nodes the buffer pool holds.
+        :param wal_sync: None to work without a write-ahead log, or its fsync policy: 'always', 'interval' or 'never'.
+        :param wal_interval_ms: Time between two fsyncs of the log under the 'interval' policy.
+        """
+        if cache_size < 1:
+            raise ValueError(f"cache_size must be at least 1, got {cache_size}")
+        self.path = path
+        exists = os.path.exists(path) and os.path.getsize(path) > 0
+        if not exists and t is None:
+            raise ValueError("t is required to create a new page file")
+        self.file = open(path, 'r+b' if exists else 'w+b')
+        self.cache_size = cache_size
+        self._pool = OrderedDict()  # page id -> node, least recently used first
+        self._live = weakref.WeakValueDictionary()  # page id -> every node object still referenced anywhere
+        self._pins = {}  # page id -> pin count
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.writes = 0
+        self.wal = None
+        self.changed = None  # page id -> node changed by the running operation, when there is a log
+        self._depth = 0
+        self._header_changed = False
+        wal_path = path + '-wal'
+        recover = os.path.exists(wal_path) and os.path.getsize(wal_path) > 0
+        if exists:
+            self.mm = mmap.mmap(self.file.fileno(), 0)
+            magic, self.page_size, self.t, self.root_page, self.page_count, free_head = \
+                _HEADER.unpack_from(self.mm, 0)
+            if magic != MAGIC:
+                self.close()
+                raise ValueError(f"'{path}' is not a B-tree page file")
+            if t is not None and t != self.t:
+                self.close()
+                raise ValueError(f"'{path}' was created with t={self.t}, not t={t}")
+            self.free_pages = None
+            if recover:
+                self._replay(wal_path)
+            if self.free_pages is None:  # pages of the chain may have been reused since, unless no log replaced it
+                self.free_pages = []
+                while free_head:
+                    self.free_pages.append(free_head)
+                    free_head, = _NEXT_FREE.unpack_from(self.mm, free_head * self.page_size)
+                self.free_pages.reverse()  # the head of the chain is taken first
+        else:
+            self.t = t
+            self.page_size = page_size_for(t)
+            self.root_page = 0
+            self.page_count = 1  # the header page
+            self.free_pages = []
+            self.file.truncate(self.page_size * 16)
+            self.mm = mmap.mmap(self.file.fileno(), 0)
+            self._write_header()
+            self.mm.flush()
+        if recover:  # a log left without its page file is discarded
+            if exists:
+                self._write_header()
+                self.mm.flush()
+            with open(wal_path, 'r+b') as file:
+                file.truncate(0)
+                os.fsync(file.fileno())
+        if wal_sync is not None:
+            self.wal = WriteAheadLog(wal_path, wal_sync, wal_interval_ms)
+            self.changed = {}
+
+    def _write_header(self):
+        free_head = 0
+        for page_id in self.free_pages:
+            _NEXT_FREE.pack_into(self.mm, page_id * self.page_size, free_head)
+            free_head = page_id
+        _HEADER.pack_into(self.mm, 0, MAGIC, self.page_size, self.t, self.root_page, self.page_count, free_head)
+
+    def _replay(self, wal_path):
+        """
+        Redo the committed operations of a log on the page file.
+        :param wal_path: Path of the log.
+        """
+        for records in read_committed(wal_path):
+            for kind, page_id, payload in records:
+                if kind == PAGE:
+                    self._grow(page_id + 1)
+                    offset = page_id * self.page_size
+                    self.mm[offset:offset + len(payload)] = payload
+                elif kind == HEADER:
+                    self.root_page, self.page_count, n = _LOGGED_HEADER.unpack_from(payload)
+                    self.free_pages = list(struct.unpack_from(f'<{n}q', payload, _LOGGED_HEADER.size))
+                    self._grow(self.page_count)
+
+    def set_root(self, page_id):
+        self.root_page = page_id
+        self._header_changed = True
+
+    def _grow(self, page_count):
+        """
+        Make the file large enough for page_count pages, doubling its size so growth is amortized.
+        """
+        size = len(self.mm)
+        if page_count * self.page_size <= size:
+            return
+        while size < page_count * self.page_size:
+            size *= 2
+        self.mm.close()
+        self.file.truncate(size)
+        self.mm = mmap.mmap(self.file.fileno(), 0)
+
+    def allocate(self):
+        """
+        Take a page from the free list, or append a new page to the file.
+        :return: The page id.
+        """
+        self._header_changed = True
+        if self.free_pages:
+            return self.free_pages.pop()
+        page_id = self.page_count
+        self.page_count += 1
+        self._grow(self.page_count)
+        return page_id
+
+    def free(self, page_id):
+        """
+        Put a page on the free list. The node of the page must no longer be reachable from the tree.
+        :param page_id: The page id.
+        """
+        self._pool.pop(page_id, None)
+        node = self._live.pop(page_id, None)
+        if node is not None:  # the node object may outlive its page, but it is never written again
+            node.page_id = None
+            node.dirty = True
+        self.free_pages.append(page_id)
+        self._header_changed = True
+
+    def new_node(self, keys, values, child_ids, is_leaf):
+        """
+        Create a node on a newly allocated page. It is dirty until it is written back.
+        :return: The new PagedNode.
+        """
+        node = PagedNode(self, self.allocate(), keys, values, child_ids, is_leaf)
+        node.dirty = True
+        if self.changed is not None:
+            self.changed[node.page_id] = node
+        self._admit(node)
+        return node
+
+    def node(self, page_id):
+        """
+        Get the node of a page, reading the page if the node is not in memory.
+        :param page_id: The page id.
+        :return: The PagedNode.
+        """
+        node = self._pool.get(page_id)
+        if node is not None:
+            self.hits += 1
+            self._pool.move_to_end(page_id)
+            return node
+        node = self._live.get(page_id)
+        if node is not None:
+            self.hits += 1
+        else:
+            self.misses += 1
+            node = self.read(page_id)
+        self._admit(node)
+        return node
+
+    def dirtied(self, node):
+        """
+        Called by a node that becomes dirty. A node modified after its eviction is put back into the pool.
+        :param node: The PagedNode.
+        """
+        if node.page_id is not None and node.page_id not in self._pool:
+            self._admit(node)
+
+    def _admit(self, node):
+        self._pool[node.page_id] = node
+        self._live[node.page_id] = node
+        if len(self._pool) > self.cache_size:
+            self._evict(max(len(self._pool) - self.cache_size, self.cache_size // 16))
+
+    def _evict(self, count):
+        """
+        Drop up to count least recently used nodes that are not pinned, writing back the dirty ones in page order.
+        Nodes changed by the running operation are not written yet; they stay in memory until it commits.
+        :param count: The number of nodes to evict.
+        """
+        victims = []
+        for page_id, node in self._pool.items():
+            if page_id not in self._pins:
+                victims.append(node)
+                if len(victims) == count:
+                    break
+        for node in victims:
+            del self._pool[node.page_id]
+        changed = self.changed or ()
+        self._write_pages(node for node in victims if node.dirty and node.page_id not in changed)
+        self.evictions += len(victims)
+
+    def _write_pages(self, nodes):
+        nodes = sorted(nodes, key=attrgetter('page_id'))
+        if nodes and self.wal is not None:
+            self.wal.sync()
+        for node in nodes:
+            self.write(node)
+
+    def begin(self):
+        """
+        Start an operation. Operations nest; only the outermost one is logged.
+        """
+        self._depth += 1
+
+    def commit(self):
+        """
+        End an operation. When the outermost operation ends, the images of the pages it changed and the header
+        fields, if they changed, are appended to the log and committed.
+        """
+        self._depth -= 1
+        if self._depth or self.wal is None:
+            return
+        wal = self.wal
+        changed = [node for page_id, node in sorted(self.changed.items()) if node.page_id == page_id]
+        for node in changed:
+            wal.append(PAGE, node.page_id, self.encode(node))
+        if self._header_changed:
+            wal.append(HEADER, 0, _LOGGED_HEADER.pack(self.root_page, self.page_count, len(self.free_pages))
+                       + struct.pack(f'<{len(self.free_pages)}q', *self.free_pages))
+            self._header_changed = False
+        wal.commit()
+        self.changed.clear()
+        # nodes the operation changed after they left the pool can be written now that they are logged
+        self._write_pages(node for node in changed if node.dirty and node.page_id not in self._pool)
+
+    @contextmanager
+    def operation(self):
+        """
+        Run the body of a with block as one operation.
+        """
+        self.begin()
+        try:
+            yield
+        finally:
+            self.commit()
+
+    def pin(self, node):
+        """
+        Keep a node in the pool until it is unpinned. Pins nest.
+        :param node: The PagedNode.
+        """
+        self._pins[node.page_id] = self._pins.get(node.page_id, 0) + 1
+
+    def unpin(self, page_id):
+        """
+        Release one pin of a page.
+        :param page_id: The page id the node had when it was pinned.
+        """
+        count = self._pins.pop(page_id) - 1
+        if count:
+            self._pins[page_id] = count
+
+    @contextmanager
+    def pinned(self, *nodes):
+        """
+        Pin nodes for the duration of a with block.
+        :param nodes: The PagedNodes.
+        """
+        page_ids = [node.page_id for node in nodes]
+        for node in nodes:
+            self.pin(node)
+        try:
+            yield
+        finally:
+            for page_id in page_ids:
+                self.unpin(page_id)
+
+    def stats(self):
+        """
+        Buffer pool counters.
+        :return: A dict with the hits, misses, evictions and page writes so far and the current pool occupancy.
+        """
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'writes': self.writes,
+            'cached': len(self._pool),
+            'dirty': sum(1 for node in self._pool.values() if node.dirty),
+            'pinned': len(self._pins),
+            'cache_size': self.cache_size,
+        }
+
+    def read(self, page_id):
+        """
+        Decode a page into a new PagedNode.
+        :param page_id: The page id.
+        :return: The PagedNode.
+        """
+        offset = page_id * self.page_size
+        is_leaf, n, m = _NODE_HEADER.unpack_from(self.mm, offset)
+        offset += _NODE_HEADER.size
+        keys = struct.unpack_from(f'<{n}q', self.mm, offset)
+        values = struct.unpack_from(f'<{n}q', self.mm, offset + 8 * n)
+        child_ids = list(struct.unpack_from(f'<{m}q', self.mm, offset + 16 * n))
+        return PagedNode(self, page_id, keys, values, child_ids, bool(is_leaf))
+
+    def write(self, node):
+        """
+        Encode a node into its page and mark it clean.
+        :param node: The PagedNode.
+        """
+        data = self.encode(node)
+        offset = node.page_id * self.page_size
+        self.mm[offset:offset + len(data)] = data
+        node.dirty = False
+        self.writes += 1
+
+    @staticmethod
+    def encode(node):
+        """
+        The page image of a node, without the unused end of the page.
+        :param node: The PagedNode.
+        :return: The bytes of the image.
+        """
+        # the child count is stored on its own, because a node evicted in the middle of a split or merge
+        # does not have len(keys) + 1 children yet
+        n = len(node.keys)
+        child_ids = node.children.ids
+        return struct.pack(f'<BxxxII{n}q{n}q{len(child_ids)}q', node.is_leaf, n, len(child_ids),
+                           *node.keys, *node.values, *child_ids)
+
+    def flush(self):
+        """
+        Write every dirty node in page order, then the header, and sync the file.
+        With a log, this is a checkpoint: the log is emptied once the page file holds all of its changes.
+        """
+        self._write_pages(node for node in self._pool.values() if node.dirty)
+        self._write_header()
+        self.mm.flush()
+        if self.wal is not None:
+            self.wal.truncate()
+
+    def close(self):
+        if self.wal is not None:
+            self.wal.close()
+        self.mm.close()
+        self.file.close()
+
+
+class PagedBTree(BTree):
+    """
+    A BTree whose nodes are stored in a page file. Changes reach the file on flush() and close(),
+    and with a write-ahead log they are durable once the log is synced.
+    """
+    no_split_reason = "the parts would be trees outside its page file"
+
+    def __init__(self, t, path, cache_size=1024, wal_sync=None, wal_interval_ms=10):
+        """
+        Open or create a paged B-tree.
+
+        :param t: The minimum degree of the B-tree, or None to take it from an existing file.
+        :param path: Path of the page file.
+        :param cache_size: Number of nodes the buffer pool holds.
+        :param wal_sync: None to work without a write-ahead log, or its fsync policy. Every insert or delete is
+                         written to the log when it ends; 'always' also fsyncs it, 'interval' fsyncs the log
+                         from a background thread every wal_interval_ms and 'never' does not fsync it.
+        :param wal_interval_ms: Time between two fsyncs of the log under the 'interval' policy.
+        """
+        self.store = PageStore(path, t, cache_size, wal_sync, wal_interval_ms)
+        self.t = self.store.t
+        self.compact = False
+        self._typed = False
+        self.order_stats = False
+        if not self.store.root_page:
+            with self.store.operation():
+                self.root = self._new_node([], [], [], True)
+
+    @classmethod
+    def open(cls, path, cache_size=1024, wal_sync=None, wal_interval_ms=10):
+        """
+        Open an existing paged B-tree.
+        :param path: Path of the page file.
+        :param cache_size: Number of nodes the buffer pool holds.
+        :param wal_sync: The fsync policy of the write-ahead log, or None for no log.
+        :param wal_interval_ms: Time between two fsyncs of the log under the 'interval' policy.
+        :return: A PagedBTree.
+        """
+        return cls(None, path, cache_size, wal_sync, wal_interval_ms)
+
+    @property
+    def root(self):
+        return self.store.node(self.store.root_page)
+
+    @root.setter
+    def root(self, node):
+        self.store.set_root(node.page_id)
+
+    def _new_node(self, keys, values, children, is_leaf):
+        if isinstance(children, _ChildList):
+            child_ids = list(children.ids)
+        else:
+            child_ids = [child.page_id for child in children]
+        return self.store.new_node(keys, values, child_ids, is_leaf)
+
+    def _free_node(self, node):
+        self.store.free(node.page_id)
+
+    # the restructuring steps pin every node they touch, so none of them is evicted half-way
+
+    def _b_tree_split_child(self, x, i):
+        with self.store.pinned(x, x.children[i]):
+            super()._b_tree_split_child(x, i)
+
+    def _merge(self, x, i):
+        with self.store.pinned(x, x.children[i], x.children[i + 1]):
+            super()._merge(x, i)
+
+    def _borrow_from_left(self, parent, i):
+        with self.store.pinned(parent, parent.children[i - 1], parent.children[i]):
+            super()._borrow_from_left(parent, i)
+
+    def _borrow_from_right(self, parent, i):
+        with self.store.pinned(parent, parent.children[i], parent.children[i + 1]):
+            super()._borrow_from_right(parent, i)
+
+    # every change of the tree is one operation of the store, which is logged as a whole
+
+    def _build_from_sorted(self, keys, values, fill_factor):
+        with self.store.operation():
+            super()._build_from_sorted(keys, values, fill_factor)
+
+    def b_tree_insert(self, k, v):
+        if not (_is_int64(k) and _is_int64(v)):
+            raise TypeError(f"keys and values of a paged B-tree must be 64-bit integers, got ({k!r}, {v!r})")
+        with self.store.operation():
+            super().b_tree_insert(k, v)
+
+    def insert_many(self, pairs):
+        if hasattr(pairs, 'tolist'):
+            pairs = pairs.tolist()
+        pairs = list(pairs)
+        for k, v in pairs:
+            if not (_is_int64(k) and _is_int64(v)):
+                raise TypeError(f"keys and values of a paged B-tree must be 64-bit integers, got ({k!r}, {v!r})")
+        with self.store.operation():
+            super().insert_many(pairs)
+
+    def b_tree_delete(self, k):
+        with self.store.operation():
+            super().b_tree_delete(k)
+
+    def delete_many(self, keys):
+        with self.store.operation():
+            return super().delete_many(keys)
+
+    def delete_range(self, lo=None, hi=None):
+        # the split/join primitives build their trees outside the page file, so the range is deleted key by key
+        self.delete_many([k for k, _ in self.range(lo, hi)])
+
+    def flush(self):
+        """
+        Write all changed nodes and the header to the page file and sync it. With a log, this is a checkpoint.
+        """
+        self.store.flush()
+
+    def close(self):
+        """
+        Flush and close the page file.
+        """
+        self.flush()
+        self.store.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,83 @@
+"""
+The binary protocol spoken between server.BTreeServer and client.BTreeClient.
+
+Every message is a frame: the length of the rest of the frame (uint32), a request id (uint32) chosen by the client
+and echoed by the server, an opcode (requests) or a status (responses) (uint8), and a payload. Integers are
+little-endian; keys and values are int64. A client may send any number of requests before reading the responses
+(pipelining); responses carry the request id because they can come back in a different order.
+
+    opcode      request payload                                 response payload (status OK)
+    GET         key                                             value, or status NOT_FOUND
+    PUT         key, value                                      -
+    DELETE      key                                             -, or status NOT_FOUND
+    GET_MANY    count (uint32), keys                            count, one found flag (uint8) per key, values
+    RANGE       flags (uint8: 1 lo given, 2 hi given), lo, hi,  count, (key, value) pairs
+                limit (uint32, 0 for none), reverse (uint8)
+
+A response with status ERROR carries a UTF-8 error message.
+"""
+import struct
+
+GET = 1
+PUT = 2
+DELETE = 3
+GET_MANY = 4
+RANGE = 5
+
+OK = 0
+NOT_FOUND = 1
+ERROR = 2
+
+LENGTH = struct.Struct('<I')
+HEADER = struct.Struct('<IB')  # request id, opcode or status
+KEY = struct.Struct('<q')
+PAIR = struct.Struct('<qq')
+COUNT = struct.Struct('<I')
+RANGE_ARGS = struct.Struct('<BqqIB')
+
+
+def frame(request_id, code, payload=b''):
+    """
+    Encode one frame.
+    :param request_id: The request id.
+    :param code: The opcode of a request or the status of a response.
+    :param payload: The encoded payload.
+    :return: The bytes of the frame.
+    """
+    return LENGTH.pack(HEADER.size + len(payload)) + HEADER.pack(request_id, code) + payload
+
+
+def pack_keys(keys):
+    return COUNT.pack(len(keys)) + struct.pack(f'<{len(keys)}q', *keys)
+
+
+def unpack_keys(buffer):
+    n, = COUNT.unpack_from(buffer)
+    return list(struct.unpack_from(f'<{n}q', buffer, COUNT.size))
+
+
+def pack_found(values, missing):
+    """
+    Encode the result of a GET_MANY: one found flag per key, then the values (0 for keys not found).
+    """
+    flags = bytes(value is not missing for value in values)
+    return COUNT.pack(len(values)) + flags + struct.pack(f'<{len(values)}q',
+                                                         *(0 if value is missing else value for value in values))
+
+
+def unpack_found(buffer, default=None):
+    n, = COUNT.unpack_from(buffer)
+    flags = buffer[COUNT.size:COUNT.size + n]
+    values = struct.unpack_from(f'<{n}q', buffer, COUNT.size + n)
+    return [value if found else default for found, value in zip(flags, values)]
+
+
+def pack_pairs(pairs):
+    flat = [x for pair in pairs for x in pair]
+    return COUNT.pack(len(pairs)) + struct.pack(f'<{len(flat)}q', *flat)
+
+
+def unpack_pairs(buffer):
+    n, = COUNT.unpack_from(buffer)
+    flat = struct.unpack_from(f'<{2 * n}q', buffer, COUNT.size)
+    return list(zip(flat[0::2], flat[1::2]))
@@ -0,0 +1,170 @@
+"""
+An asyncio server that shares one in-memory ConcurrentBTree between processes, over a Unix socket or TCP,
+with the binary protocol of protocol.py.
+
+Lookups run on a pool of reader threads and every insert and delete runs on one writer thread, so the event loop
+never waits for a latch and mutations are applied in the order they arrive.
+A read that follows a write on the same connection waits for the write, so a client always sees its own writes.
+
+    python server.py --unix /tmp/btree.sock [-t 32] [--load data.tsv]
+    python server.py --host 127.0.0.1 --port 7070
+"""
+import argparse
+import asyncio
+import struct
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+import protocol
+from concurrent_btree import ConcurrentBTree
+
+_MISSING = object()
+_WRITE_BUFFER_LIMIT = 1 << 20  # bytes of responses queued on a connection before the server waits for the client
+
+
+class BTreeServer:
+    def __init__(self, tree=None, t=32, readers=4):
+        """
+        :param tree: The ConcurrentBTree to serve, or None for a new empty one.
+        :param t: The minimum degree of a new tree.
+        :param readers: Number of threads for lookups and range requests.
+        """
+        self.tree = tree if tree is not None else ConcurrentBTree(t)
+        self._writer = ThreadPoolExecutor(1, thread_name_prefix='btree-writer')
+        self._readers = ThreadPoolExecutor(readers, thread_name_prefix='btree-reader')
+        self._server = None
+
+    async def start(self, address):
+        """
+        Start listening.
+        :param address: A path for a Unix socket, or a (host, port) tuple for TCP.
+        :return: The asyncio server.
+        """
+        if isinstance(address, str):
+            self._server = await asyncio.start_unix_server(self._serve, path=address)
+        else:
+            host, port = address
+            self._server = await asyncio.start_server(self._serve, host, port)
+        return self._server
+
+    async def serve_forever(self):
+        await self._server.serve_forever()
+
+    async def close(self):
+        self._server.close()
+        await self._server.wait_closed()
+        self._writer.shutdown()
+        self._readers.shutdown()
+
+    def _execute(self, op, payload):
+        """
+        Run one request on the tree.
+        :return: A (status, response payload) tuple.
+        """
+        tree = self.tree
+        try:
+            if op == protocol.GET:
+                k, = protocol.KEY.unpack(payload)
+                value = tree.get(k, _MISSING)
+                if value is _MISSING:
+                    return protocol.NOT_FOUND, b''
+                return protocol.OK, protocol.KEY.pack(value)
+            if op == protocol.PUT:
+                tree.b_tree_insert(*protocol.PAIR.unpack(payload))
+                return protocol.OK, b''
+            if op == protocol.DELETE:
+                k, = protocol.KEY.unpack(payload)
+                return (protocol.OK if tree.delete(k) else protocol.NOT_FOUND), b''
+            if op == protocol.GET_MANY:
+                return protocol.OK, protocol.pack_found(tree.get_many(protocol.unpack_keys(payload), _MISSING),
+                                                        _MISSING)
+            if op == protocol.RANGE:
+                flags, lo, hi, limit, reverse = protocol.RANGE_ARGS.unpack(payload)
+                entries = tree.range(lo if flags & 1 else None, hi if flags & 2 else None, bool(reverse))
+                try:
+                    pairs = list(islice(entries, limit) if limit else entries)
+                finally:
+                    entries.close()
+                return protocol.OK, protocol.pack_pairs(pairs)
+            raise ValueError(f"unknown opcode {op}")
+        except (ValueError, TypeError, struct.error) as e:
+            return protocol.ERROR, str(e).encode()
+
+    async def _serve(self, reader, writer):
+        loop = asyncio.get_running_loop()
+        last_write = None  # the latest insert or delete of this connection
+        pending = set()
+        try:
+            while True:
+                try:
+                    length, = protocol.LENGTH.unpack(await reader.readexactly(protocol.LENGTH.size))
+                    if length < protocol.HEADER.size:  # a frame without a request id cannot be answered
+                        break
+                    body = await reader.readexactly(length)
+                except asyncio.IncompleteReadError:
+                    break
+                request_id, op = protocol.HEADER.unpack_from(body)
+                payload = body[protocol.HEADER.size:]
+                if op == protocol.PUT or op == protocol.DELETE:
+                    last_write = loop.run_in_executor(self._writer, self._execute, op, payload)
+                    task = loop.create_task(self._respond(writer, request_id, last_write))
+                else:
+                    task = loop.create_task(self._read(writer, request_id, op, payload, last_write))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+                if writer.transport.get_write_buffer_size() > _WRITE_BUFFER_LIMIT:
+                    await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+            writer.close()
+
+    async def _respond(self, writer, request_id, result):
+        status, payload = await result
+        if not writer.is_closing():
+            writer.write(protocol.frame(request_id, status, payload))
+
+    async def _read(self, writer, request_id, op, payload, after):
+        if after is not None:
+            await after
+        status, payload = await asyncio.get_running_loop().run_in_executor(self._readers, self._execute, op, payload)
+        if not writer.is_closing():
+            writer.write(protocol.frame(request_id, status, payload))
+
+
+async def serve(address, t=32, load=None, readers=4):
+    """
+    Serve a new tree until the task is cancelled.
+    :param address: A path for a Unix socket, or a (host, port) tuple for TCP.
+    :param t: The minimum degree of the tree.
+    :param load: Path of a TSV/CSV file inserted before the server starts listening, or None.
+    :param readers: Number of threads for lookups and range requests.
+    """
+    server = BTreeServer(t=t, readers=readers)
+    if load is not None:
+        from ingest import ingest
+
+        ingest(server.tree, load, quiet=True)
+    await server.start(address)
+    try:
+        await server.serve_forever()
+    finally:
+        await server.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    where = parser.add_mutually_exclusive_group(required=True)
+    where.add_argument('--unix', help="path of the Unix socket")
+    where.add_argument('--port', type=int, help="TCP port")
+    parser.add_argument('--host', default='127.0.0.1', help="TCP host")
+    parser.add_argument('-t', type=int, default=32, help="minimum degree")
+    parser.add_argument('--load', help="TSV/CSV file to load before serving")
+    parser.add_argument('--readers', type=int, default=4, help="threads for lookups and range requests")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.unix if args.unix else (args.host, args.port), args.t, args.load, args.readers))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,307 @@
+"""
+A B-tree sharded over worker processes by key range.
+
+The key space is cut at boundary keys into consecutive ranges, and every range is a BTree in its own process,
+so loads and lookups of different ranges run on different cores. ShardedBTree routes requests in batches: a batch
+is partitioned by range, one request per shard is sent over the shard's pipe, and the replies are collected only
+after every request has been sent, so the shards work on their parts at the same time.
+
+A shard that grows beyond max_shard_size entries is split at its median key into two shards.
+"""
+import multiprocessing
+from bisect import bisect_right
+from itertools import count
+
+from main import BTree
+
+
+def _worker(conn, t):
+    """
+    Serve the requests of one shard until None is received.
+    Every request is an (operation, arguments) tuple and gets a (True, result) or (False, exception) reply.
+    """
+    tree = BTree(t)
+    size = 0
+    scans = {}
+    scan_ids = count()
+    while True:
+        message = conn.recv()
+        if message is None:
+            break
+        op, args = message
+        try:
+            if op == 'load':
+                tree = BTree.bulk_load(args, t)
+                size = len(args)
+                result = size
+            elif op == 'insert_many':
+                tree.insert_many(args)
+                size += len(args)
+                result = size
+            elif op == 'get_many':
+                keys, default = args
+                result = tree.get_many(keys, default)
+            elif op == 'delete_many':
+                deleted = tree.delete_many(args)
+                size -= deleted
+                result = deleted, size
+            elif op == 'scan_open':
+                scan_id = next(scan_ids)
+                scans[scan_id] = tree.range(*args)
+                result = scan_id
+            elif op == 'scan_next':
+                scan_id, n = args
+                result = [entry for _, entry in zip(range(n), scans[scan_id])]
+            elif op == 'scan_close':
+                scans.pop(args).close()
+                result = None
+            elif op == 'split':
+                result = None
+                entries = list(tree)
+                mid = len(entries) // 2
+                while 0 < mid < len(entries) and entries[mid - 1][0] == entries[mid][0]:
+                    mid += 1  # equal keys stay in one shard
+                if 0 < mid < len(entries):
+                    tree = BTree.bulk_load(entries[:mid], t)
+                    size = mid
+                    result = entries[mid][0], entries[mid:]
+            elif op == 'size':
+                result = size
+            else:
+                raise ValueError(f"unknown operation {op!r}")
+        except Exception as e:
+            conn.send((False, e))
+        else:
+            conn.send((True, result))
+    conn.close()
+
+
+class ShardedBTree:
+    """
+    A (key, value) store spread over worker processes, one BTree per key range.
+    Shard i holds the keys k with boundaries[i-1] <= k < boundaries[i].
+    The tree must not be modified while a range scan is in use.
+    """
+
+    def __init__(self, t, boundaries=(), max_shard_size=1000000, start_method=None):
+        """
+        Start one worker process per key range.
+
+        :param t: The minimum degree of the B-tree of every shard.
+        :param boundaries: Sorted keys at which the key space is cut; n boundaries make n + 1 shards.
+        :param max_shard_size: A shard with more entries is split in two.
+        :param start_method: The multiprocessing start method ('fork', 'spawn' or 'forkserver'),
+                             or None for the platform default.
+        """
+        self.t = t
+        self.max_shard_size = max_shard_size
+        self._context = multiprocessing.get_context(start_method)
+        self._bounds = sorted(boundaries)
+        self._shards = [self._start() for _ in range(len(self._bounds) + 1)]
+        self._sizes = [0] * len(self._shards)
+
+    @classmethod
+    def bulk_load(cls, iterable, t, shards=4, **kwargs):
+        """
+        Build a sharded tree from (key, value) pairs sorted by key. The pairs are cut into shards ranges of
+        about the same size, and the shards build their trees at the same time.
+
+        :param iterable: (key, value) pairs in ascending key order.
+        :param t: The minimum degree of the B-tree of every shard.
+        :param shards: The number of shards.
+        :param kwargs: Passed to the constructor.
+        :return: A ShardedBTree.
+        """
+        pairs = list(iterable)
+        cuts = [0]
+        for i in range(1, shards):
+            pos = max(len(pairs) * i // shards, cuts[-1])
+            while 0 < pos < len(pairs) and pairs[pos - 1][0] == pairs[pos][0]:
+                pos += 1
+            if pos < len(pairs) and pos > cuts[-1]:
+                cuts.append(pos)
+        for pos in cuts[1:]:
+            if pairs[pos][0] < pairs[pos - 1][0]:
+                raise ValueError("bulk_load requires pairs sorted by key")
+        tree = cls(t, [pairs[pos][0] for pos in cuts[1:]], **kwargs)
+        cuts.append(len(pairs))
+        results = tree._request_all({i: ('load', pairs[cuts[i]:cuts[i + 1]]) for i in range(len(tree._shards))})
+        for i, size in results.items():
+            tree._sizes[i] = size
+        tree._split_oversized()
+        return tree
+
+    def _start(self):
+        conn, worker_conn = self._context.Pipe()
+        process = self._context.Process(target=_worker, args=(worker_conn, self.t), daemon=True)
+        process.start()
+        worker_conn.close()
+        return process, conn
+
+    def _request(self, i, op, args=None):
+        return self._request_all({i: (op, args)})[i]
+
+    def _request_all(self, requests):
+        """
+        Send one request to each of several shards, then collect the replies.
+        :param requests: A dict of shard index -> (operation, arguments).
+        :return: A dict of shard index -> result.
+        """
+        for i, message in requests.items():
+            self._shards[i][1].send(message)
+        results = {}
+        error = None
+        for i in requests:
+            ok, result = self._shards[i][1].recv()
+            if ok:
+                results[i] = result
+            elif error is None:
+                error = result
+        if error is not None:
+            raise error
+        return results
+
+    def _shard_of(self, k):
+        return bisect_right(self._bounds, k)
+
+    def _partition(self, items, key):
+        parts = {}
+        for item in items:
+            parts.setdefault(bisect_right(self._bounds, key(item)), []).append(item)
+        return parts
+
+    def insert_many(self, pairs):
+        """
+        Insert a batch of (key, value) pairs, then split the shards that grew too large.
+        :param pairs: An iterable of (key, value) pairs, e.g. a list or a NumPy array of shape (n, 2).
+        :return: None. This function performs its operation without returning a value.
+        """
+        if hasattr(pairs, 'tolist'):
+            pairs = pairs.tolist()
+        parts = self._partition(pairs, lambda pair: pair[0])
+        for i, size in self._request_all({i: ('insert_many', part) for i, part in parts.items()}).items():
+            self._sizes[i] = size
+        self._split_oversized()
+
+    def get_many(self, keys, default=None):
+        """
+        Look up a batch of keys.
+        :param keys: An iterable of keys, e.g. a list or a NumPy array.
+        :param default: The value returned for keys that are not in the tree.
+        :return: A list of values in the order of keys.
+        """
+        if hasattr(keys, 'tolist'):
+            keys = keys.tolist()
+        keys = list(keys)
+        positions = self._partition(range(len(keys)), keys.__getitem__)
+        results = self._request_all({i: ('get_many', ([keys[j] for j in part], default))
+                                     for i, part in positions.items()})
+        values = [default] * len(keys)
+        for i, part in positions.items():
+            for j, value in zip(part, results[i]):
+                values[j] = value
+        return values
+
+    def delete_many(self, keys):
+        """
+        Delete a batch of keys.
+        :param keys: An iterable of keys, e.g. a list or a NumPy array.
+        :return: The number of keys deleted.
+        """
+        if hasattr(keys, 'tolist'):
+            keys = keys.tolist()
+        parts = self._partition(keys, lambda k: k)
+        deleted = 0
+        results = self._request_all({i: ('delete_many', part) for i, part in parts.items()})
+        for i, (deleted_here, size) in results.items():
+            deleted += deleted_here
+            self._sizes[i] = size
+        return deleted
+
+    def b_tree_insert(self, k, v):
+        self.insert_many([(k, v)])
+
+    def b_tree_delete(self, k):
+        self.delete_many([k])
+
+    def get(self, k, default=None):
+        return self._request(self._shard_of(k), 'get_many', ([k], default))[0]
+
+    def range(self, lo=None, hi=None, reverse=False, page_size=10000):
+        """
+        Lazily yield the entries with lo <= key < hi in key order, reading page_size entries per request.
+        :param lo: The smallest key to yield, or None to start at the smallest key of the tree.
+        :param hi: The first key not to yield, or None to run to the largest key of the tree.
+        :param reverse: Yield the entries from the largest key to the smallest one.
+        :param page_size: Number of entries fetched from a shard at a time.
+        :return: A generator of (key, value) tuples.
+        """
+        first = 0 if lo is None else self._shard_of(lo)
+        last = len(self._shards) - 1 if hi is None else self._shard_of(hi)
+        shards = range(last, first - 1, -1) if reverse else range(first, last + 1)
+        for i in shards:
+            scan_id = self._request(i, 'scan_open', (lo, hi, reverse))
+            try:
+                while True:
+                    page = self._request(i, 'scan_next', (scan_id, page_size))
+                    yield from page
+                    if len(page) < page_size:
+                        break
+            finally:
+                self._request(i, 'scan_close', scan_id)
+
+    def __iter__(self):
+        return self.range()
+
+    def __len__(self):
+        return sum(self._sizes)
+
+    def _split_oversized(self):
+        i = 0
+        while i < len(self._shards):
+            if self._sizes[i] > self.max_shard_size and self._split(i):
+                continue  # the lower half may still be too large
+            i += 1
+
+    def _split(self, i):
+        """
+        Split shard i at its median key: the upper half moves to a new worker right after it.
+        :return: False if the shard cannot be split because all its entries have the same key.
+        """
+        result = self._request(i, 'split')
+        if result is None:
+            return False
+        key, upper = result
+        shard = self._start()
+        self._shards.insert(i + 1, shard)
+        self._bounds.insert(i, key)
+        self._sizes[i] -= len(upper)
+        self._sizes.insert(i + 1, 0)
+        self._sizes[i + 1] = self._request(i + 1, 'load', upper)
+        return True
+
+    def shard_sizes(self):
+        """
+        :return: A list of (lower boundary, number of entries) per shard; the first lower boundary is None.
+        """
+        return list(zip([None] + self._bounds, self._sizes))
+
+    def close(self):
+        """
+        Stop the worker processes.
+        """
+        for process, conn in self._shards:
+            try:
+                conn.send(None)
+            except OSError:  # the worker is gone already
+                pass
+            conn.close()
+        for process, conn in self._shards:
+            process.join()
+        self._shards = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,231 @@
+"""
+A BTree with O(1) copy-on-write snapshots.
+
+Every node counts the references to it: from the children lists of its parents and from roots (the root of the tree
+and the roots of its snapshots). snapshot() only adds a reference to the root. A node referenced more than once is
+shared and never changed in place: before a write changes it, the write copies it into its parent ("path copying"),
+and the copy adds a reference to each of its children, which are now shared in turn. A write therefore copies only
+the shared nodes on the paths it changes, and a node referenced once is changed in place as in BTree.
+
+Releasing a snapshot drops the reference of its root; every node whose count falls to zero drops the references of
+its children. Once no snapshot shares a node with the tree, writes stop copying.
+
+Writes and snapshot() must not run concurrently, e.g. take snapshots from the writing thread. A snapshot may be read
+and released from any thread while the tree is written.
+"""
+import threading
+from bisect import bisect_left, bisect_right
+
+from main import BTree, BTreeCursor, BTreeNode
+
+
+class CowNode(BTreeNode):
+    def __init__(self, keys, values, children, is_leaf):
+        super().__init__(keys, values, children, is_leaf)
+        self.refs = 1  # every node is created to be referenced once, by its parent or as the root
+
+
+class CowBTree(BTree):
+    no_split_reason = "the subtrees it would relink may be shared with snapshots"
+
+    def __init__(self, t):
+        """
+        :param t: The minimum degree of the B-tree.
+        """
+        self._refs_lock = threading.Lock()
+        self.copies = 0  # nodes copied because they were shared
+        super().__init__(t)
+
+    def _new_node(self, keys, values, children, is_leaf):
+        return CowNode(keys, values, children, is_leaf)
+
+    def snapshot(self):
+        """
+        Take a read-only view of the current content of the tree in O(1).
+        :return: A Snapshot. Release it when it is no longer needed, so writes stop copying the nodes it shares.
+        """
+        with self._refs_lock:
+            self.root.refs += 1
+        return Snapshot(self, self.root)
+
+    def _copy(self, node):
+        """
+        Copy a shared node. The copy takes over one reference of the node and adds one to each of its children.
+        The count is checked again under the lock: a snapshot released since the caller looked at it may have
+        left the node referenced only by the tree, which then keeps it. The node therefore never falls to zero
+        references here.
+        :return: The copy, referenced once, or the node itself if it is no longer shared.
+        """
+        with self._refs_lock:
+            if node.refs == 1:
+                return node
+            node.refs -= 1
+            for child in node.children:
+                child.refs += 1
+        self.copies += 1
+        return CowNode(node.keys[:], node.values[:], node.children[:], node.is_leaf)
+
+    def _writable_child(self, x, i):
+        """
+        Make x.children[i] safe to change, copying it into x if it is shared. x must be writable itself.
+        :return: The child.
+        """
+        child = x.children[i]
+        if child.refs > 1:
+            child = x.children[i] = self._copy(child)
+        return child
+
+    def _own_root(self):
+        if self.root.refs > 1:
+            self.root = self._copy(self.root)
+
+    def _release(self, node):
+        """
+        Drop one reference to node, and the references of every node that is no longer referenced.
+        """
+        with self._refs_lock:
+            stack = [node]
+            while stack:
+                node = stack.pop()
+                node.refs -= 1
+                if node.refs == 0:
+                    stack.extend(node.children)
+
+    def _free_node(self, node):
+        # the children of a node dropped by a merge or a shrinking root have been handed over to another node
+        with self._refs_lock:
+            node.refs -= 1
+
+    def _build_from_sorted(self, keys, values, fill_factor):
+        old_root = self.root
+        super()._build_from_sorted(keys, values, fill_factor)
+        if old_root.refs == 0:  # the old tree is not handed over: release the rest of it
+            for child in old_root.children:
+                self._release(child)
+
+    def _b_tree_split_child(self, x, i):
+        self._writable_child(x, i)
+        super()._b_tree_split_child(x, i)
+
+    def _merge(self, x, i):
+        self._writable_child(x, i)
+        self._writable_child(x, i + 1)
+        super()._merge(x, i)
+
+    def _borrow_from_left(self, parent, i):
+        self._writable_child(parent, i - 1)
+        self._writable_child(parent, i)
+        super()._borrow_from_left(parent, i)
+
+    def _borrow_from_right(self, parent, i):
+        self._writable_child(parent, i)
+        self._writable_child(parent, i + 1)
+        super()._borrow_from_right(parent, i)
+
+    def b_tree_insert(self, k, v):
+        self._own_root()
+        super().b_tree_insert(k, v)
+
+    def insert_many(self, pairs):
+        self._own_root()
+        super().insert_many(pairs)
+
+    def b_tree_delete(self, k):
+        self._own_root()
+        super().b_tree_delete(k)
+
+    def delete_many(self, keys):
+        self._own_root()
+        return super().delete_many(keys)
+
+    def delete_range(self, lo=None, hi=None):
+        # split and join relink subtrees that snapshots may share, so the range is deleted key by key
+        self.delete_many([k for k, _ in self.range(lo, hi)])
+
+    def _b_tree_insert_nonfull(self, x, k, v, path=None):
+        """
+        BTree._b_tree_insert_nonfull that makes every child writable before it descends into it. x must be writable.
+        """
+        full = 2 * self.t - 1
+        while not x.is_leaf:
+            i = bisect_right(x.keys, k)
+            if len(x.children[i].keys) == full:
+                self._b_tree_split_child(x, i)
+                if k > x.keys[i]:
+                    i = i + 1
+            child = self._writable_child(x, i)
+            if path is not None:
+                path.append([child, x.keys[i] if i < len(x.keys) else path[-1][1]])
+            x = child
+        i = bisect_right(x.keys, k)
+        x.keys.insert(i, k)
+        x.values.insert(i, v)
+
+    def _b_tree_delete(self, x, k, path=None):
+        """
+        BTree._b_tree_delete that makes every child writable before it descends into it. x must be writable.
+        """
+        t = self.t
+        while True:
+            i = bisect_left(x.keys, k)
+            if i < len(x.keys) and x.keys[i] == k:
+                if x.is_leaf:
+                    x.keys.pop(i)
+                    x.values.pop(i)
+                    return True
+                if len(x.children[i].keys) >= t:
+                    x.keys[i], x.values[i] = node_pred = self._pred(x.children[i])
+                    k = node_pred[0]
+                elif len(x.children[i + 1].keys) >= t:
+                    x.keys[i], x.values[i] = node_succ = self._succ(x.children[i + 1])
+                    k = node_succ[0]
+                    i = i + 1
+                else:
+                    self._merge(x, i)
+            else:
+                if x.is_leaf:
+                    return False
+                if len(x.children[i].keys) < t:
+                    i = self._fix_shortage(x, i)
+            # after a merge at the root, x is the dropped old root and x.children[i] the new, writable root
+            child = self._writable_child(x, i)
+            if path is not None:
+                path.append([child, x.keys[i - 1] if i > 0 else path[-1][1],
+                             x.keys[i] if i < len(x.keys) else path[-1][2]])
+            x = child
+
+
+class Snapshot:
+    """
+    A read-only view of a CowBTree at the time it was taken. It offers the read operations of BTree:
+    b_tree_search, get_many, cursor, range and iteration.
+    """
+    stats = None
+    filter = None  # the filter of the tree holds its current keys, not those of the snapshot
+
+    def __init__(self, tree, root):
+        self.t = tree.t
+        self.root = root
+        self._tree = tree
+
+    b_tree_search = BTree.b_tree_search
+    get_many = BTree.get_many
+    range = BTree.range
+    __iter__ = BTree.__iter__
+
+    def cursor(self, reverse=False):
+        return BTreeCursor(self, reverse)
+
+    def release(self):
+        """
+        Drop the snapshot. It cannot be read afterwards.
+        """
+        if self.root is not None:
+            self._tree._release(self.root)
+            self.root = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
@@ -78,7 +78,11 @@ def fix_shortage(parent, i):
     elif i < len(parent.keys) and len(parent.children[i+1].keys) >= parent.t:
         borrow_from_right(parent, i)
     else:
-        merge(parent, i-1 if i == len(parent.keys) else i)
+        if i == len(parent.keys):
+            merge(parent, i-1)
+            return i-1
+        merge(parent, i)
+    return i
 
 def borrow_from_left(parent, i):
     left_sibling = parent.children[i-1]
@@ -132,6 +136,6 @@ def _b_tree_delete(node, key):
         if node.leaf:
             return
         if len(node.children[i].keys) < node.t:
-            fix_shortage(node, i)
+            i = fix_shortage(node, i)
         _b_tree_delete(node.children[i], key)
 
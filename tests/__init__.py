@@ -0,0 +1,3 @@
+"""
+Regression tests. Run them from the repository root with ``python -m pytest tests``.
+"""
@@ -0,0 +1,19 @@
+import json
+import math
+
+import metrics
+from main import BTree
+
+
+def test_summary_of_latency_above_last_bucket_is_finite():
+    tree = BTree(3)
+    stats = tree.enable_stats()
+    tree.b_tree_insert(1, 1)
+    for _ in range(10):
+        stats.record('insert_many', 10.0)  # above the last latency bucket (8 s)
+    fields = metrics.summary(metrics.snapshot(tree))
+    assert fields['insert_many_p99_us'] == metrics.LATENCY_BUCKETS[-1] * 1e6
+    assert fields['insert_many_p99_overflow'] is True
+    assert 'insert_p99_overflow' not in fields
+    assert all(math.isfinite(value) for value in fields.values() if isinstance(value, float))
+    json.dumps(fields, allow_nan=False)
@@ -0,0 +1,31 @@
+import asyncio
+import os
+import tempfile
+
+import protocol
+from client import BTreeClient
+from server import BTreeServer
+
+
+def test_frame_shorter_than_header_closes_connection():
+    async def scenario(path):
+        server = BTreeServer(t=3)
+        await server.start(path)
+        errors = []
+        asyncio.get_running_loop().set_exception_handler(lambda loop, context: errors.append(context))
+        try:
+            reader, writer = await asyncio.open_unix_connection(path)
+            writer.write(protocol.LENGTH.pack(2) + b'\x00\x00')
+            await writer.drain()
+            assert await asyncio.wait_for(reader.read(), 5) == b''
+            writer.close()
+
+            async with BTreeClient(path) as client:  # the server still serves other connections
+                await client.put(1, 10)
+                assert await client.get(1) == 10
+        finally:
+            await server.close()
+        assert errors == []
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        asyncio.run(scenario(os.path.join(tmp_dir, "btree.sock")))
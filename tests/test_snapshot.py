@@ -0,0 +1,38 @@
+import random
+import threading
+
+from snapshot import CowBTree
+
+
+def _nodes(node):
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        yield node
+        stack.extend(node.children)
+
+
+def test_writes_stop_copying_once_snapshots_released_from_another_thread():
+    tree = CowBTree(2)
+    rnd = random.Random(1)
+    for k in range(2000):
+        tree.b_tree_insert(k, k)
+    for _ in range(20):
+        snapshots = []
+        for _ in range(50):
+            snapshots.append(tree.snapshot())
+            for _ in range(20):
+                tree.b_tree_insert(rnd.randrange(4000), 0)
+        releaser = threading.Thread(target=lambda: [snapshot.release() for snapshot in snapshots])
+        releaser.start()
+        while releaser.is_alive():
+            tree.b_tree_insert(rnd.randrange(4000), 0)
+            tree.b_tree_delete(rnd.randrange(4000))
+        releaser.join()
+
+    assert all(node.refs == 1 for node in _nodes(tree.root))
+    copies = tree.copies
+    for _ in range(2000):
+        tree.b_tree_insert(rnd.randrange(4000), 0)
+        tree.b_tree_delete(rnd.randrange(4000))
+    assert tree.copies == copies
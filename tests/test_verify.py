@@ -0,0 +1,22 @@
+import pytest
+
+import verify
+from main import BTree
+
+
+@pytest.mark.parametrize("text", ["1\t10\n2\n", "1\tN/A\n2\n"], ids=["values", "with N/A"])
+def test_line_with_only_a_key_is_reported(tmp_path, text):
+    path = tmp_path / "expected.tsv"
+    path.write_text(text)
+    with pytest.raises(ValueError, match="malformed line '2'"):
+        verify.verify(BTree(3), str(path))
+
+
+def test_absent_keys(tmp_path):
+    path = tmp_path / "expected.tsv"
+    path.write_text("1\t10\n2\tN/A\n")
+    tree = BTree(3)
+    tree.b_tree_insert(1, 10)
+    assert verify.verify(tree, str(path))['ok']
+    tree.b_tree_insert(2, 20)
+    assert verify.lookup(tree, str(path))['extra'] == 1
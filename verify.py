@@ -0,0 +1,173 @@
+"""
+In-process verification of a tree against an expected file.
+
+The expected file lists '<key>\\t<value>' for every entry the tree must hold; '<key>\\tN/A' lines name keys it must
+not hold, as in the files created after a deletion. Verification streams the file once and the tree once, in key
+order, and compares an order-independent checksum of both: the number of entries and the sum of the hashes of the
+(key, value) pairs. Only when the checksums differ are the entries compared one by one, to report the keys at fault.
+A tree that may hold more than the file, such as one loaded from several files, is checked with lookups instead.
+"""
+from ingest import CHUNK_SIZE, parse_chunk, read_chunks
+
+_MASK = (1 << 64) - 1
+_MISSING = object()
+
+
+def read_expected(file_path, chunk_size=CHUNK_SIZE):
+    """
+    Read an expected file in batches.
+    :param file_path: Path of the file.
+    :param chunk_size: Number of characters parsed at a time.
+    :return: A generator of (keys, values) tuples of lists. The value of a key that must be absent is None.
+    :raise ValueError: For the first line that is not a key and a value or 'N/A'.
+    """
+    for text in read_chunks(file_path, chunk_size):
+        if 'N/A' not in text:
+            keys, values = parse_chunk(text, use_numpy=False)
+            yield keys, values
+            continue
+        keys = []
+        values = []
+        for line in text.splitlines():
+            fields = line.replace(',', '\t').split()
+            if not fields:
+                continue
+            try:
+                if len(fields) != 2:
+                    raise ValueError
+                k, v = int(fields[0]), None if fields[1] == 'N/A' else int(fields[1])
+            except ValueError:
+                raise ValueError(f"malformed line {line!r}: expected '<key>\\t<value>' or '<key>\\tN/A'") from None
+            keys.append(k)
+            values.append(v)
+        yield keys, values
+
+
+def checksum(pairs):
+    """
+    Order-independent checksum of a multiset of (key, value) pairs.
+    :param pairs: An iterable of (key, value) tuples.
+    :return: A (count, sum of hashes modulo 2**64) tuple.
+    """
+    count = total = 0
+    for pair in pairs:
+        count += 1
+        total += hash(pair)
+    return count, total & _MASK
+
+
+def verify(tree, file_path, created_path=None, max_examples=10, exact=True):
+    """
+    Check that a tree holds exactly the entries of an expected file.
+
+    :param tree: A BTree.
+    :param file_path: Path of the expected file.
+    :param created_path: If given, also look up every key of the file and write the result to this path,
+                         '<key>\\t<value>' for found keys and '<key>\\tN/A' for missing ones.
+    :param max_examples: Number of keys listed for each kind of difference.
+    :param exact: False to only look up the keys of the file (see lookup) and allow the tree other entries.
+    :return: A dict with 'ok', the number of 'records' in the file, the 'expected' number of entries and the number
+             of entries in the 'tree'. When the tree differs, also the number of 'mismatched' values, of 'missing'
+             and of 'extra' keys, and 'examples' of each.
+    """
+    if not exact:
+        return lookup(tree, file_path, created_path, max_examples)
+    records = expected = total = 0
+    created = open(created_path, 'w') if created_path is not None else None
+    try:
+        for keys, values in read_expected(file_path):
+            records += len(keys)
+            pairs = [(k, v) for k, v in zip(keys, values) if v is not None]
+            expected += len(pairs)
+            total += sum(map(hash, pairs))
+            if created is not None:
+                found = tree.get_many(keys, _MISSING)
+                created.writelines(f"{k}\t{'N/A' if v is _MISSING else v}\n" for k, v in zip(keys, found))
+    finally:
+        if created is not None:
+            created.close()
+    size, tree_total = checksum(tree)
+    result = {'ok': (size, tree_total) == (expected, total & _MASK), 'records': records, 'expected': expected,
+              'tree': size}
+    if not result['ok']:
+        result.update(diagnose(tree, file_path, max_examples))
+    return result
+
+
+def lookup(tree, file_path, created_path=None, max_examples=10):
+    """
+    Check that a tree holds every entry of an expected file, and none of the keys the file marks 'N/A',
+    by looking up the keys of the file in batches. Other entries of the tree are not read.
+
+    :param tree: A BTree.
+    :param file_path: Path of the expected file.
+    :param created_path: If given, also write the result of the lookups to this path, as verify does.
+    :param max_examples: Number of keys listed for each kind of difference.
+    :return: A dict like the one of verify, without the size of the 'tree'. 'extra' counts the keys marked 'N/A'
+             that were found.
+    """
+    records = expected = 0
+    counts = {'mismatched': 0, 'missing': 0, 'extra': 0}
+    examples = {name: [] for name in counts}
+    created = open(created_path, 'w') if created_path is not None else None
+    try:
+        for keys, values in read_expected(file_path):
+            records += len(keys)
+            found = tree.get_many(keys, _MISSING)
+            for k, v, actual in zip(keys, values, found):
+                if v is None:
+                    if actual is _MISSING:
+                        continue
+                    kind, example = 'extra', (k, actual)
+                else:
+                    expected += 1
+                    if actual == v:
+                        continue
+                    kind, example = ('missing', k) if actual is _MISSING else ('mismatched', (k, v, actual))
+                counts[kind] += 1
+                if len(examples[kind]) < max_examples:
+                    examples[kind].append(example)
+            if created is not None:
+                created.writelines(f"{k}\t{'N/A' if v is _MISSING else v}\n" for k, v in zip(keys, found))
+    finally:
+        if created is not None:
+            created.close()
+    return {'ok': not any(counts.values()), 'records': records, 'expected': expected, **counts,
+            'examples': examples}
+
+
+def diagnose(tree, file_path, max_examples=10):
+    """
+    Compare a tree with an expected file entry by entry.
+    The keys of the file are looked up in batches, and the keys that must be present are kept in a set
+    to find the extra keys of the tree in one more pass over it.
+
+    :param tree: A BTree.
+    :param file_path: Path of the expected file.
+    :param max_examples: Number of keys listed for each kind of difference.
+    :return: A dict with the number of 'mismatched' values, of 'missing' keys and of 'extra' keys, and 'examples':
+             (key, expected value, value in the tree) for mismatches, keys for missing keys and (key, value) for
+             extra entries.
+    """
+    counts = {'mismatched': 0, 'missing': 0, 'extra': 0}
+    examples = {name: [] for name in counts}
+
+    def note(kind, example):
+        counts[kind] += 1
+        if len(examples[kind]) < max_examples:
+            examples[kind].append(example)
+
+    present = set()
+    for keys, values in read_expected(file_path):
+        for k, v, actual in zip(keys, values, tree.get_many(keys, _MISSING)):
+            if v is None:
+                continue
+            present.add(k)
+            if actual is _MISSING:
+                note('missing', k)
+            elif actual != v:
+                note('mismatched', (k, v, actual))
+    for k, v in tree:
+        if k not in present:
+            note('extra', (k, v))
+    return {**counts, 'examples': examples}
@@ -0,0 +1,146 @@
+"""
+Append-only write-ahead log used by pager.PagedBTree.
+
+Every record is framed as kind (1 byte), page id (int64), payload length (uint32) and a CRC-32 of the other
+fields and the payload, followed by the payload. The records of one operation end with a COMMIT record;
+recovery only replays operations whose COMMIT record made it to the file intact.
+"""
+import os
+import struct
+import threading
+import zlib
+
+PAGE = 1  # payload: the image of one page
+HEADER = 2  # payload: tree metadata, see pager.PageStore
+COMMIT = 3  # no payload
+
+SYNC_POLICIES = ('always', 'interval', 'never')
+
+_RECORD = struct.Struct('<BqII')
+_RECORD_FIELDS = struct.Struct('<BqI')
+
+
+class WriteAheadLog:
+    """
+    The records of an operation are collected in memory and written to the file, in one write, when it commits,
+    so a committed operation survives a crash of the process under every policy. The policy decides when the
+    file is fsync'ed, which makes the operation survive a crash of the machine as well:
+
+        always      every commit is fsync'ed before it returns
+        interval    a background thread fsyncs the commits written in the last interval_ms together,
+                    so at most interval_ms of commits can be lost
+        never       the log is never fsync'ed; the operating system writes it back when it chooses
+
+    Whatever the policy, sync() fsyncs (except for 'never') everything logged so far;
+    the pager calls it before any page reaches the data file.
+    """
+
+    def __init__(self, path, sync='always', interval_ms=10):
+        """
+        Open the log for appending, creating it if needed.
+        :param path: Path of the log file.
+        :param sync: The fsync policy, one of 'always', 'interval' and 'never'.
+        :param interval_ms: Time between two fsyncs under the 'interval' policy.
+        """
+        if sync not in SYNC_POLICIES:
+            raise ValueError(f"sync must be one of {SYNC_POLICIES}, got {sync!r}")
+        self.path = path
+        self.sync_policy = sync
+        self.interval = interval_ms / 1000
+        self.file = open(path, 'ab')
+        self._buffer = bytearray()
+        self._unsynced = False  # written to the file but not fsync'ed yet
+        self.commits = 0
+        self.syncs = 0
+        self._closed = threading.Event()
+        self._syncer = None
+        if sync == 'interval':
+            self._syncer = threading.Thread(target=self._sync_periodically, name='wal-sync', daemon=True)
+            self._syncer.start()
+
+    def append(self, kind, page_id=0, payload=b''):
+        """
+        Add a record to the log buffer.
+        :param kind: PAGE, HEADER or COMMIT.
+        :param page_id: The page the record belongs to, 0 if none.
+        :param payload: The record body.
+        """
+        fields = _RECORD_FIELDS.pack(kind, page_id, len(payload))
+        self._buffer += _RECORD.pack(kind, page_id, len(payload), zlib.crc32(payload, zlib.crc32(fields)))
+        self._buffer += payload
+
+    def commit(self):
+        """
+        End the records of one operation and write them to the file; fsync it if the policy is 'always'.
+        """
+        self.append(COMMIT)
+        self.commits += 1
+        self._write()
+        if self.sync_policy == 'always':
+            self._fsync()
+
+    def _write(self):
+        if self._buffer:
+            self.file.write(self._buffer)
+            self.file.flush()
+            self._buffer.clear()
+            self._unsynced = True
+
+    def _fsync(self):
+        if self._unsynced:
+            self._unsynced = False  # cleared first: a commit written during the fsync sets it again
+            os.fsync(self.file.fileno())
+            self.syncs += 1
+
+    def _sync_periodically(self):
+        while not self._closed.wait(self.interval):
+            self._fsync()
+
+    def sync(self):
+        """
+        Write all buffered records and, unless the policy is 'never', fsync the log.
+        """
+        self._write()
+        if self.sync_policy != 'never':
+            self._fsync()
+
+    def truncate(self):
+        """
+        Empty the log after a checkpoint has made every logged change durable in the data file.
+        """
+        self._buffer.clear()
+        self.file.truncate(0)
+        os.fsync(self.file.fileno())
+        self._unsynced = False
+
+    def close(self):
+        self._closed.set()
+        if self._syncer is not None:
+            self._syncer.join()
+        self.sync()
+        self.file.close()
+
+
+def read_committed(path):
+    """
+    Read the operations of a log that were committed completely.
+    Reading stops at the first truncated or corrupted record, which is where a crash interrupted the log.
+
+    :param path: Path of the log file.
+    :return: A generator of operations, each a list of (kind, page id, payload) records without the COMMIT record.
+    """
+    with open(path, 'rb') as file:
+        data = file.read()
+    pos = 0
+    records = []
+    while pos + _RECORD.size <= len(data):
+        kind, page_id, length, crc = _RECORD.unpack_from(data, pos)
+        payload = data[pos + _RECORD.size:pos + _RECORD.size + length]
+        if len(payload) < length or zlib.crc32(payload, zlib.crc32(_RECORD_FIELDS.pack(kind, page_id, length))) != crc:
+            return
+        pos += _RECORD.size + length
+        if kind == COMMIT:
+            yield records
+            records = []
+        else:
+            records.append((kind, page_id, payload))